@@ -0,0 +1,56 @@
+"""add_video_jobs_table
+
+Revision ID: c4e9a2f17b30
+Revises: 935b398d3240
+Create Date: 2026-10-17 10:12:41.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a2f17b30'
+down_revision: Union[str, Sequence[str], None] = '935b398d3240'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    job_status_enum = postgresql.ENUM('queued', 'running', 'completed', 'failed', name='jobstatusenum', create_type=False)
+    job_status_enum.create(op.get_bind(), checkfirst=True)
+
+    op.create_table('video_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('video_id', sa.Integer(), nullable=False),
+        sa.Column('status', job_status_enum, server_default='queued', nullable=False),
+        sa.Column('input_path', sa.Text(), nullable=False),
+        sa.Column('output_path', sa.Text(), nullable=True),
+        sa.Column('sampling', sa.Text(), server_default='all', nullable=False),
+        sa.Column('frame_stride', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('target_fps', sa.Float(), nullable=True),
+        sa.Column('total_frames', sa.Integer(), nullable=True),
+        sa.Column('frames_done', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('result_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('finished_at', postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['session_id'], ['video_sessions.id'], name='fk_video_jobs_session_id'),
+        sa.ForeignKeyConstraint(['video_id'], ['reference_posture_videos.id'], name='fk_video_jobs_video_id'),
+        sa.ForeignKeyConstraint(['result_id'], ['posture_detection_results.id'], name='fk_video_jobs_result_id'),
+    )
+    # Les workers cherchent le prochain travail en file par statut puis par ordre d'arrivée.
+    op.create_index('ix_video_jobs_status_id', 'video_jobs', ['status', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_video_jobs_status_id', table_name='video_jobs')
+    op.drop_table('video_jobs')
+    job_status_enum = postgresql.ENUM('queued', 'running', 'completed', 'failed', name='jobstatusenum', create_type=False)
+    job_status_enum.drop(op.get_bind(), checkfirst=True)
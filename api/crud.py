@@ -4,7 +4,7 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func
-from . import models, schemas
+from . import models, schemas, metrics
 from datetime import datetime, timezone
 import logging
 
@@ -78,20 +78,22 @@ async def update_session_status(db: AsyncSession, session_id: int):
     await db.refresh(session)
     return success_count
 
-async def create_posture_attempt(db: AsyncSession, attempt: schemas.db_schemas.PostureAttemptCreate):
-    session = await get_session_by_id(db, attempt.session_id)
+async def get_session_and_video(db: AsyncSession, session_id: int, video_id: int):
+    """Session et vidéo de référence d'une tentative : 404 si l'une manque, 400 si leurs postures diffèrent."""
+    session = await get_session_by_id(db, session_id)
     if not session:
-        raise HTTPException(status_code=404, detail=f"Session with id {attempt.session_id} not found")
+        raise HTTPException(status_code=404, detail=f"Session with id {session_id} not found")
     
-    ref_video = await db.execute(
-        select(models.ReferencePostureVideo).filter(models.ReferencePostureVideo.id == attempt.video_id)
-    )
-    ref_video = ref_video.scalar_one_or_none()
+    ref_video = await get_reference_video(db, video_id)
     if not ref_video:
-        raise HTTPException(status_code=404, detail=f"Reference video with id {attempt.video_id} not found")
+        raise HTTPException(status_code=404, detail=f"Reference video with id {video_id} not found")
     
     if ref_video.posture != session.posture:
-        raise HTTPException(status_code=400, detail=f"Video id {attempt.video_id} (posture: {ref_video.posture}) does not match session posture ({session.posture})")
+        raise HTTPException(status_code=400, detail=f"Video id {video_id} (posture: {ref_video.posture}) does not match session posture ({session.posture})")
+    return session, ref_video
+
+async def create_posture_attempt(db: AsyncSession, attempt: schemas.db_schemas.PostureAttemptCreate):
+    session, _ = await get_session_and_video(db, attempt.session_id, attempt.video_id)
     
     db_attempt = models.PostureDetectionResult(
         session_id=attempt.session_id,
@@ -103,12 +105,17 @@ async def create_posture_attempt(db: AsyncSession, attempt: schemas.db_schemas.P
         prediction_time=attempt.prediction_time,
         frames_processed=attempt.frames_processed
     )
-    db.add(db_attempt)
-    await db.commit()
-    await db.refresh(db_attempt)
-    await update_session_status(db, attempt.session_id)
+    with metrics.db_write_timer("create_posture_attempt"):
+        db.add(db_attempt)
+        await db.commit()
+        await db.refresh(db_attempt)
+        await update_session_status(db, attempt.session_id)
     return db_attempt
 
+async def get_reference_video(db: AsyncSession, video_id: int):
+    result = await db.execute(select(models.ReferencePostureVideo).filter(models.ReferencePostureVideo.id == video_id))
+    return result.scalar_one_or_none()
+
 async def get_next_videos_for_session(db: AsyncSession, session_id: int) -> List[schemas.db_schemas.VideoReference]:
     session = await get_session_by_id(db, session_id)
     if not session:
@@ -179,4 +186,89 @@ async def get_validated_postures_by_dog(db: AsyncSession, dog_id: int):
     result = await db.execute(
         select(models.ValidatedPosture).filter(models.ValidatedPosture.dog_id == dog_id)
     )
-    return result.scalars().all()
\ No newline at end of file
+    return result.scalars().all()
+
+async def create_video_job(db: AsyncSession, job: schemas.db_schemas.VideoJobCreate):
+    # Une tentative dont la posture ne correspond pas serait refusée à la fin du traitement : refus immédiat.
+    await get_session_and_video(db, job.session_id, job.video_id)
+    db_job = models.VideoJob(
+        **job.dict(),
+        status=models.JobStatusEnum.queued,
+        frames_done=0,
+        created_at=datetime.now(timezone.utc)
+    )
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+async def get_video_job(db: AsyncSession, job_id: int):
+    result = await db.execute(select(models.VideoJob).filter(models.VideoJob.id == job_id))
+    return result.scalar_one_or_none()
+
+async def claim_next_video_job(db: AsyncSession):
+    """Passe le plus ancien travail en file à l'état `running` et le retourne (None si la file est vide)."""
+    result = await db.execute(
+        select(models.VideoJob)
+        .filter(models.VideoJob.status == models.JobStatusEnum.queued)
+        .order_by(models.VideoJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalar_one_or_none()
+    if not job:
+        return None
+    job.status = models.JobStatusEnum.running
+    job.started_at = datetime.now(timezone.utc)
+    job.error = None
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def update_video_job_progress(db: AsyncSession, job_id: int, frames_done: int, total_frames: int = None):
+    job = await get_video_job(db, job_id)
+    if not job:
+        return None
+    job.frames_done = frames_done
+    if total_frames:
+        job.total_frames = total_frames
+    await db.commit()
+    return job
+
+async def complete_video_job(db: AsyncSession, job_id: int, output_path: str, frames_done: int, result_id: int = None):
+    job = await get_video_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Video job with id {job_id} not found")
+    job.status = models.JobStatusEnum.completed
+    job.output_path = output_path
+    job.frames_done = frames_done
+    job.total_frames = max(job.total_frames or 0, frames_done)
+    job.result_id = result_id
+    job.finished_at = datetime.now(timezone.utc)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def fail_video_job(db: AsyncSession, job_id: int, error: str):
+    job = await get_video_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Video job with id {job_id} not found")
+    job.status = models.JobStatusEnum.failed
+    job.error = error
+    job.finished_at = datetime.now(timezone.utc)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def requeue_running_video_jobs(db: AsyncSession) -> int:
+    """Remet en file les travaux restés `running` (interrompus par un redémarrage)."""
+    result = await db.execute(
+        select(models.VideoJob).filter(models.VideoJob.status == models.JobStatusEnum.running)
+    )
+    jobs = result.scalars().all()
+    for job in jobs:
+        job.status = models.JobStatusEnum.queued
+        job.frames_done = 0
+        job.started_at = None
+    await db.commit()
+    return len(jobs)
\ No newline at end of file
@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Paramètres de la fenêtre de regroupement, surchargeables par variables d'environnement.
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("YOLO_BATCH_MAX_SIZE", "8"))
+DEFAULT_MAX_WAIT_MS = float(os.getenv("YOLO_BATCH_MAX_WAIT_MS", "10"))
+
+
+class BatchScheduler:
+    """
+    Regroupe les images de requêtes concurrentes en un seul appel au modèle.
+
+    Chaque appel à `submit` dépose une image dans une file d'attente. Une tâche
+    de fond attend la première image, puis collecte les suivantes pendant au
+    plus `max_wait_ms` millisecondes (ou jusqu'à `max_batch_size` images),
+    exécute `detector.process_batch` une seule fois et renvoie à chaque
+    appelant le résultat qui le concerne.
+
+    Les options d'inférence passées à `submit` (ex. `imgsz`, `conf`) sont
+    transmises à `process_batch` : seules les images qui partagent les mêmes
+    options sont regroupées dans un même appel.
+
+    Si un `executor` (InferenceExecutor) est fourni, les lots lui sont soumis ;
+    sinon ils s'exécutent dans le pool par défaut de la boucle asyncio.
+    """
+
+    def __init__(self, detector, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS, executor=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size doit être supérieur ou égal à 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms doit être positif")
+        self.detector = detector
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches_run = 0
+        self.images_processed = 0
+
+    def start(self):
+        """Démarre la tâche de regroupement sur la boucle d'événements courante."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrête la tâche de fond et fait échouer les requêtes encore en attente."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Le planificateur de lots a été arrêté"))
+
+    async def submit(self, image_np: np.ndarray, **options) -> tuple:
+        """Soumet une image et attend `(detections, metrics)` pour cette image."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_np, tuple(sorted(options.items())), future))
+        return await future
+
+    async def _collect(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_batch(self, images: List[np.ndarray], options: dict) -> List[tuple]:
+        if self.executor is not None:
+            return await self.executor.run("process_batch", images, **options)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.detector.process_batch, images, **options))
+
+    async def _run(self):
+        while True:
+            collected = await self._collect()
+            # Les requêtes annulées entre-temps (client parti) ne sont pas envoyées au modèle.
+            groups = {}
+            for image, options, future in collected:
+                if not future.done():
+                    groups.setdefault(options, []).append((image, future))
+            try:
+                for options, batch in groups.items():
+                    await self._run_group(batch, dict(options))
+            except asyncio.CancelledError:
+                for _, _, future in collected:
+                    if not future.done():
+                        future.cancel()
+                raise
+
+    async def _run_group(self, batch: List[tuple], options: dict):
+        try:
+            outputs = await self._run_batch([image for image, _ in batch], options)
+        except Exception as e:
+            logger.error(f"Échec de l'inférence par lot ({len(batch)} images) : {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.images_processed += len(batch)
+        for (_, future), output in zip(batch, outputs):
+            if not future.done():
+                future.set_result(output)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches_run": self.batches_run,
+            "images_processed": self.images_processed,
+            "avg_batch_size": self.images_processed / self.batches_run if self.batches_run else 0.0,
+        }
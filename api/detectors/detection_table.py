@@ -0,0 +1,236 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Seuil de confiance au-delà duquel une détection est considérée comme réussie.
+SUCCESS_CONFIDENCE = 0.5
+
+# Une ligne par détection ; les colonnes de frame valent 0 pour une image seule
+# et `track_id` vaut 0 hors suivi (les pistes sont numérotées à partir de 1).
+DETECTION_DTYPE = np.dtype([
+    ("frame_number", np.int32),
+    ("timestamp", np.float64),
+    ("source_frame", np.int32),
+    ("class_id", np.int16),
+    ("confidence", np.float32),
+    ("x1", np.float32),
+    ("y1", np.float32),
+    ("x2", np.float32),
+    ("y2", np.float32),
+    ("track_id", np.int32),
+])
+
+# Colonnes exportées (Parquet, Arrow), dans l'ordre historique du CSV.
+EXPORT_COLUMNS = ["class_name", "confidence", "x1", "y1", "x2", "y2", "frame_number", "timestamp", "result", "source_frame", "track_id"]
+# Le CSV garde ses colonnes historiques : les lecteurs existants ne voient pas de changement de schéma.
+CSV_COLUMNS = EXPORT_COLUMNS[:9]
+
+# Extension et type MIME de chaque format d'export des détections.
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+class DetectionTable:
+    """
+    Détections stockées en colonnes dans un tableau structuré NumPy.
+
+    Le tableau est rempli directement depuis les tenseurs du modèle, sans
+    passer par un dictionnaire par détection. Les noms de classes ne sont
+    stockés qu'une fois (`class_names`), chaque ligne ne gardant que
+    `class_id`. La table se comporte comme une séquence de détections :
+    `table[0]["result"]`, `len(table)` et l'itération renvoient les mêmes
+    dictionnaires qu'auparavant, construits à la demande.
+    """
+
+    __slots__ = ("rows", "class_names")
+
+    def __init__(self, rows: Optional[np.ndarray] = None, class_names: Sequence[str] = ()):
+        self.rows = np.empty(0, dtype=DETECTION_DTYPE) if rows is None else rows
+        self.class_names = tuple(class_names)
+
+    @staticmethod
+    def class_names_from_model(names) -> tuple:
+        """Convertit `model.names` (dict id -> nom ou liste) en tuple indexé par id."""
+        if isinstance(names, dict):
+            size = max(names) + 1 if names else 0
+            return tuple(names.get(i, str(i)) for i in range(size))
+        return tuple(names)
+
+    @classmethod
+    def from_boxes(cls, boxes, class_names: Sequence[str], scale: tuple = (1.0, 1.0)) -> "DetectionTable":
+        """
+        Construit la table à partir de `Results.boxes` (un transfert par tenseur).
+
+        `scale` est le facteur `(sx, sy)` appliqué à l'image avant l'inférence :
+        les boîtes sont ramenées dans les coordonnées de l'image d'origine.
+        """
+        if boxes is None or len(boxes) == 0:
+            return cls(class_names=class_names)
+        xyxy = boxes.xyxy.cpu().numpy()
+        if scale != (1.0, 1.0):
+            xyxy = xyxy / np.array([scale[0], scale[1], scale[0], scale[1]], dtype=np.float32)
+        rows = np.zeros(len(xyxy), dtype=DETECTION_DTYPE)
+        # Troncature identique à l'ancien int() sur chaque coordonnée.
+        coordinates = np.trunc(xyxy)
+        rows["x1"], rows["y1"], rows["x2"], rows["y2"] = coordinates.T
+        rows["confidence"] = boxes.conf.cpu().numpy()
+        rows["class_id"] = boxes.cls.cpu().numpy()
+        return cls(rows, class_names)
+
+    @classmethod
+    def from_records(cls, detections: Iterable[Dict], class_names: Sequence[str] = ()) -> "DetectionTable":
+        """Construit la table à partir de détections sous forme de dictionnaires."""
+        detections = list(detections)
+        names = list(class_names)
+        index = {name: i for i, name in enumerate(names)}
+        rows = np.zeros(len(detections), dtype=DETECTION_DTYPE)
+        for row, det in zip(rows, detections):
+            if det["class_name"] not in index:
+                index[det["class_name"]] = len(names)
+                names.append(det["class_name"])
+            row["class_id"] = index[det["class_name"]]
+            row["confidence"] = det["confidence"]
+            row["x1"], row["y1"], row["x2"], row["y2"] = det["bbox"]
+            row["frame_number"] = det.get("frame_number", 0)
+            row["timestamp"] = det.get("timestamp", 0.0)
+            row["source_frame"] = det.get("source_frame", det.get("frame_number", 0))
+            row["track_id"] = det.get("track_id", 0)
+        return cls(rows, names)
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> "DetectionTable":
+        """Reconstruit la table depuis une table Arrow produite par `to_arrow` (export relu)."""
+        class_name = table.column("class_name").combine_chunks()
+        if pa.types.is_dictionary(class_name.type):
+            names = class_name.dictionary.to_pylist()
+            class_ids = class_name.indices.to_numpy(zero_copy_only=False)
+        else:
+            index = {}
+            class_ids = [index.setdefault(name, len(index)) for name in class_name.to_pylist()]
+            names = list(index)
+        rows = np.zeros(table.num_rows, dtype=DETECTION_DTYPE)
+        rows["class_id"] = class_ids
+        for name in DETECTION_DTYPE.names:
+            if name != "class_id" and name in table.column_names:
+                rows[name] = table.column(name).to_numpy()
+        return cls(rows, names)
+
+    @classmethod
+    def read(cls, input_path: str, input_format: str) -> "DetectionTable":
+        """Relit un export `parquet` ou `arrow` écrit par `write`."""
+        if input_format == "parquet":
+            return cls.from_arrow(pq.read_table(input_path))
+        if input_format == "arrow":
+            return cls.from_arrow(feather.read_table(input_path))
+        raise ValueError(f"Format de lecture non supporté : {input_format}")
+
+    @classmethod
+    def concatenate(cls, tables: Sequence["DetectionTable"], class_names: Sequence[str] = ()) -> "DetectionTable":
+        if not tables:
+            return cls(class_names=class_names)
+        return cls(np.concatenate([table.rows for table in tables]), tables[0].class_names or class_names)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __bool__(self) -> bool:
+        return len(self.rows) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self._record(self.rows[index])
+        return DetectionTable(self.rows[index], self.class_names)
+
+    def __iter__(self):
+        for row in self.rows:
+            yield self._record(row)
+
+    @property
+    def confidence(self) -> np.ndarray:
+        return self.rows["confidence"]
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        """Boîtes au format (N, 4) x1, y1, x2, y2."""
+        return np.stack([self.rows["x1"], self.rows["y1"], self.rows["x2"], self.rows["y2"]], axis=1)
+
+    def mean_confidence(self) -> float:
+        return float(self.rows["confidence"].mean(dtype=np.float64)) if len(self.rows) else 0.0
+
+    def results(self) -> np.ndarray:
+        return np.where(self.rows["confidence"] > SUCCESS_CONFIDENCE, "success", "failure")
+
+    def _class_name(self, class_id: int) -> str:
+        return self.class_names[class_id] if 0 <= class_id < len(self.class_names) else str(class_id)
+
+    def _record(self, row, frame_fields: bool = True) -> Dict:
+        confidence = float(row["confidence"])
+        record = {
+            "class_name": self._class_name(int(row["class_id"])),
+            "confidence": confidence,
+            "bbox": [float(row["x1"]), float(row["y1"]), float(row["x2"]), float(row["y2"])],
+            "result": "success" if confidence > SUCCESS_CONFIDENCE else "failure",
+        }
+        if row["track_id"] > 0:
+            record["track_id"] = int(row["track_id"])
+        if frame_fields:
+            record.update({
+                "frame_number": int(row["frame_number"]),
+                "timestamp": float(row["timestamp"]),
+                "source_frame": int(row["source_frame"]),
+            })
+        return record
+
+    def to_records(self, frame_fields: bool = True) -> List[Dict]:
+        """Détections sous forme de dictionnaires (réponses JSON, code existant)."""
+        return [self._record(row, frame_fields) for row in self.rows]
+
+    def to_arrow(self) -> pa.Table:
+        """Table Arrow construite colonne par colonne ; `class_name` et `result` sont encodées en dictionnaire."""
+        class_ids = self.rows["class_id"].astype(np.int32)
+        names = list(self.class_names)
+        if len(class_ids):
+            names += [str(i) for i in range(len(names), int(class_ids.max()) + 1)]
+        columns = {
+            "class_name": pa.DictionaryArray.from_arrays(pa.array(class_ids), pa.array(names, type=pa.string())),
+            "confidence": self.rows["confidence"],
+            "x1": self.rows["x1"],
+            "y1": self.rows["y1"],
+            "x2": self.rows["x2"],
+            "y2": self.rows["y2"],
+            "frame_number": self.rows["frame_number"],
+            "timestamp": self.rows["timestamp"],
+            "result": pa.DictionaryArray.from_arrays(
+                pa.array((self.rows["confidence"] <= SUCCESS_CONFIDENCE).astype(np.int8)),
+                pa.array(["success", "failure"])
+            ),
+            "source_frame": self.rows["source_frame"],
+            "track_id": self.rows["track_id"],
+        }
+        # Les champs d'un tableau structuré sont strided : une copie contiguë par colonne suffit.
+        return pa.table({
+            name: pa.array(np.ascontiguousarray(column)) if isinstance(column, np.ndarray) else column
+            for name, column in columns.items()
+        })
+
+    def to_dataframe(self, columns: Sequence[str] = EXPORT_COLUMNS) -> pd.DataFrame:
+        return self.to_arrow().to_pandas()[list(columns)]
+
+    def write(self, output_path: str, output_format: str) -> str:
+        """Écrit les détections au format `csv`, `parquet` ou `arrow` (fichier IPC)."""
+        if output_format == "csv":
+            self.to_dataframe(CSV_COLUMNS).to_csv(output_path, index=False)
+        elif output_format == "parquet":
+            pq.write_table(self.to_arrow(), output_path)
+        elif output_format == "arrow":
+            feather.write_feather(self.to_arrow(), output_path, compression="uncompressed")
+        else:
+            raise ValueError(f"Format d'export non supporté : {output_format}")
+        return output_path
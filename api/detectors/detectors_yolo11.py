@@ -1,65 +1,166 @@
-from ultralytics import YOLO
 import os
 import cv2
 import numpy as np
-import pandas as pd
 from typing import List, Dict, Optional
 import time
-import torch
+import queue
+import shutil
+import tempfile
+import threading
+
+from api.detectors.video_sampling import SamplingPolicy, expand_table, nearest_analysed_frames
+from api.detectors.video_segments import VIDEO_SEGMENTS, plan_segments, segment_runner, relink_tracks, concat_videos
+from api.detectors.tracking import Tracker, tracked_table, summarize_tracks
+from api.detectors.detection_table import DetectionTable
+from api.detectors.inference_backends import (
+    InferenceBackend, DEFAULT_BACKEND, DEFAULT_MODEL_PATH, DEFAULT_PRECISION, PRECISIONS, check_precision, reference_frames
+)
+from api.detectors.video_pipeline import VideoPipeline, FrameBatch
+from api.detectors.preprocessing import Preprocessor, DEFAULT_CONF, validate_imgsz
+from api.metrics import observe_stage, observe_inference
+
+
+# Nombre de frames décodées puis envoyées ensemble au modèle dans process_video.
+VIDEO_BATCH_SIZE = int(os.getenv("YOLO_VIDEO_BATCH_SIZE", "8"))
+
+# Pipeline décodage -> inférence -> annotation -> encodage, un thread par étage.
+VIDEO_PIPELINE = os.getenv("YOLO_VIDEO_PIPELINE", "1") == "1"
+VIDEO_PIPELINE_QUEUE_SIZE = int(os.getenv("YOLO_VIDEO_PIPELINE_QUEUE_SIZE", "2"))
+
+# Extension et paramètre de qualité OpenCV pour chaque format d'image annotée.
+IMAGE_ENCODINGS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+class ProcessingCancelled(RuntimeError):
+    """Levée lorsqu'un traitement est interrompu via son `cancel_event`."""
+
 
 class YOLOv11Detector:
-    def __init__(self, model_path: str = os.path.join(os.path.dirname(__file__), "..", "models", "final_model_yolo11.pt")):
-        if not os.path.exists(model_path):
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, backend: str = DEFAULT_BACKEND, precision: str = DEFAULT_PRECISION,
+                 verify_precision: bool = True):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Mode de précision inconnu : {precision} (attendu : {', '.join(PRECISIONS)})")
+        if not os.path.exists(model_path) and backend == "pytorch":
             raise FileNotFoundError(
                 f"Le modèle YOLOv11 n'a pas été trouvé à l'emplacement : {model_path}\n"
                 f"Veuillez vous assurer que le fichier .pt est présent dans le dossier du projet."
             )
         try:
-            self.model = YOLO(model_path)
-            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-            self.model.to(self.device)
-            self.classes = self.model.names
-            print(f"✅ Modèle chargé avec succès depuis {model_path}")
+            self.backend = InferenceBackend(model_path, backend)
+            self.device = self.backend.device
+            self.classes = self.backend.names
+            self.class_names = DetectionTable.class_names_from_model(self.classes)
+            # Le modèle ultralytics n'est pas sûr entre threads : les appels sont sérialisés.
+            self._inference_lock = threading.Lock()
+            self._preprocessor = Preprocessor()
+            print(f"✅ Modèle chargé avec succès depuis {self.backend.path} (moteur : {backend})")
+            # Un mode réduit n'est activé que si sa dérive sur les vidéos de référence reste tolérable.
+            # Les processus de travail reçoivent le mode déjà validé par le processus parent
+            # (`verify_precision=False`) : le contrôle n'est fait qu'une fois et tous servent la même précision.
+            self.precision_report = None
+            if precision != "fp32" and not verify_precision:
+                self.backend.apply_precision(precision)
+            elif precision != "fp32":
+                self.precision_report = check_precision(self.backend, precision, reference_frames())
+                if self.precision_report["accepted"]:
+                    print(f"✅ Mode de précision {precision} activé ({self.precision_report['latency_ms']} ms/frame "
+                          f"contre {self.precision_report['fp32_latency_ms']} ms en FP32)")
+                else:
+                    print(f"⚠️ Mode de précision {precision} refusé, FP32 conservé : {self.precision_report['reason']}")
+        except FileNotFoundError:
+            raise
         except Exception as e:
             raise RuntimeError(f"❌ Échec du chargement du modèle : {str(e)}")
 
-    def process_image(self, image_np: np.ndarray, output_path: str = None) -> tuple:
-        start_time = time.time()
-        results = self.model(image_np, conf=0.5)
-        detections = []
-        annotated_image = image_np.copy()
-        confidences = []
+    @property
+    def model(self):
+        return self.backend.model
 
-        for r in results:
-            for box in r.boxes:
-                try:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    confidence = float(box.conf[0])
-                    class_id = int(box.cls[0])
-                    class_name = self.classes[class_id]
-                    result = "success" if confidence > 0.5 else "failure"
-
-                    detections.append({
-                        "class_name": class_name,
-                        "confidence": confidence,
-                        "bbox": [float(x1), float(y1), float(x2), float(y2)],
-                        "result": result
-                    })
-                    confidences.append(confidence)
-
-                    if output_path:
-                        cv2.rectangle(annotated_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                        label = f"{class_name} {confidence:.2f}"
-                        text_y = max(y1 - 10, 20)
-                        cv2.putText(annotated_image, label, (x1, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
-                except Exception as e:
-                    print(f"Erreur lors du traitement de la boîte : {str(e)}")
-                    continue
+    @property
+    def precision(self) -> str:
+        return self.backend.precision
 
+    @property
+    def model_version(self) -> str:
+        """Identifie les poids, le moteur et la précision effectivement servis (clé du cache de résultats)."""
+        stat = os.stat(self.backend.path)
+        return f"{os.path.basename(self.backend.path)}:{stat.st_size}:{stat.st_mtime_ns}:{self.backend.name}:{self.precision}"
+
+    def _predict(self, source, **kwargs):
+        with self._inference_lock:
+            return self.backend.predict(source, **kwargs)
+
+    def _infer(self, images: List[np.ndarray], imgsz: Optional[int] = None, conf: float = DEFAULT_CONF) -> List[DetectionTable]:
+        """
+        Un seul appel au modèle sur `images`, à la taille d'entrée `imgsz`.
+
+        Les images plus grandes sont d'abord réduites une fois ; les boîtes
+        retournées sont dans les coordonnées des images d'origine.
+        """
+        start = time.perf_counter()
+        prepared, scales, size = self._preprocessor.prepare(images, validate_imgsz(imgsz))
+        prepared_at = time.perf_counter()
+        results = self._predict(prepared, conf=conf, imgsz=size)
+        predicted_at = time.perf_counter()
+        tables = [DetectionTable.from_boxes(r.boxes, self.class_names, scale) for r, scale in zip(results, scales)]
+        observe_inference(results, prepared_at - start, time.perf_counter() - predicted_at)
+        return tables
+
+    def _detection_table(self, r) -> DetectionTable:
+        """Détections d'un résultat ultralytics, en colonnes, lues directement depuis les tenseurs."""
+        return DetectionTable.from_boxes(r.boxes, self.class_names)
+
+    def _parse_result(self, r) -> tuple:
+        """Convertit un résultat ultralytics en liste de détections et de confiances."""
+        table = self._detection_table(r)
+        return table.to_records(frame_fields=False), table.confidence.astype(float).tolist()
+
+    def _draw_detections(self, image: np.ndarray, detections: List[Dict]) -> np.ndarray:
+        start = time.perf_counter()
+        for det in detections:
+            x1, y1, x2, y2 = map(int, det["bbox"])
+            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            label = f"{det['class_name']} {det['confidence']:.2f}"
+            if "track_id" in det:
+                label = f"#{det['track_id']} {label}"
+            text_y = max(y1 - 10, 20)
+            cv2.putText(image, label, (x1, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+        observe_stage("annotate", time.perf_counter() - start)
+        return image
+
+    def annotate_and_encode(self, image_np: np.ndarray, detections: List[Dict], image_format: str = "jpeg", quality: int = 90, rgb_input: bool = False) -> bytes:
+        """
+        Dessine des détections déjà calculées et encode l'image en mémoire.
+
+        Aucune inférence n'est relancée : les détections proviennent du même
+        passage du modèle. `image_format` vaut "jpeg" ou "webp" et `quality`
+        est comprise entre 1 et 100. Les images issues de PIL (RGB) doivent
+        être signalées par `rgb_input=True` pour être converties en BGR.
+        """
+        if image_format not in IMAGE_ENCODINGS:
+            raise ValueError(f"Format d'image non supporté : {image_format}")
+        extension, quality_flag = IMAGE_ENCODINGS[image_format]
+        annotated_image = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR) if rgb_input else image_np.copy()
+        self._draw_detections(annotated_image, detections)
+        start = time.perf_counter()
+        ok, buffer = cv2.imencode(extension, annotated_image, [quality_flag, int(quality)])
+        observe_stage("encode", time.perf_counter() - start)
+        if not ok:
+            raise RuntimeError(f"Échec de l'encodage de l'image au format {image_format}")
+        return buffer.tobytes()
+
+    def process_image(self, image_np: np.ndarray, output_path: str = None, imgsz: Optional[int] = None, conf: float = DEFAULT_CONF) -> tuple:
+        start_time = time.time()
+        table = self._infer([image_np], imgsz, conf)[0]
+        detections = table.to_records(frame_fields=False)
         prediction_time = time.time() - start_time
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        avg_confidence = table.mean_confidence()
 
         if output_path:
+            annotated_image = self._draw_detections(image_np.copy(), detections)
             cv2.imwrite(output_path, annotated_image)
 
         return detections, {
@@ -68,7 +169,239 @@ class YOLOv11Detector:
             "frames_processed": 1
         }
 
-    def process_video(self, video_path: str, output_path: str = None) -> dict:
+    def detect_table(self, image_np: np.ndarray, imgsz: Optional[int] = None, conf: float = DEFAULT_CONF) -> DetectionTable:
+        """Détections d'une image sous forme de `DetectionTable`, sans passer par les dictionnaires."""
+        return self._infer([image_np], imgsz, conf)[0]
+
+    def process_batch(self, images: List[np.ndarray], imgsz: Optional[int] = None, conf: float = DEFAULT_CONF) -> List[tuple]:
+        """
+        Exécute un seul appel au modèle sur plusieurs images.
+
+        Retourne, pour chaque image et dans le même ordre, le tuple
+        `(detections, metrics)` produit par `process_image`.
+        """
+        if not images:
+            return []
+        start_time = time.time()
+        tables = self._infer(list(images), imgsz, conf)
+        prediction_time = time.time() - start_time
+
+        outputs = []
+        for table in tables:
+            outputs.append((table.to_records(frame_fields=False), {
+                "prediction_time": prediction_time,
+                "avg_confidence": table.mean_confidence(),
+                "frames_processed": 1,
+                "batch_size": len(images)
+            }))
+        return outputs
+
+    @staticmethod
+    def _read_into(cap, slot: np.ndarray) -> bool:
+        """Décode la frame suivante directement dans `slot` (tampon préalloué)."""
+        ret, frame = cap.read(slot)
+        if not ret:
+            return False
+        # OpenCV n'écrit en place que si la frame a la taille attendue.
+        if not np.shares_memory(frame, slot):
+            if frame.shape != slot.shape:
+                frame = cv2.resize(frame, (slot.shape[1], slot.shape[0]))
+            slot[...] = frame
+        return True
+
+    def _read_sampled_frames(self, cap, buffer: np.ndarray, policy: SamplingPolicy, frame_number: int, last_frame: Optional[int] = None) -> tuple:
+        """
+        Remplit `buffer` avec les prochaines frames retenues par `policy`.
+
+        Les frames ignorées sans regarder leur contenu sont simplement
+        avancées avec `cap.grab()`. La lecture s'arrête après `last_frame`
+        s'il est fourni. Retourne `(numéros_retenus, dernier_numéro, fin_de_vidéo)`.
+        """
+        selected = []
+        while len(selected) < len(buffer):
+            if last_frame is not None and frame_number >= last_frame:
+                return selected, frame_number, True
+            slot = buffer[len(selected)]
+            next_number = frame_number + 1
+            if policy.needs_pixels:
+                if not self._read_into(cap, slot):
+                    return selected, frame_number, True
+                frame_number = next_number
+                if policy.should_analyse(frame_number, slot):
+                    selected.append(frame_number)
+            elif policy.should_analyse(next_number):
+                if not self._read_into(cap, slot):
+                    return selected, frame_number, True
+                frame_number = next_number
+                selected.append(frame_number)
+            else:
+                if not cap.grab():
+                    return selected, frame_number, True
+                frame_number = next_number
+        return selected, frame_number, False
+
+    @staticmethod
+    def _buffer_pool(count: int, batch_size: int, height: int, width: int) -> queue.Queue:
+        """Tampons préalloués qui circulent entre le décodage et le dernier étage."""
+        pool = queue.Queue()
+        for _ in range(count):
+            pool.put(np.empty((batch_size, height, width, 3), dtype=np.uint8))
+        return pool
+
+    def _decode_batches(self, pipeline: VideoPipeline, cap, pool: queue.Queue, policy: SamplingPolicy, progress: dict, cancel_event=None,
+                        last_frame: Optional[int] = None):
+        """Source du pipeline : lots de frames retenues par `policy`, décodées dans les tampons du pool."""
+        exhausted = False
+        while not exhausted:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ProcessingCancelled(f"Traitement de la vidéo interrompu après {progress['frames']} frames")
+            buffer = pipeline.take(pool)
+            selected, progress["frames"], exhausted = self._read_sampled_frames(cap, buffer, policy, progress["frames"], last_frame)
+            if not selected:
+                pool.put(buffer)
+                continue
+            yield FrameBatch(buffer, selected)
+
+    def _run_frame_pipeline(self, cap, policy: SamplingPolicy, stages: List[tuple], batch_size: int, width: int, height: int,
+                            pipelined: bool, cancel_event=None, first_frame: int = 1, last_frame: Optional[int] = None) -> tuple:
+        """
+        Exécute décodage -> étages sur une capture ouverte.
+
+        Avec `first_frame` / `last_frame`, seules les frames de cet intervalle
+        (numérotées depuis le début de la vidéo) sont lues, après un
+        positionnement direct sur `first_frame`. Le dernier étage rend le
+        tampon au pool. Retourne `(numéro_de_la_dernière_frame_décodée, statistiques_du_pipeline)`.
+        """
+        pool = self._buffer_pool(VIDEO_PIPELINE_QUEUE_SIZE * len(stages) + len(stages) + 1 if pipelined else 1, batch_size, height, width)
+        last_name, last_function = stages[-1]
+
+        def last_stage(batch: FrameBatch):
+            result = last_function(batch)
+            pool.put(batch.buffer)
+            return result
+
+        if first_frame > 1:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame - 1)
+        progress = {"frames": first_frame - 1}
+        pipeline = VideoPipeline("decode", None, stages[:-1] + [(last_name, last_stage)], queue_size=VIDEO_PIPELINE_QUEUE_SIZE, threaded=pipelined)
+        pipeline.source = self._decode_batches(pipeline, cap, pool, policy, progress, cancel_event, last_frame)
+        stats = pipeline.run()
+        return progress["frames"], stats
+
+    def _analyse_video(self, cap, policy: SamplingPolicy, batch_size: int, width: int, height: int, out=None,
+                       cancel_event=None, pipelined: bool = True, progress: Optional[dict] = None,
+                       imgsz: Optional[int] = None, conf: float = DEFAULT_CONF, tracker: Optional[Tracker] = None,
+                       first_frame: int = 1, last_frame: Optional[int] = None) -> tuple:
+        """
+        Passe d'analyse : inférence par lots sur les seules frames retenues.
+
+        Si `out` est fourni (toutes les frames sont analysées), les étages
+        d'annotation et d'encodage suivent l'inférence. Avec un `tracker`, le
+        modèle ne tourne que sur les frames où le suivi le demande (au seuil
+        bas du suivi) et les autres frames reçoivent les pistes propagées.
+        Retourne `({numéro_de_frame: détections}, nombre_de_frames, statistiques)`.
+        """
+        analysed = {}
+
+        def infer(batch: FrameBatch):
+            if tracker is None:
+                batch.detections = self._infer(batch.frames(), imgsz, conf)
+            else:
+                # Chaque décision dépend des pistes de la frame précédente : une frame à la fois.
+                batch.detections = [
+                    tracker.step(frame_number, lambda frame=frame: self._infer([frame], imgsz, tracker.low_conf)[0])
+                    for frame_number, frame in zip(batch.frame_numbers, batch.frames())
+                ]
+            analysed.update(zip(batch.frame_numbers, batch.detections))
+            if progress is not None:
+                progress["frames_done"] = batch.frame_numbers[-1]
+            return batch
+
+        def annotate(batch: FrameBatch):
+            for i, detections in enumerate(batch.detections):
+                self._draw_detections(batch.buffer[i], detections)
+            return batch
+
+        def encode(batch: FrameBatch):
+            start = time.perf_counter()
+            for i in range(batch.size):
+                out.write(batch.buffer[i])
+            observe_stage("encode", time.perf_counter() - start, batch.size)
+            return batch
+
+        stages = [("inference", infer)]
+        if out is not None:
+            stages += [("annotate", annotate), ("encode", encode)]
+        frame_count, stats = self._run_frame_pipeline(cap, policy, stages, batch_size, width, height, pipelined, cancel_event, first_frame, last_frame)
+        return analysed, frame_count, stats
+
+    def _render_video(self, video_path: str, out, analysed: Dict[int, DetectionTable], sources: np.ndarray, batch_size: int,
+                      width: int, height: int, cancel_event=None, pipelined: bool = True, first_frame: int = 1, last_frame: Optional[int] = None) -> dict:
+        """Seconde passe (échantillonnage) : relit la vidéo et dessine les détections de la frame analysée la plus proche."""
+
+        def annotate(batch: FrameBatch):
+            for i, frame_number in enumerate(batch.frame_numbers):
+                if frame_number <= len(sources):
+                    self._draw_detections(batch.buffer[i], analysed[int(sources[frame_number - 1])])
+            return batch
+
+        def encode(batch: FrameBatch):
+            start = time.perf_counter()
+            for i in range(batch.size):
+                out.write(batch.buffer[i])
+            observe_stage("encode", time.perf_counter() - start, batch.size)
+            return batch
+
+        cap = cv2.VideoCapture(video_path)
+        try:
+            _, stats = self._run_frame_pipeline(cap, SamplingPolicy("all"), [("annotate", annotate), ("encode", encode)],
+                                                batch_size, width, height, pipelined, cancel_event, first_frame, last_frame)
+        finally:
+            cap.release()
+        return stats
+
+    def process_video(self, video_path: str, output_path: str = None, cancel_event: Optional[threading.Event] = None,
+                      batch_size: int = VIDEO_BATCH_SIZE, sampling: str = "all", frame_stride: int = 1,
+                      target_fps: Optional[float] = None, pipelined: bool = VIDEO_PIPELINE,
+                      progress: Optional[dict] = None, imgsz: Optional[int] = None, conf: float = DEFAULT_CONF,
+                      segments: int = VIDEO_SEGMENTS) -> dict:
+        """
+        Analyse une vidéo par lots de `batch_size` frames.
+
+        Les frames sont décodées dans un tampon préalloué puis envoyées au
+        modèle en un seul appel par lot. `sampling` ("all", "stride", "fps",
+        "keyframes") limite les frames analysées ; les autres reprennent les
+        détections de la frame analysée la plus proche, si bien que chaque
+        frame conserve son propre `frame_number` et `timestamp`.
+
+        Avec `pipelined`, décodage, inférence, annotation et encodage tournent
+        chacun dans leur thread, reliés par des files bornées ; le résultat
+        contient le débit de chaque étage et l'occupation des files.
+
+        `detections` est une `DetectionTable` (colonnes NumPy) : elle s'indexe
+        comme l'ancienne liste de dictionnaires et s'exporte directement en
+        CSV, Parquet ou Arrow via `save_detections`.
+
+        Avec `sampling="track"`, chaque chien reçoit un `track_id` stable : le
+        modèle ne tourne qu'une frame sur `frame_stride` (ou dès qu'une piste
+        faiblit) et les boîtes sont propagées entre deux détections. Le
+        résultat contient alors `tracks`, la posture agrégée de chaque piste.
+
+        `imgsz` et `conf` fixent la taille d'entrée du modèle et le seuil de
+        confiance ; les frames plus grandes sont réduites une fois dans un
+        tampon réutilisé et les boîtes restent dans les coordonnées d'origine.
+
+        Avec `segments` > 1, une vidéo assez longue est découpée en segments
+        temporels traités chacun par un processus qui a son propre détecteur
+        (voir `video_segments`) ; détections et vidéos annotées sont ensuite
+        réunies avec les `frame_number` et `timestamp` de la vidéo entière.
+
+        Si `progress` est fourni, il reçoit `total_frames`, `frames_done` et
+        `phase` ("analysis" puis "render") au fil du traitement.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size doit être supérieur ou égal à 1")
+        validate_imgsz(imgsz)
         start_time = time.time()
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
@@ -79,74 +412,188 @@ class YOLOv11Detector:
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         duration = total_frames / fps if fps > 0 else 0
-        frame_count = 0
-        confidences = []
-        all_detections = []
+        policy = SamplingPolicy(sampling, frame_stride=frame_stride, target_fps=target_fps, video_fps=fps)
+        tracker = Tracker(self.class_names, detect_every=frame_stride, high_conf=conf, frame_size=(width, height)) if policy.mode == "track" else None
+        if progress is not None:
+            progress.update({"total_frames": total_frames, "frames_done": 0, "phase": "analysis"})
 
-        out = None
-        if output_path:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frame_count += 1
-            detections, _ = self.process_image(frame)
-            for det in detections:
-                det['frame_number'] = frame_count
-                det['timestamp'] = frame_count / fps if fps > 0 else 0
-                confidences.append(det['confidence'])
-                all_detections.append(det)
+        plan = plan_segments(total_frames, segments) if segments > 1 else []
+        if len(plan) > 1:
+            cap.release()
+            options = {"batch_size": batch_size, "sampling": sampling, "frame_stride": frame_stride, "target_fps": target_fps,
+                       "pipelined": pipelined, "imgsz": imgsz, "conf": conf}
+            # Avec échantillonnage, la frame analysée la plus proche peut appartenir au segment voisin :
+            # la vidéo annotée est rendue après la réunion des segments, avec les mêmes sources que les détections.
+            render_after = output_path is not None and not policy.analyses_every_frame
+            analysed, frame_count, pipeline_stats, tracking_stats = self._process_segments(
+                video_path, None if render_after else output_path, plan, fps, (width, height), options, cancel_event, progress
+            )
+            if tracker is not None:
+                detections = tracked_table(analysed, fps, self.class_names)
+            else:
+                sources, detections = expand_table(analysed, frame_count, fps, self.class_names)
+            if render_after:
+                if progress is not None:
+                    progress.update({"frames_done": frame_count, "phase": "render"})
+                out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                try:
+                    pipeline_stats["render"] = self._render_video(video_path, out, analysed, sources, batch_size, width, height, cancel_event, pipelined)
+                finally:
+                    out.release()
+                print(f"✅ Vidéo annotée enregistrée dans : {output_path} ({frame_count} frames)")
+            if progress is not None:
+                progress.update({"frames_done": frame_count, "phase": "done"})
+        else:
+            out = None
+            if output_path:
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
+            try:
+                # Sans échantillonnage, la vidéo annotée est écrite pendant l'analyse ;
+                # sinon elle l'est dans une seconde passe, une fois les frames voisines connues.
+                inline_out = out if policy.analyses_every_frame else None
+                try:
+                    analysed, frame_count, analysis_stats = self._analyse_video(cap, policy, batch_size, width, height, inline_out, cancel_event, pipelined, progress, imgsz, conf, tracker)
+                finally:
+                    cap.release()
+                pipeline_stats = {"analysis": analysis_stats}
+                if tracker is not None:
+                    sources, detections = None, tracked_table(analysed, fps, self.class_names)
+                else:
+                    sources, detections = expand_table(analysed, frame_count, fps, self.class_names)
+                if progress is not None:
+                    progress.update({"frames_done": frame_count, "phase": "render" if out is not None and inline_out is None else "done"})
+                if out is not None and inline_out is None:
+                    pipeline_stats["render"] = self._render_video(video_path, out, analysed, sources, batch_size, width, height, cancel_event, pipelined)
+            finally:
+                if out:
+                    out.release()
             if out:
-                for det in detections:
-                    x1, y1, x2, y2 = map(int, det["bbox"])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    label = f"{det['class_name']} {det['confidence']:.2f}"
-                    text_y = max(y1 - 10, 20)
-                    cv2.putText(frame, label, (x1, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
-                out.write(frame)
-
-        cap.release()
-        if out:
-            out.release()
-            print(f"✅ Vidéo annotée enregistrée dans : {output_path} ({frame_count} frames)")
+                print(f"✅ Vidéo annotée enregistrée dans : {output_path} ({frame_count} frames)")
+            tracking_stats = tracker.stats() if tracker is not None else None
 
         prediction_time = time.time() - start_time
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
 
-        return {
-            "detections": all_detections,
+        result = {
+            "detections": detections,
             "total_frames": frame_count,
             "duration": duration,
             "fps": fps,
             "prediction_time": prediction_time,
-            "avg_confidence": avg_confidence,
-            "frames_processed": frame_count
+            "avg_confidence": detections.mean_confidence(),
+            "frames_processed": frame_count,
+            "frames_analyzed": tracking_stats["detections_run"] if tracking_stats is not None else len(analysed),
+            "sampling": policy.mode,
+            "pipeline": pipeline_stats
         }
+        if tracking_stats is not None:
+            result.update({"tracking": tracking_stats, "tracks": summarize_tracks(detections)})
+        return result
 
-    def save_detections_to_csv(self, detections: List[Dict], output_path: str) -> str:
-        if not detections:
-            df = pd.DataFrame(columns=['class_name', 'confidence', 'x1', 'y1', 'x2', 'y2', 'frame_number', 'timestamp', 'result'])
-        else:
-            csv_data = []
-            for det in detections:
-                row = {
-                    'class_name': det['class_name'],
-                    'confidence': det['confidence'],
-                    'x1': det['bbox'][0],
-                    'y1': det['bbox'][1],
-                    'x2': det['bbox'][2],
-                    'y2': det['bbox'][3],
-                    'frame_number': det.get('frame_number', 0),
-                    'timestamp': det.get('timestamp', 0.0),
-                    'result': det.get('result', '')
-                }
-                csv_data.append(row)
-            df = pd.DataFrame(csv_data)
-        
-        df.to_csv(output_path, index=False)
-        print(f"✅ Détections sauvegardées dans le fichier CSV : {output_path}")
-        return output_path
\ No newline at end of file
+    def _process_segments(self, video_path: str, output_path: Optional[str], plan: List[tuple], fps: float, size: tuple,
+                          options: dict, cancel_event=None, progress: Optional[dict] = None) -> tuple:
+        """
+        Traite les segments de `plan` en parallèle puis réunit leurs résultats.
+
+        Retourne `({numéro_de_frame: détections}, nombre_de_frames, statistiques, statistiques_du_suivi)`.
+        """
+        runner = segment_runner(self.backend.source_path, self.backend.name, self.precision)
+        output_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(os.path.abspath(output_path))) if output_path else None
+        try:
+            results = runner.run(video_path, plan, output_dir, options, cancel_event, progress)
+            if options["sampling"] == "track":
+                relink_tracks([result["analysed"] for result in results])
+            analysed = {}
+            for result in results:
+                analysed.update(result["analysed"])
+            frame_count = max(result["last_frame"] for result in results)
+            stats = {"workers": runner.workers, "segments": [
+                {"first_frame": result["first_frame"], "last_frame": result["last_frame"],
+                 "frames_analyzed": len(result["analysed"]), "processing_time": result["processing_time"]}
+                for result in results
+            ]}
+            if output_dir:
+                if progress is not None:
+                    progress["phase"] = "render"
+                start = time.perf_counter()
+                stats["merge"] = {"method": concat_videos([r["output_path"] for r in results], output_path, fps, size),
+                                  "time": round(time.perf_counter() - start, 3)}
+                print(f"✅ Vidéo annotée enregistrée dans : {output_path} ({frame_count} frames, {len(results)} segments)")
+        finally:
+            if output_dir:
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+        tracking_stats = None
+        if options["sampling"] == "track":
+            detections_run = sum(result["tracking"]["detections_run"] for result in results)
+            frames_propagated = sum(result["tracking"]["frames_propagated"] for result in results)
+            track_ids = np.concatenate([table.rows["track_id"] for table in analysed.values()]) if analysed else np.empty(0)
+            tracking_stats = {
+                "detect_every": options["frame_stride"],
+                "detections_run": detections_run,
+                "frames_propagated": frames_propagated,
+                "detection_ratio": round(detections_run / (detections_run + frames_propagated), 4) if detections_run + frames_propagated else 0.0,
+                "tracks_created": int(len(np.unique(track_ids[track_ids > 0]))),
+            }
+        return analysed, frame_count, stats, tracking_stats
+
+    def process_segment(self, video_path: str, first_frame: int, last_frame: Optional[int], output_path: Optional[str] = None,
+                        cancel_event=None, batch_size: int = VIDEO_BATCH_SIZE, sampling: str = "all", frame_stride: int = 1,
+                        target_fps: Optional[float] = None, pipelined: bool = VIDEO_PIPELINE,
+                        imgsz: Optional[int] = None, conf: float = DEFAULT_CONF) -> dict:
+        """
+        Analyse les frames `first_frame`..`last_frame` d'une vidéo (numérotation de la vidéo entière),
+        jusqu'à la fin de la vidéo si `last_frame` vaut None.
+
+        La capture est positionnée directement sur `first_frame`. Retourne
+        `analysed` ({numéro_de_frame: DetectionTable}), `last_frame` (dernière
+        frame lue) et, en mode suivi, les statistiques du suivi propre au
+        segment. Si `output_path` est fourni, les frames du segment y sont
+        écrites annotées ; avec échantillonnage, elles ne voient que les frames
+        analysées du segment (`process_video` rend alors la vidéo après la réunion).
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Impossible d'ouvrir la vidéo : {video_path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        policy = SamplingPolicy(sampling, frame_stride=frame_stride, target_fps=target_fps, video_fps=fps)
+        tracker = Tracker(self.class_names, detect_every=frame_stride, high_conf=conf, frame_size=(width, height)) if policy.mode == "track" else None
+        out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height)) if output_path else None
+        try:
+            inline_out = out if policy.analyses_every_frame else None
+            try:
+                analysed, frame_count, stats = self._analyse_video(cap, policy, batch_size, width, height, inline_out, cancel_event, pipelined,
+                                                                   None, imgsz, conf, tracker, first_frame, last_frame)
+            finally:
+                cap.release()
+            pipeline_stats = {"analysis": stats}
+            if out is not None and inline_out is None:
+                sources = nearest_analysed_frames(sorted(analysed), frame_count)
+                pipeline_stats["render"] = self._render_video(video_path, out, analysed, sources, batch_size, width, height,
+                                                              cancel_event, pipelined, first_frame, frame_count)
+        finally:
+            if out:
+                out.release()
+        return {
+            "analysed": analysed,
+            "last_frame": frame_count,
+            "tracking": tracker.stats() if tracker is not None else None,
+            "pipeline": pipeline_stats,
+        }
+
+    def save_detections(self, detections, output_path: str, output_format: str = "csv") -> str:
+        """
+        Exporte des détections (`DetectionTable` ou liste de dictionnaires)
+        au format `csv`, `parquet` ou `arrow`, colonne par colonne.
+        """
+        if not isinstance(detections, DetectionTable):
+            detections = DetectionTable.from_records(detections, self.class_names)
+        detections.write(output_path, output_format)
+        print(f"✅ Détections sauvegardées dans le fichier {output_format.upper()} : {output_path}")
+        return output_path
+
+    def save_detections_to_csv(self, detections, output_path: str) -> str:
+        return self.save_detections(detections, output_path, "csv")
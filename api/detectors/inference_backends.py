@@ -0,0 +1,426 @@
+import argparse
+import glob
+import json
+import os
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+from api.detectors.detection_table import DetectionTable
+from api.detectors.tracking import iou_matrix, greedy_match
+
+# Moteur d'inférence utilisé par le détecteur : modèle PyTorch d'origine ou variante exportée.
+DEFAULT_BACKEND = os.getenv("YOLO_BACKEND", "pytorch")
+# Taille d'entrée des modèles exportés (les graphes TorchScript sont figés à cette taille).
+EXPORT_IMGSZ = int(os.getenv("YOLO_EXPORT_IMGSZ", "640"))
+
+# Format d'export ultralytics et extension du fichier produit, par moteur.
+BACKENDS = {
+    "pytorch": (None, ".pt"),
+    "torchscript": ("torchscript", ".torchscript"),
+    "onnx": ("onnx", ".onnx"),
+}
+
+# Modes de précision optionnels : bf16 et compile pour le moteur pytorch, int8 pour le moteur onnx.
+PRECISIONS = ("fp32", "bf16", "compile", "int8")
+DEFAULT_PRECISION = os.getenv("YOLO_PRECISION", "fp32")
+# Garde-fou : au-delà de ces tolérances par rapport au FP32, le mode est refusé.
+PRECISION_MEAN_CONFIDENCE_DRIFT = float(os.getenv("YOLO_PRECISION_MEAN_CONF_DRIFT", "0.05"))
+PRECISION_MIN_IOU = float(os.getenv("YOLO_PRECISION_MIN_IOU", "0.9"))
+PRECISION_MIN_MATCH_RATE = float(os.getenv("YOLO_PRECISION_MIN_MATCH_RATE", "0.95"))
+PRECISION_CHECK_FRAMES = int(os.getenv("YOLO_PRECISION_CHECK_FRAMES", "30"))
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "final_model_yolo11.pt")
+DEFAULT_VIDEOS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "static", "videos")
+
+
+def _check_backend(backend: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Moteur d'inférence inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+
+
+def _check_precision(precision: str):
+    if precision not in PRECISIONS:
+        raise ValueError(f"Mode de précision inconnu : {precision} (attendu : {', '.join(PRECISIONS)})")
+
+
+def exported_model_path(model_path: str, backend: str) -> str:
+    """Chemin du modèle exporté pour `backend`, à côté du checkpoint `.pt`."""
+    _check_backend(backend)
+    return os.path.splitext(model_path)[0] + BACKENDS[backend][1]
+
+
+def quantized_model_path(model_path: str) -> str:
+    """Chemin du graphe ONNX quantifié en INT8."""
+    return os.path.splitext(model_path)[0] + ".int8.onnx"
+
+
+class PrecisionUnavailable(RuntimeError):
+    """Levée lorsqu'un mode de précision n'est pas disponible pour ce moteur ou ce CPU."""
+
+
+class InferenceBackend:
+    """
+    Modèle chargé pour un moteur donné.
+
+    Les trois moteurs passent par `ultralytics.YOLO`, qui gère le
+    prétraitement, la NMS et les objets `Results` : le reste du détecteur ne
+    dépend donc pas du moteur choisi. Les modèles exportés s'exécutent sur
+    CPU (fournisseur `CPUExecutionProvider` pour ONNX Runtime).
+
+    `apply_precision` active un mode réduit : autocast bfloat16 ou
+    `torch.compile` pour le moteur pytorch, graphe quantifié INT8 (dynamique)
+    pour le moteur onnx. `restore_fp32` revient au modèle d'origine.
+    """
+
+    def __init__(self, model_path: str, backend: str = DEFAULT_BACKEND):
+        _check_backend(backend)
+        self.name = backend
+        self.source_path = model_path
+        self.precision = "fp32"
+        self._autocast = False
+        self._eager_module = None
+        self._fp32_model = None
+        self.path = model_path if backend == "pytorch" else exported_model_path(model_path, backend)
+        if not os.path.exists(self.path):
+            hint = "" if backend == "pytorch" else (
+                f"\nExportez-le avec : python -m api.detectors.inference_backends export --backend {backend}"
+            )
+            raise FileNotFoundError(f"Le modèle YOLOv11 n'a pas été trouvé à l'emplacement : {self.path}{hint}")
+        if backend == "pytorch":
+            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            self.model = YOLO(self.path)
+            self.model.to(self.device)
+        else:
+            self.device = 'cpu'
+            self.model = YOLO(self.path, task="detect")
+        self.names = self.model.names
+
+    def predict(self, source, **kwargs):
+        if self.name != "pytorch":
+            kwargs.setdefault("device", self.device)
+            kwargs.setdefault("imgsz", EXPORT_IMGSZ)
+        if self.name == "torchscript":
+            # Graphe tracé à taille fixe : la taille demandée ne peut pas être appliquée.
+            kwargs["imgsz"] = EXPORT_IMGSZ
+        with torch.autocast("cpu", dtype=torch.bfloat16) if self._autocast else nullcontext():
+            return self.model(source, **kwargs)
+
+    def _predictor_model(self):
+        """Réseau utilisé par le prédicteur ultralytics (créé au premier appel)."""
+        if self.model.predictor is None:
+            self.model.predict(np.zeros((EXPORT_IMGSZ, EXPORT_IMGSZ, 3), dtype=np.uint8), verbose=False)
+        return self.model.predictor.model
+
+    def apply_precision(self, precision: str):
+        _check_precision(precision)
+        self.restore_fp32()
+        if precision == "fp32":
+            return
+        if precision in ("bf16", "compile") and self.name != "pytorch":
+            raise PrecisionUnavailable(f"Le mode {precision} nécessite le moteur pytorch")
+        if precision == "bf16":
+            if not torch.ops.mkldnn._is_mkldnn_bf16_supported():
+                raise PrecisionUnavailable("Ce CPU ne prend pas en charge bfloat16")
+            self._autocast = True
+        elif precision == "compile":
+            network = self._predictor_model()
+            self._eager_module = network.model
+            network.model = torch.compile(self._eager_module)
+        elif precision == "int8":
+            if self.name != "onnx":
+                raise PrecisionUnavailable("Le mode int8 nécessite le moteur onnx (YOLO_BACKEND=onnx)")
+            path = quantized_model_path(self.source_path)
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"Le modèle INT8 n'a pas été trouvé à l'emplacement : {path}\n"
+                    f"Exportez-le avec : python -m api.detectors.inference_backends export --backend onnx --int8"
+                )
+            self._fp32_model = self.model
+            self.model = YOLO(path, task="detect")
+        self.precision = precision
+
+    def restore_fp32(self):
+        if self._eager_module is not None:
+            self._predictor_model().model = self._eager_module
+            self._eager_module = None
+        if self._fp32_model is not None:
+            self.model = self._fp32_model
+            self._fp32_model = None
+        self._autocast = False
+        self.precision = "fp32"
+
+
+def export_model(model_path: str, backend: str, imgsz: int = EXPORT_IMGSZ) -> str:
+    """Exporte le checkpoint `.pt` vers `backend` et retourne le chemin du fichier produit."""
+    _check_backend(backend)
+    if backend == "pytorch":
+        return model_path
+    export_format = BACKENDS[backend][0]
+    # ONNX accepte des tailles et lots dynamiques ; TorchScript est tracé à taille fixe.
+    exported = YOLO(model_path).export(format=export_format, imgsz=imgsz, device="cpu", dynamic=backend == "onnx")
+    target = exported_model_path(model_path, backend)
+    if os.path.abspath(exported) != os.path.abspath(target):
+        os.replace(exported, target)
+    return target
+
+
+def quantize_model(model_path: str) -> str:
+    """Quantifie dynamiquement en INT8 les poids du graphe ONNX exporté (ONNX Runtime)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    source = exported_model_path(model_path, "onnx")
+    if not os.path.exists(source):
+        source = export_model(model_path, "onnx")
+    target = quantized_model_path(model_path)
+    quantize_dynamic(source, target, weight_type=QuantType.QUInt8)
+    return target
+
+
+def match_detections(reference: List[Dict], candidate: List[Dict], iou_threshold: float = 0.5) -> dict:
+    """
+    Apparie les détections de deux moteurs sur une même frame.
+
+    Même association que le suivi (`tracking.greedy_match`, par IoU
+    décroissante) ; deux détections de classes différentes ne sont jamais
+    appariées. Retourne le nombre d'appariements, les détections
+    manquantes/en trop et les écarts de confiance.
+    """
+    iou = iou_matrix(np.asarray([det["bbox"] for det in reference], dtype=float).reshape(-1, 4),
+                     np.asarray([det["bbox"] for det in candidate], dtype=float).reshape(-1, 4))
+    if iou.size:
+        same_class = np.array([[r["class_name"] == c["class_name"] for c in candidate] for r in reference])
+        iou = np.where(same_class, iou, 0.0)
+    pairs, _, extra = greedy_match(iou, iou_threshold)
+    return {
+        "matched": len(pairs),
+        "missing": len(reference) - len(pairs),
+        "extra": len(extra),
+        "ious": [float(iou[r, c]) for r, c in pairs],
+        "confidence_deltas": [abs(reference[r]["confidence"] - candidate[c]["confidence"]) for r, c in pairs],
+    }
+
+
+def match_rate(matched: int, missing: int, extra: int) -> float:
+    """Taux d'appariement commun aux rapports : `appariées / (appariées + manquantes + en trop)`."""
+    compared = matched + missing + extra
+    return round(matched / compared, 4) if compared else 1.0
+
+
+def parity_check(model_path: str, backend: str, videos_dir: str = DEFAULT_VIDEOS_DIR, conf: float = 0.5,
+                 iou_threshold: float = 0.5, max_frames: Optional[int] = 100) -> dict:
+    """
+    Compare les détections d'un moteur exporté à celles du modèle PyTorch.
+
+    Chaque vidéo de `videos_dir` est lue (au plus `max_frames` frames) et
+    chaque frame passe par les deux moteurs. Le rapport donne, par vidéo et au
+    total, le taux d'appariement (`match_rate`, détections en trop comprises), l'IoU moyenne, l'écart de confiance maximal
+    et la latence moyenne par frame de chaque moteur.
+    """
+    from api.detectors.detectors_yolo11 import YOLOv11Detector
+
+    reference = YOLOv11Detector(model_path, backend="pytorch")
+    candidate = YOLOv11Detector(model_path, backend=backend)
+    videos = sorted(glob.glob(os.path.join(videos_dir, "*.mp4")))
+    if not videos:
+        raise FileNotFoundError(f"Aucune vidéo .mp4 trouvée dans {videos_dir}")
+
+    totals = {"frames": 0, "reference": 0, "matched": 0, "missing": 0, "extra": 0, "ious": [], "confidence_deltas": []}
+    latency = {"pytorch": 0.0, backend: 0.0}
+    per_video = {}
+    for video_path in videos:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            per_video[os.path.basename(video_path)] = {"error": "lecture impossible"}
+            continue
+        stats = {"frames": 0, "reference": 0, "matched": 0, "missing": 0, "extra": 0}
+        try:
+            while max_frames is None or stats["frames"] < max_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                start = time.perf_counter()
+                expected = reference._parse_result(reference._predict(frame, conf=conf)[0])[0]
+                latency["pytorch"] += time.perf_counter() - start
+                start = time.perf_counter()
+                actual = candidate._parse_result(candidate._predict(frame, conf=conf)[0])[0]
+                latency[backend] += time.perf_counter() - start
+
+                match = match_detections(expected, actual, iou_threshold)
+                stats["frames"] += 1
+                stats["reference"] += len(expected)
+                for key in ("matched", "missing", "extra"):
+                    stats[key] += match[key]
+                totals["ious"] += match["ious"]
+                totals["confidence_deltas"] += match["confidence_deltas"]
+        finally:
+            cap.release()
+        stats["match_rate"] = match_rate(stats["matched"], stats["missing"], stats["extra"])
+        per_video[os.path.basename(video_path)] = stats
+        for key in ("frames", "reference", "matched", "missing", "extra"):
+            totals[key] += stats[key]
+
+    frames = max(totals["frames"], 1)
+    return {
+        "backend": backend,
+        "videos": per_video,
+        "frames": totals["frames"],
+        "match_rate": match_rate(totals["matched"], totals["missing"], totals["extra"]),
+        "missing": totals["missing"],
+        "extra": totals["extra"],
+        "mean_iou": round(float(np.mean(totals["ious"])), 4) if totals["ious"] else None,
+        "max_confidence_delta": round(float(np.max(totals["confidence_deltas"])), 4) if totals["confidence_deltas"] else 0.0,
+        "latency_ms_per_frame": {name: round(1000 * seconds / frames, 2) for name, seconds in latency.items()},
+    }
+
+
+def reference_frames(videos_dir: str = DEFAULT_VIDEOS_DIR, count: int = PRECISION_CHECK_FRAMES, step: int = 15) -> List[np.ndarray]:
+    """Jusqu'à `count` frames réparties sur les vidéos de référence (une toutes les `step` frames)."""
+    videos = sorted(glob.glob(os.path.join(videos_dir, "*.mp4")))
+    per_video = max(1, -(-count // len(videos))) if videos else 0
+    frames = []
+    for video_path in videos:
+        cap = cv2.VideoCapture(video_path)
+        taken = index = 0
+        try:
+            while taken < per_video and len(frames) < count:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if index % step == 0:
+                    frames.append(frame)
+                    taken += 1
+                index += 1
+        finally:
+            cap.release()
+    return frames
+
+
+def _backend_detections(backend: InferenceBackend, frames: List[np.ndarray], conf: float) -> tuple:
+    """Détections de chaque frame et latence moyenne (ms), après un appel de préchauffage."""
+    class_names = DetectionTable.class_names_from_model(backend.names)
+    if frames:
+        backend.predict(frames[0], conf=conf, verbose=False)
+    start = time.perf_counter()
+    detections = [
+        DetectionTable.from_boxes(backend.predict(frame, conf=conf, verbose=False)[0].boxes, class_names).to_records(frame_fields=False)
+        for frame in frames
+    ]
+    latency_ms = round(1000 * (time.perf_counter() - start) / len(frames), 2) if frames else None
+    return detections, latency_ms
+
+
+def check_precision(backend: InferenceBackend, precision: str, frames: List[np.ndarray], conf: float = 0.5,
+                    iou_threshold: float = 0.5, mean_confidence_drift: float = PRECISION_MEAN_CONFIDENCE_DRIFT,
+                    min_iou: float = PRECISION_MIN_IOU, min_match_rate: float = PRECISION_MIN_MATCH_RATE) -> dict:
+    """
+    Active `precision` sur `backend` si sa dérive par rapport au FP32 reste tolérable.
+
+    Les mêmes `frames` passent par le modèle FP32 puis par le mode demandé.
+    Le taux d'appariement est celui de `match_rate` ; la dérive de confiance
+    et l'IoU moyenne portent sur les détections appariées (la dérive maximale
+    est rapportée mais seule la moyenne est comparée à `mean_confidence_drift`). Si une tolérance est
+    dépassée, si le mode est indisponible ou échoue à l'inférence, ou s'il n'y a aucune frame de
+    référence, le mode est refusé et le moteur reste en FP32.
+    """
+    backend.restore_fp32()
+    report = {"precision": precision, "frames": len(frames), "accepted": False}
+    expected, report["fp32_latency_ms"] = _backend_detections(backend, frames, conf)
+    try:
+        backend.apply_precision(precision)
+        # torch.compile et l'autocast bf16 échouent au premier passage avant, pas à l'activation.
+        actual, report["latency_ms"] = _backend_detections(backend, frames, conf)
+    except Exception as e:
+        backend.restore_fp32()
+        report["reason"] = str(e)
+        return report
+
+    matched = missing = extra = 0
+    ious, confidence_deltas = [], []
+    for reference, candidate in zip(expected, actual):
+        match = match_detections(reference, candidate, iou_threshold)
+        matched += match["matched"]
+        missing += match["missing"]
+        extra += match["extra"]
+        ious += match["ious"]
+        confidence_deltas += match["confidence_deltas"]
+    report.update({
+        "detections": sum(len(reference) for reference in expected),
+        "match_rate": match_rate(matched, missing, extra),
+        "missing": missing,
+        "extra": extra,
+        "mean_iou": round(float(np.mean(ious)), 4) if ious else None,
+        "mean_confidence_drift": round(float(np.mean(confidence_deltas)), 4) if confidence_deltas else 0.0,
+        "max_confidence_drift": round(float(np.max(confidence_deltas)), 4) if confidence_deltas else 0.0,
+    })
+
+    reasons = []
+    if not frames:
+        reasons.append("aucune frame de référence disponible")
+    if report["match_rate"] < min_match_rate:
+        reasons.append(f"taux d'appariement {report['match_rate']} < {min_match_rate}")
+    if report["mean_confidence_drift"] > mean_confidence_drift:
+        reasons.append(f"dérive de confiance moyenne {report['mean_confidence_drift']} > {mean_confidence_drift}")
+    if report["mean_iou"] is not None and report["mean_iou"] < min_iou:
+        reasons.append(f"IoU moyenne {report['mean_iou']} < {min_iou}")
+    report["accepted"] = not reasons
+    report["reason"] = "; ".join(reasons) or None
+    if reasons:
+        backend.restore_fp32()
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export des modèles YOLOv11 et contrôle de parité entre moteurs d'inférence.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Checkpoint PyTorch (.pt) de référence")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Exporte le modèle en TorchScript et/ou ONNX")
+    export_parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "pytorch"] + ["all"], default="all")
+    export_parser.add_argument("--imgsz", type=int, default=EXPORT_IMGSZ)
+    export_parser.add_argument("--int8", action="store_true", help="Produit aussi le graphe ONNX quantifié INT8")
+
+    parity_parser = commands.add_parser("parity", help="Compare les détections d'un moteur exporté au modèle PyTorch")
+    parity_parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "pytorch"], required=True)
+    parity_parser.add_argument("--videos", default=DEFAULT_VIDEOS_DIR)
+    parity_parser.add_argument("--conf", type=float, default=0.5)
+    parity_parser.add_argument("--iou", type=float, default=0.5)
+    parity_parser.add_argument("--max-frames", type=int, default=100, help="Frames comparées par vidéo (0 = toutes)")
+    parity_parser.add_argument("--min-match-rate", type=float, default=0.95, help="Échec si le taux d'appariement est inférieur")
+
+    precision_parser = commands.add_parser("precision", help="Mesure la dérive d'un mode de précision par rapport au FP32")
+    precision_parser.add_argument("--mode", choices=[p for p in PRECISIONS if p != "fp32"], required=True)
+    precision_parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    precision_parser.add_argument("--videos", default=DEFAULT_VIDEOS_DIR)
+    precision_parser.add_argument("--frames", type=int, default=PRECISION_CHECK_FRAMES)
+    precision_parser.add_argument("--conf", type=float, default=0.5)
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        backends = [b for b in BACKENDS if b != "pytorch"] if args.backend == "all" else [args.backend]
+        for backend in backends:
+            print(f"✅ Modèle {backend} exporté : {export_model(args.model, backend, args.imgsz)}")
+        if args.int8:
+            print(f"✅ Modèle onnx INT8 exporté : {quantize_model(args.model)}")
+        return 0
+
+    if args.command == "precision":
+        report = check_precision(InferenceBackend(args.model, args.backend), args.mode, reference_frames(args.videos, args.frames), args.conf)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0 if report["accepted"] else 1
+
+    report = parity_check(args.model, args.backend, args.videos, args.conf, args.iou, args.max_frames or None)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if report["match_rate"] < args.min_match_rate:
+        print(f"❌ Parité insuffisante : {report['match_rate']} < {args.min_match_rate}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,215 @@
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import Request
+
+from api.profiling import run_in_context
+
+logger = logging.getLogger(__name__)
+
+# Configuration de l'exécuteur, surchargeable par variables d'environnement.
+DEFAULT_MODE = os.getenv("YOLO_EXECUTOR_MODE", "thread")
+DEFAULT_MAX_WORKERS = int(os.getenv("YOLO_EXECUTOR_WORKERS", "2"))
+IMAGE_TIMEOUT_S = float(os.getenv("YOLO_IMAGE_TIMEOUT_S", "30"))
+VIDEO_TIMEOUT_S = float(os.getenv("YOLO_VIDEO_TIMEOUT_S", "1800"))
+DISCONNECT_POLL_S = 0.5
+
+# Détecteur propre à chaque processus de travail (mode "process" uniquement).
+_worker_detector = None
+
+
+def _init_worker_process(model_path: str, backend: Optional[str] = None, precision: str = "fp32"):
+    """Charge un détecteur dans le processus de travail, avec le moteur et la précision du processus parent."""
+    global _worker_detector
+    from api.detectors.detectors_yolo11 import YOLOv11Detector
+    kwargs = {"backend": backend} if backend else {}
+    _worker_detector = YOLOv11Detector(model_path=model_path, precision=precision, verify_precision=False, **kwargs)
+
+
+def _call_worker_detector(method: str, args: tuple, kwargs: dict):
+    return getattr(_worker_detector, method)(*args, **kwargs)
+
+
+class InferenceTimeout(Exception):
+    """Levée lorsqu'un travail d'inférence dépasse le délai qui lui est imparti."""
+
+
+class ClientDisconnected(Exception):
+    """Levée lorsque le client HTTP s'est déconnecté avant la fin du travail."""
+
+
+class InferenceExecutor:
+    """
+    Exécute les appels au détecteur hors de la boucle d'événements asyncio.
+
+    En mode "thread", les travaux partagent le détecteur de l'application dans
+    un pool de threads borné. En mode "process", chaque processus du pool
+    charge son propre détecteur depuis `model_path`. Les méthodes du détecteur
+    sont désignées par leur nom (ex. "process_image") afin de rester
+    sérialisables d'un processus à l'autre.
+    """
+
+    def __init__(self, detector=None, mode: str = DEFAULT_MODE, max_workers: int = DEFAULT_MAX_WORKERS, model_path: Optional[str] = None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Mode d'exécution inconnu : {mode} (attendu : thread ou process)")
+        if max_workers < 1:
+            raise ValueError("max_workers doit être supérieur ou égal à 1")
+        if mode == "thread" and detector is None:
+            raise ValueError("Le mode thread nécessite un détecteur")
+        if mode == "process" and model_path is None:
+            raise ValueError("Le mode process nécessite le chemin du modèle")
+        self.detector = detector
+        self.mode = mode
+        self.max_workers = max_workers
+        self.model_path = model_path
+        self._pool = None
+        self._manager = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def start(self):
+        if self._pool is not None:
+            return
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        else:
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker_process,
+                initargs=(self.model_path, *self._worker_settings()),
+            )
+            # Les événements d'annulation doivent pouvoir traverser les processus.
+            self._manager = context.Manager()
+        logger.info(f"Exécuteur d'inférence démarré (mode={self.mode}, workers={self.max_workers})")
+
+    def _worker_settings(self) -> tuple:
+        """Moteur et précision du détecteur parent : le contrôle de précision n'est pas refait par processus."""
+        if self.detector is None:
+            return None, "fp32"
+        return self.detector.backend.name, self.detector.precision
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def new_progress(self) -> dict:
+        """Dictionnaire partagé dans lequel un travail peut publier son avancement."""
+        self.start()
+        return self._manager.dict() if self._manager is not None else {}
+
+    def _new_cancel_event(self):
+        return self._manager.Event() if self._manager is not None else threading.Event()
+
+    def _submit(self, method: str, args: tuple, kwargs: dict) -> Future:
+        self.start()
+        if self.mode == "thread":
+            # Le contexte de la requête (ex. profilage en cours) suit le travail dans le thread du pool.
+            return self._pool.submit(contextvars.copy_context().run, run_in_context, getattr(self.detector, method), *args, **kwargs)
+        return self._pool.submit(_call_worker_detector, method, args, kwargs)
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    async def run(self, method: str, *args, timeout: Optional[float] = IMAGE_TIMEOUT_S, request: Optional[Request] = None, cancellable: bool = False, **kwargs):
+        """
+        Soumet `detector.<method>(*args, **kwargs)` au pool et attend son résultat.
+
+        - `timeout` : délai maximal en secondes (None pour aucun délai).
+        - `request` : si fourni, le travail est annulé quand le client se déconnecte.
+        - `cancellable` : transmet un `cancel_event` à la méthode pour qu'elle
+          puisse s'interrompre en cours d'exécution (ex. `process_video`).
+        """
+        cancel_event = None
+        if cancellable:
+            cancel_event = self._new_cancel_event()
+            kwargs["cancel_event"] = cancel_event
+
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+        concurrent_future = self._submit(method, args, kwargs)
+        concurrent_future.add_done_callback(self._on_done)
+        # Annuler le futur asyncio retire le travail s'il est encore en file ;
+        # un travail déjà démarré n'est interrompu que s'il surveille son `cancel_event`.
+        on_abort = cancel_event.set if cancel_event is not None else None
+        return await self.guard(asyncio.wrap_future(concurrent_future), timeout=timeout, request=request, on_abort=on_abort, label=method)
+
+    async def guard(self, awaitable, timeout: Optional[float] = None, request: Optional[Request] = None, on_abort=None, label: str = "inférence"):
+        """
+        Attend `awaitable` en appliquant un délai et l'annulation à la déconnexion du client.
+
+        Utilisé par `run`, mais aussi par les routes qui passent par le
+        planificateur de lots plutôt que directement par l'exécuteur.
+        """
+        task = asyncio.ensure_future(awaitable)
+        watcher = asyncio.create_task(self._watch_disconnect(request)) if request is not None else None
+        try:
+            waiters = {task} if watcher is None else {task, watcher}
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if task in done:
+                return task.result()
+            self._abort(task, on_abort)
+            if watcher is not None and watcher in done:
+                with self._lock:
+                    self.cancelled += 1
+                raise ClientDisconnected(f"Client déconnecté pendant {label}")
+            with self._lock:
+                self.timed_out += 1
+            raise InferenceTimeout(f"{label} a dépassé le délai de {timeout:.0f}s")
+        except asyncio.CancelledError:
+            self._abort(task, on_abort)
+            with self._lock:
+                self.cancelled += 1
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    @staticmethod
+    def _abort(task: asyncio.Future, on_abort):
+        task.cancel()
+        if on_abort is not None:
+            on_abort()
+
+    @staticmethod
+    async def _watch_disconnect(request: Request):
+        while not await request.is_disconnected():
+            await asyncio.sleep(DISCONNECT_POLL_S)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.max_workers),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "cancelled": self.cancelled,
+            }
@@ -0,0 +1,80 @@
+import math
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Pas du réseau : la taille d'entrée doit en être un multiple.
+STRIDE = 32
+# Taille d'entrée par défaut et maximale acceptée par requête (côté le plus long, en pixels).
+DEFAULT_IMGSZ = int(os.getenv("YOLO_IMGSZ", "640"))
+MAX_IMGSZ = int(os.getenv("YOLO_MAX_IMGSZ", "1280"))
+DEFAULT_CONF = float(os.getenv("YOLO_CONF", "0.5"))
+
+
+def validate_imgsz(imgsz: Optional[int]) -> int:
+    """Retourne la taille d'entrée demandée (ou celle par défaut) après validation."""
+    if imgsz is None:
+        return DEFAULT_IMGSZ
+    if imgsz < STRIDE or imgsz > MAX_IMGSZ or imgsz % STRIDE != 0:
+        raise ValueError(f"imgsz doit être un multiple de {STRIDE} compris entre {STRIDE} et {MAX_IMGSZ}")
+    return imgsz
+
+
+def fitted_shape(height: int, width: int, imgsz: int) -> Tuple[int, int]:
+    """Taille de l'image réduite pour que son plus grand côté ne dépasse pas `imgsz` (jamais agrandie)."""
+    scale = min(1.0, imgsz / max(height, width))
+    return max(1, round(height * scale)), max(1, round(width * scale))
+
+
+def model_imgsz(shapes: List[tuple], imgsz: int) -> int:
+    """
+    Taille d'entrée réellement transmise au modèle.
+
+    Des images plus petites que `imgsz` ne sont pas agrandies : le modèle
+    travaille au plus petit multiple du pas qui contient la plus grande image.
+    """
+    largest = max(max(shape[0], shape[1]) for shape in shapes)
+    return min(imgsz, math.ceil(largest / STRIDE) * STRIDE)
+
+
+class Preprocessor:
+    """
+    Réduit une seule fois les images plus grandes que la taille d'entrée.
+
+    La réduction (`INTER_AREA`) se fait dans des tampons conservés par thread
+    et réutilisés d'un appel à l'autre tant que la taille ne change pas ; le
+    letterbox d'ultralytics n'a plus alors qu'à compléter les bords. Pour
+    chaque image, `prepare` retourne aussi le facteur `(sx, sy)` qui permet de
+    ramener les boîtes dans les coordonnées d'origine.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _buffer(self, slot: int, shape: tuple) -> np.ndarray:
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buffer = buffers.get(slot)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[slot] = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def prepare(self, images: List[np.ndarray], imgsz: int) -> tuple:
+        """Retourne `(images_préparées, facteurs_d_échelle, taille_d_entrée_du_modèle)`."""
+        prepared, scales = [], []
+        for slot, image in enumerate(images):
+            height, width = image.shape[:2]
+            new_height, new_width = fitted_shape(height, width, imgsz)
+            if (new_height, new_width) == (height, width):
+                prepared.append(image)
+                scales.append((1.0, 1.0))
+                continue
+            buffer = self._buffer(slot, (new_height, new_width) + image.shape[2:])
+            cv2.resize(image, (new_width, new_height), dst=buffer, interpolation=cv2.INTER_AREA)
+            prepared.append(buffer)
+            scales.append((new_width / width, new_height / height))
+        return prepared, scales, model_imgsz([image.shape for image in prepared], imgsz)
@@ -0,0 +1,254 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from api.detectors.detection_table import DetectionTable
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_VIDEOS_DIR = os.path.join(PROJECT_ROOT, "static", "videos")
+# Dossier de l'index : un manifeste JSON et un fichier Parquet de détections par vidéo.
+DEFAULT_INDEX_DIR = os.getenv("YOLO_REFERENCE_INDEX_DIR", os.path.join(PROJECT_ROOT, "reference_index"))
+MANIFEST_NAME = "manifest.json"
+# À incrémenter si le contenu des entrées change : tout l'index est alors reconstruit.
+INDEX_VERSION = 1
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def reference_video_path(filename: str) -> str:
+    """`video_path` enregistré en base pour un fichier de static/videos (même normalisation que la migration)."""
+    return f"static/videos/{'_'.join(filename.strip().split())}"
+
+
+def posture_from_filename(filename: str) -> str:
+    """Posture attendue d'après le nom du fichier (ex. `chien_a_pieds_2.mp4` -> `a_pieds`)."""
+    base_name = "_".join(filename.strip().split()).removesuffix(".mp4").rstrip("_")
+    return base_name.rsplit("_", 1)[0].replace("chien_", "").replace("chiens_", "").strip()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def summarize_clip(detections: DetectionTable, result: dict, posture: Optional[str] = None) -> dict:
+    """Résumé d'une vidéo de référence : couverture, confiance et classe dominante."""
+    frames = result["total_frames"]
+    class_ids = detections.rows["class_id"]
+    class_counts, class_confidence = {}, {}
+    for class_id in np.unique(class_ids):
+        mask = class_ids == class_id
+        name = detections._class_name(int(class_id))
+        class_counts[name] = int(mask.sum())
+        class_confidence[name] = round(float(detections.confidence[mask].mean(dtype=np.float64)), 4)
+    dominant_class = max(class_counts, key=class_counts.get) if class_counts else None
+    frames_with_detections = int(len(np.unique(detections.rows["frame_number"])))
+    return {
+        "posture": posture,
+        "frames": frames,
+        "fps": result["fps"],
+        "duration": result["duration"],
+        "detections": len(detections),
+        "frames_with_detections": frames_with_detections,
+        "detection_rate": round(frames_with_detections / frames, 4) if frames else 0.0,
+        "mean_confidence": round(detections.mean_confidence(), 4),
+        "success_rate": round(float((detections.results() == "success").mean()), 4) if len(detections) else 0.0,
+        "class_counts": class_counts,
+        "class_mean_confidence": class_confidence,
+        "dominant_class": dominant_class,
+        "matches_posture": dominant_class == posture if dominant_class is not None and posture else None,
+    }
+
+
+class ReferenceIndex:
+    """
+    Détections précalculées des vidéos de référence.
+
+    `manifest.json` associe chaque `video_path` (tel qu'enregistré en base) à
+    l'empreinte SHA-256 du fichier, à la version du modèle et aux options
+    d'inférence utilisées, au résumé de la vidéo et au fichier Parquet qui
+    contient ses détections frame par frame. `build` ne relance le modèle que
+    pour les vidéos nouvelles ou modifiées (ou si le modèle a changé) ; les
+    lectures (`summary`, `detections`) ne touchent jamais au modèle et
+    rechargent le manifeste seulement s'il a été réécrit.
+    """
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR):
+        self.index_dir = index_dir
+        self.manifest_path = os.path.join(index_dir, MANIFEST_NAME)
+        self._entries: Dict[str, dict] = {}
+        self._loaded_mtime = None
+
+    @property
+    def entries(self) -> Dict[str, dict]:
+        self._reload()
+        return self._entries
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            self._entries, self._loaded_mtime = {}, None
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with open(self.manifest_path, encoding="utf-8") as manifest:
+            content = json.load(manifest)
+        self._entries = content.get("videos", {}) if content.get("version") == INDEX_VERSION else {}
+        self._loaded_mtime = mtime
+
+    def get(self, video_path: str) -> Optional[dict]:
+        return self.entries.get(video_path)
+
+    def summary(self, video_path: str) -> Optional[dict]:
+        entry = self.get(video_path)
+        return entry["summary"] if entry else None
+
+    def detections(self, video_path: str) -> Optional[DetectionTable]:
+        """Détections frame par frame d'une vidéo indexée, relues depuis son fichier Parquet."""
+        entry = self.get(video_path)
+        if entry is None:
+            return None
+        return DetectionTable.read(os.path.join(self.index_dir, entry["detections_file"]), "parquet")
+
+    def _save(self, entries: Dict[str, dict]):
+        os.makedirs(self.index_dir, exist_ok=True)
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as manifest:
+            json.dump({"version": INDEX_VERSION, "videos": entries}, manifest, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+        self._loaded_mtime = None
+
+    def _is_current(self, entry: Optional[dict], model_version: str, options: dict) -> bool:
+        return (
+            entry is not None
+            and entry.get("model_version") == model_version
+            and entry.get("options") == options
+            and os.path.exists(os.path.join(self.index_dir, entry["detections_file"]))
+        )
+
+    def build(self, detector, videos_dir: str = DEFAULT_VIDEOS_DIR, force: bool = False,
+              imgsz: Optional[int] = None, conf: float = 0.5) -> dict:
+        """
+        Indexe les vidéos `.mp4` de `videos_dir` avec `detector`.
+
+        Un fichier dont la taille et la date de modification n'ont pas changé
+        n'est pas relu ; sinon son empreinte est recalculée et la vidéo n'est
+        réanalysée que si l'empreinte diffère. Les entrées des vidéos
+        supprimées sont retirées. Retourne les `video_path` indexés, inchangés,
+        retirés et en échec (vidéo illisible).
+        """
+        entries = {} if force else dict(self.entries)
+        model_version = detector.model_version
+        options = {"imgsz": imgsz, "conf": conf}
+        report = {"indexed": [], "unchanged": [], "removed": [], "failed": []}
+        present = set()
+        for filename in sorted(os.listdir(videos_dir)):
+            if not filename.endswith(".mp4"):
+                continue
+            file_path = os.path.join(videos_dir, filename)
+            video_path = reference_video_path(filename)
+            present.add(video_path)
+            stat = os.stat(file_path)
+            entry = entries.get(video_path)
+            if self._is_current(entry, model_version, options):
+                if (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                    report["unchanged"].append(video_path)
+                    continue
+                sha256 = file_sha256(file_path)
+                if sha256 == entry["sha256"]:
+                    entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                    report["unchanged"].append(video_path)
+                    continue
+            else:
+                sha256 = file_sha256(file_path)
+            try:
+                entries[video_path] = self._index_video(detector, file_path, filename, sha256, stat, model_version, options, entry)
+            except Exception as e:
+                # Une vidéo illisible n'empêche pas d'indexer les autres ; son ancienne entrée est conservée.
+                logger.warning(f"Impossible d'indexer la vidéo de référence {filename} : {e}")
+                report["failed"].append(video_path)
+                continue
+            report["indexed"].append(video_path)
+
+        for video_path in sorted(set(entries) - present):
+            self._remove_detections(entries.pop(video_path))
+            report["removed"].append(video_path)
+        self._save(entries)
+        return report
+
+    def _index_video(self, detector, file_path: str, filename: str, sha256: str, stat,
+                     model_version: str, options: dict, previous: Optional[dict]) -> dict:
+        start = time.perf_counter()
+        result = detector.process_video(file_path, None, **options)
+        detections = result["detections"]
+        detections_file = f"{os.path.basename(reference_video_path(filename)).removesuffix('.mp4')}.{sha256[:12]}.parquet"
+        os.makedirs(self.index_dir, exist_ok=True)
+        detections.write(os.path.join(self.index_dir, detections_file), "parquet")
+        if previous is not None and previous["detections_file"] != detections_file:
+            self._remove_detections(previous)
+        logger.info(f"Vidéo de référence indexée : {filename} ({len(detections)} détections, {time.perf_counter() - start:.1f}s)")
+        return {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "model_version": model_version,
+            "options": options,
+            "detections_file": detections_file,
+            "indexed_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "summary": summarize_clip(detections, result, posture_from_filename(filename)),
+        }
+
+    def _remove_detections(self, entry: dict):
+        try:
+            os.remove(os.path.join(self.index_dir, entry["detections_file"]))
+        except OSError:
+            pass
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Index des détections précalculées sur les vidéos de référence.")
+    parser.add_argument("--index", default=DEFAULT_INDEX_DIR, help="Dossier de l'index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Analyse les vidéos nouvelles ou modifiées")
+    build_parser.add_argument("--videos", default=DEFAULT_VIDEOS_DIR)
+    build_parser.add_argument("--model", default=None, help="Checkpoint PyTorch (.pt) ; modèle de l'API par défaut")
+    build_parser.add_argument("--backend", default=None, help="Moteur d'inférence (YOLO_BACKEND par défaut)")
+    build_parser.add_argument("--imgsz", type=int, default=None)
+    build_parser.add_argument("--conf", type=float, default=0.5)
+    build_parser.add_argument("--force", action="store_true", help="Réanalyse toutes les vidéos")
+
+    commands.add_parser("show", help="Affiche le résumé de chaque vidéo indexée")
+
+    args = parser.parse_args(argv)
+    index = ReferenceIndex(args.index)
+    if args.command == "show":
+        print(json.dumps({path: entry["summary"] for path, entry in index.entries.items()}, indent=2, ensure_ascii=False))
+        return 0
+
+    # torch et ultralytics ne sont chargés que pour construire l'index.
+    from api.detectors.detectors_yolo11 import YOLOv11Detector
+    detector_kwargs = {key: value for key, value in (("model_path", args.model), ("backend", args.backend)) if value}
+    report = index.build(YOLOv11Detector(**detector_kwargs), args.videos, force=args.force, imgsz=args.imgsz, conf=args.conf)
+    print(f"✅ Index des vidéos de référence à jour dans {args.index} : {len(report['indexed'])} analysée(s), "
+          f"{len(report['unchanged'])} inchangée(s), {len(report['removed'])} retirée(s)")
+    if report["failed"]:
+        print(f"⚠️ Vidéos non indexées : {', '.join(report['failed'])}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Cache des résultats d'inférence sur image, surchargeable par variables d'environnement.
+RESULT_CACHE_ENABLED = os.getenv("YOLO_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("YOLO_RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_MAX_MB = float(os.getenv("YOLO_RESULT_CACHE_MAX_MB", "64"))
+RESULT_CACHE_TTL_S = float(os.getenv("YOLO_RESULT_CACHE_TTL_S", "300"))
+# Dossier où sont déversées les entrées chassées de la mémoire (désactivé si vide).
+RESULT_CACHE_SPILL_DIR = os.getenv("YOLO_RESULT_CACHE_SPILL_DIR", "")
+RESULT_CACHE_SPILL_MAX_MB = float(os.getenv("YOLO_RESULT_CACHE_SPILL_MAX_MB", "256"))
+
+SPILL_SUFFIX = ".result"
+
+
+class _Flight:
+    """Calcul en cours pour une clé, partagé par toutes les requêtes identiques."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class ResultCache:
+    """
+    Cache des résultats d'inférence, adressé par le contenu de l'image.
+
+    La clé est un condensé BLAKE2 des pixels décodés (forme et type compris),
+    de la version du modèle et des options d'inférence : un même fichier
+    renvoyé, même sous un autre nom, retrouve son résultat sans repasser par
+    le modèle. Les résultats `(detections, metrics)` sont conservés sérialisés,
+    ce qui donne leur taille exacte pour le budget mémoire et garantit que
+    chaque appelant reçoit sa propre copie.
+
+    Les entrées sont chassées par ancienneté d'utilisation (LRU) au-delà de
+    `max_entries` ou de `max_bytes`, et ignorées après `ttl_s` secondes. Si
+    `spill_dir` est fourni, les entrées chassées de la mémoire y sont écrites
+    (dans la limite de `spill_max_bytes`) et remontées en mémoire au prochain
+    accès. Les requêtes identiques en cours de calcul sont regroupées : le
+    modèle ne tourne qu'une fois et toutes reçoivent le résultat.
+
+    Le cache est utilisé depuis la boucle d'événements uniquement.
+    """
+
+    def __init__(self, model_version: str = "", max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+                 max_bytes: int = int(RESULT_CACHE_MAX_MB * 1024 * 1024), ttl_s: float = RESULT_CACHE_TTL_S,
+                 spill_dir: Optional[str] = RESULT_CACHE_SPILL_DIR or None,
+                 spill_max_bytes: int = int(RESULT_CACHE_SPILL_MAX_MB * 1024 * 1024)):
+        if max_entries < 1:
+            raise ValueError("max_entries doit être supérieur ou égal à 1")
+        if max_bytes <= 0 or ttl_s <= 0:
+            raise ValueError("max_bytes et ttl_s doivent être positifs")
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        # clé -> (résultat sérialisé, instant d'expiration), de la moins à la plus récemment utilisée
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        # clé -> (taille, instant d'expiration) des entrées déversées sur disque
+        self._spilled: "OrderedDict[str, tuple]" = OrderedDict()
+        self._spilled_bytes = 0
+        self._inflight = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.spills = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._index_spill_dir()
+
+    def make_key(self, image_np: np.ndarray, options: Optional[dict] = None) -> str:
+        """Condensé des pixels, de la version du modèle et des options d'inférence."""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{self.model_version}|{image_np.shape}|{image_np.dtype}|{sorted((options or {}).items())}".encode())
+        digest.update(memoryview(np.ascontiguousarray(image_np)).cast("B"))
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """Résultat en cache pour `key`, ou None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            blob, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(blob)
+            self._discard(key)
+            self.expirations += 1
+        spilled = self._load_spilled(key)
+        if spilled is not None:
+            blob, expires_at = spilled
+            self.disk_hits += 1
+            self._store(key, blob, expires_at)
+            return pickle.loads(blob)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value):
+        self._store(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.monotonic() + self.ttl_s)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable]):
+        """
+        Retourne le résultat en cache, ou attend `compute()`.
+
+        Un seul calcul est lancé par clé : les appels identiques qui arrivent
+        pendant qu'il tourne l'attendent. Si tous les appelants abandonnent,
+        le calcul est annulé ; une erreur est transmise à tous mais n'est pas
+        mise en cache.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = _Flight(asyncio.ensure_future(self._fill(key, compute)))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return pickle.loads(await asyncio.shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable]) -> bytes:
+        try:
+            blob = pickle.dumps(await compute(), protocol=pickle.HIGHEST_PROTOCOL)
+            self._store(key, blob, time.monotonic() + self.ttl_s)
+            return blob
+        finally:
+            flight = self._inflight.get(key)
+            if flight is not None and flight.task is asyncio.current_task():
+                del self._inflight[key]
+
+    def _store(self, key: str, blob: bytes, expires_at: float):
+        if len(blob) > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (blob, expires_at)
+        self._bytes += len(blob)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest, (old_blob, old_expiry) = self._entries.popitem(last=False)
+            self._bytes -= len(old_blob)
+            if old_expiry <= time.monotonic():
+                self.expirations += 1
+                continue
+            self.evictions += 1
+            self._spill(oldest, old_blob, old_expiry)
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, key + SPILL_SUFFIX)
+
+    def _index_spill_dir(self):
+        """Reprend les entrées déversées lors d'une exécution précédente (les plus anciennes en tête)."""
+        now, wall = time.monotonic(), time.time()
+        files = []
+        for name in os.listdir(self.spill_dir):
+            if name.endswith(SPILL_SUFFIX):
+                path = os.path.join(self.spill_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-len(SPILL_SUFFIX)], stat.st_size, path))
+        for mtime, key, size, path in sorted(files):
+            remaining = mtime + self.ttl_s - wall
+            if remaining <= 0:
+                self._remove_file(path)
+                continue
+            self._spilled[key] = (size, now + remaining)
+            self._spilled_bytes += size
+        self._trim_spill()
+
+    def _spill(self, key: str, blob: bytes, expires_at: float):
+        if not self.spill_dir or len(blob) > self.spill_max_bytes:
+            return
+        try:
+            with open(self._spill_path(key), "wb") as spilled:
+                spilled.write(blob)
+        except OSError as e:
+            logger.warning(f"Impossible de déverser le résultat {key} sur disque : {e}")
+            return
+        self._forget_spilled(key)
+        self._spilled[key] = (len(blob), expires_at)
+        self._spilled_bytes += len(blob)
+        self.spills += 1
+        self._trim_spill()
+
+    def _trim_spill(self):
+        while self._spilled_bytes > self.spill_max_bytes:
+            oldest = next(iter(self._spilled))
+            self._forget_spilled(oldest)
+            self._remove_file(self._spill_path(oldest))
+
+    def _forget_spilled(self, key: str) -> Optional[tuple]:
+        entry = self._spilled.pop(key, None)
+        if entry is not None:
+            self._spilled_bytes -= entry[0]
+        return entry
+
+    def _load_spilled(self, key: str) -> Optional[tuple]:
+        """Relit (et retire du disque) une entrée déversée : `(résultat sérialisé, expiration)`."""
+        entry = self._forget_spilled(key)
+        if entry is None:
+            return None
+        path = self._spill_path(key)
+        try:
+            if entry[1] <= time.monotonic():
+                self.expirations += 1
+                return None
+            with open(path, "rb") as spilled:
+                blob = spilled.read()
+        except OSError as e:
+            logger.warning(f"Impossible de relire le résultat {key} depuis le disque : {e}")
+            return None
+        finally:
+            self._remove_file(path)
+        return blob, entry[1]
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        for key in list(self._spilled):
+            self._forget_spilled(key)
+            self._remove_file(self._spill_path(key))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl_s,
+            "spilled_entries": len(self._spilled),
+            "spilled_bytes": self._spilled_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "spills": self.spills,
+        }
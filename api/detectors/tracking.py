@@ -0,0 +1,262 @@
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from api.detectors.detection_table import DetectionTable, DETECTION_DTYPE
+
+# Paramètres du suivi, surchargeables par variables d'environnement.
+# Seuil bas : les détections entre ce seuil et `conf` ne servent qu'à prolonger une piste existante.
+TRACK_LOW_CONF = float(os.getenv("YOLO_TRACK_LOW_CONF", "0.1"))
+TRACK_MATCH_IOU = float(os.getenv("YOLO_TRACK_MATCH_IOU", "0.3"))
+TRACK_LOW_MATCH_IOU = float(os.getenv("YOLO_TRACK_LOW_MATCH_IOU", "0.5"))
+# Confiance d'une piste propagée : multipliée par ce facteur à chaque frame sans détection.
+TRACK_CONF_DECAY = float(os.getenv("YOLO_TRACK_CONF_DECAY", "0.97"))
+# Une détection complète est relancée dès qu'une piste propagée passe sous ce seuil.
+TRACK_MIN_CONF = float(os.getenv("YOLO_TRACK_MIN_CONF", "0.35"))
+# Nombre de frames pendant lesquelles une piste perdue peut encore être retrouvée.
+TRACK_MAX_AGE = int(os.getenv("YOLO_TRACK_MAX_AGE", "30"))
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """IoU de chaque boîte de `boxes_a` (N, 4) avec chaque boîte de `boxes_b` (M, 4)."""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a, b = boxes_a[:, None, :], boxes_b[None, :, :]
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1e-9)
+
+
+def greedy_match(iou: np.ndarray, threshold: float) -> tuple:
+    """
+    Association par IoU décroissante : chaque piste et chaque détection au plus une fois.
+
+    Retourne `(paires, pistes_libres, détections_libres)`.
+    """
+    pairs = []
+    free_tracks, free_detections = set(range(iou.shape[0])), set(range(iou.shape[1]))
+    for flat in np.argsort(-iou, axis=None):
+        track, detection = np.unravel_index(flat, iou.shape)
+        if iou[track, detection] < threshold:
+            break
+        if track in free_tracks and detection in free_detections:
+            pairs.append((int(track), int(detection)))
+            free_tracks.discard(track)
+            free_detections.discard(detection)
+    return pairs, sorted(free_tracks), sorted(free_detections)
+
+
+class Track:
+    __slots__ = ("track_id", "box", "velocity", "class_id", "confidence", "frame", "detected_box", "detected_frame", "lost")
+
+    def __init__(self, track_id: int, box: np.ndarray, class_id: int, confidence: float, frame: int):
+        self.track_id = track_id
+        self.box = box.astype(np.float64)
+        self.velocity = np.zeros(4)
+        self.class_id = class_id
+        self.confidence = confidence
+        self.frame = frame
+        self.detected_box = self.box.copy()
+        self.detected_frame = frame
+        self.lost = False
+
+    def predict(self, frame: int):
+        """Avance la boîte à vitesse constante jusqu'à `frame`."""
+        self.box = self.box + self.velocity * (frame - self.frame)
+        self.frame = frame
+
+    def update(self, box: np.ndarray, class_id: int, confidence: float, frame: int):
+        elapsed = frame - self.detected_frame
+        if elapsed > 0:
+            measured = (box - self.detected_box) / elapsed
+            self.velocity = measured if not self.velocity.any() else 0.5 * self.velocity + 0.5 * measured
+        self.box = box.astype(np.float64)
+        self.detected_box = self.box.copy()
+        self.detected_frame = self.frame = frame
+        self.class_id = class_id
+        self.confidence = confidence
+        self.lost = False
+
+
+class Tracker:
+    """
+    Suivi multi-objets inspiré de ByteTrack, avec détection intermittente.
+
+    Sur une frame de détection, les pistes (avancées à vitesse constante)
+    sont d'abord associées par IoU aux détections de confiance ≥ `high_conf`,
+    puis les pistes restantes aux détections plus faibles (≥ `low_conf`) :
+    une posture moins nette ne fait pas perdre son identifiant au chien. Les
+    détections fortes non associées ouvrent de nouvelles pistes ; les pistes
+    non retrouvées sont mises de côté pendant `max_age` frames.
+
+    Entre deux détections, `propagate` avance les boîtes sans passer par le
+    modèle. `needs_detection` demande une détection complète toutes les
+    `detect_every` frames, ou plus tôt si la confiance d'une piste, décrue de
+    `decay` par frame propagée, passe sous `min_confidence`. Cette décroissance
+    ne sert qu'à relancer le modèle : une boîte propagée garde la confiance (et
+    donc le `result`) de sa dernière détection, un chien immobile ne bascule
+    pas en échec entre deux détections. Chaque détection renvoyée porte son
+    `track_id` et, dans `source_frame`, la dernière frame réellement détectée.
+
+    L'association ignore la classe : la posture d'un chien peut changer au
+    cours de la vidéo sans qu'il change de piste.
+    """
+
+    def __init__(self, class_names: Sequence[str] = (), detect_every: int = 1, high_conf: float = 0.5,
+                 low_conf: float = TRACK_LOW_CONF, match_iou: float = TRACK_MATCH_IOU, low_match_iou: float = TRACK_LOW_MATCH_IOU,
+                 min_confidence: float = TRACK_MIN_CONF, decay: float = TRACK_CONF_DECAY, max_age: int = TRACK_MAX_AGE,
+                 frame_size: Optional[tuple] = None):
+        if detect_every < 1:
+            raise ValueError("detect_every doit être supérieur ou égal à 1")
+        self.class_names = tuple(class_names)
+        self.detect_every = detect_every
+        self.high_conf = high_conf
+        self.low_conf = min(low_conf, high_conf)
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.min_confidence = min_confidence
+        self.decay = decay
+        self.max_age = max_age
+        self.frame_size = frame_size
+        self.tracks: List[Track] = []
+        self.last_detection_frame: Optional[int] = None
+        self.detections_run = 0
+        self.frames_propagated = 0
+        self._next_id = 1
+
+    @property
+    def active_tracks(self) -> List[Track]:
+        return [track for track in self.tracks if not track.lost]
+
+    def needs_detection(self, frame_number: int) -> bool:
+        if self.last_detection_frame is None or frame_number - self.last_detection_frame >= self.detect_every:
+            return True
+        # Une piste déjà faible à la détection ne relance pas le modèle à chaque frame.
+        return any(
+            track.confidence >= self.min_confidence
+            and track.confidence * self.decay ** (frame_number - track.detected_frame) < self.min_confidence
+            for track in self.active_tracks
+        )
+
+    def update(self, frame_number: int, detections: DetectionTable) -> DetectionTable:
+        """Associe les détections de `frame_number` aux pistes et retourne les pistes actives."""
+        self.detections_run += 1
+        self.last_detection_frame = frame_number
+        if detections.class_names and not self.class_names:
+            self.class_names = detections.class_names
+        for track in self.tracks:
+            track.predict(frame_number)
+
+        boxes = detections.bboxes.astype(np.float64) if len(detections) else np.zeros((0, 4))
+        confidence = detections.confidence
+        high = np.flatnonzero(confidence >= self.high_conf)
+        low = np.flatnonzero((confidence >= self.low_conf) & (confidence < self.high_conf))
+
+        # 1) Toutes les pistes contre les détections fortes.
+        pairs, free_tracks, free_high = greedy_match(
+            iou_matrix(np.array([t.box for t in self.tracks]).reshape(-1, 4), boxes[high]), self.match_iou
+        )
+        for track_index, detection_index in pairs:
+            self._assign(self.tracks[track_index], detections, high[detection_index], frame_number)
+
+        # 2) Pistes restantes contre les détections faibles.
+        remaining = [self.tracks[i] for i in free_tracks]
+        pairs, unmatched, _ = greedy_match(
+            iou_matrix(np.array([t.box for t in remaining]).reshape(-1, 4), boxes[low]), self.low_match_iou
+        )
+        for track_index, detection_index in pairs:
+            self._assign(remaining[track_index], detections, low[detection_index], frame_number)
+        for track_index in unmatched:
+            remaining[track_index].lost = True
+
+        # 3) Nouvelles pistes pour les détections fortes restantes.
+        for detection_index in free_high:
+            row = detections.rows[high[detection_index]]
+            self.tracks.append(Track(self._next_id, boxes[high[detection_index]], int(row["class_id"]), float(row["confidence"]), frame_number))
+            self._next_id += 1
+
+        self.tracks = [t for t in self.tracks if not t.lost or frame_number - t.detected_frame <= self.max_age]
+        return self._table(frame_number)
+
+    def _assign(self, track: Track, detections: DetectionTable, index: int, frame_number: int):
+        row = detections.rows[index]
+        track.update(np.array([row["x1"], row["y1"], row["x2"], row["y2"]], dtype=np.float64),
+                     int(row["class_id"]), float(row["confidence"]), frame_number)
+
+    def propagate(self, frame_number: int) -> DetectionTable:
+        """Pistes actives avancées jusqu'à `frame_number`, sans détection."""
+        self.frames_propagated += 1
+        for track in self.tracks:
+            track.predict(frame_number)
+        return self._table(frame_number)
+
+    def step(self, frame_number: int, detect) -> DetectionTable:
+        """Détecte (via `detect()`) ou propage selon `needs_detection`."""
+        if self.needs_detection(frame_number):
+            return self.update(frame_number, detect())
+        return self.propagate(frame_number)
+
+    def _table(self, frame_number: int) -> DetectionTable:
+        tracks = self.active_tracks
+        rows = np.zeros(len(tracks), dtype=DETECTION_DTYPE)
+        if tracks:
+            boxes = np.array([track.box for track in tracks])
+            if self.frame_size is not None:
+                width, height = self.frame_size
+                boxes = np.clip(boxes, 0, [width, height, width, height])
+            rows["x1"], rows["y1"], rows["x2"], rows["y2"] = np.trunc(boxes).T
+            rows["class_id"] = [track.class_id for track in tracks]
+            rows["confidence"] = [track.confidence for track in tracks]
+            rows["track_id"] = [track.track_id for track in tracks]
+            rows["source_frame"] = [track.detected_frame for track in tracks]
+            rows["frame_number"] = frame_number
+        return DetectionTable(rows, self.class_names)
+
+    def stats(self) -> dict:
+        frames = self.detections_run + self.frames_propagated
+        return {
+            "detect_every": self.detect_every,
+            "detections_run": self.detections_run,
+            "frames_propagated": self.frames_propagated,
+            "detection_ratio": round(self.detections_run / frames, 4) if frames else 0.0,
+            "tracks_created": self._next_id - 1,
+        }
+
+
+def tracked_table(per_frame: Dict[int, DetectionTable], fps: float, class_names=()) -> DetectionTable:
+    """Concatène les sorties du suivi frame par frame et renseigne les horodatages."""
+    table = DetectionTable.concatenate([per_frame[frame] for frame in sorted(per_frame)], class_names)
+    table.rows["timestamp"] = table.rows["frame_number"] / fps if fps > 0 else 0.0
+    return table
+
+
+def summarize_tracks(detections: DetectionTable) -> List[dict]:
+    """
+    Posture de chaque chien suivi, agrégée sur toute la vidéo.
+
+    Pour chaque piste : première et dernière frame, nombre de frames,
+    classe majoritaire (pondérée par la confiance) et répartition des classes.
+    """
+    summaries = []
+    rows = detections.rows[detections.rows["track_id"] > 0]
+    for track_id in np.unique(rows["track_id"]):
+        track_rows = rows[rows["track_id"] == track_id]
+        class_ids, inverse = np.unique(track_rows["class_id"], return_inverse=True)
+        weights = np.bincount(inverse, weights=track_rows["confidence"].astype(np.float64))
+        counts = np.bincount(inverse)
+        names = [detections._class_name(int(class_id)) for class_id in class_ids]
+        summaries.append({
+            "track_id": int(track_id),
+            "first_frame": int(track_rows["frame_number"].min()),
+            "last_frame": int(track_rows["frame_number"].max()),
+            "frames": len(track_rows),
+            "detected_frames": int(len(np.unique(track_rows["source_frame"]))),
+            "class_name": names[int(np.argmax(weights))],
+            "mean_confidence": round(float(track_rows["confidence"].mean(dtype=np.float64)), 4),
+            "class_frames": {name: int(count) for name, count in zip(names, counts)},
+        })
+    return summaries
@@ -0,0 +1,255 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterator, List, Tuple
+
+# Délai de scrutation des files, pour réagir rapidement à l'échec d'un étage.
+_POLL_S = 0.1
+
+
+class _End:
+    """Marqueur de fin de flux propagé d'un étage à l'autre."""
+
+
+_END = _End()
+
+
+class FrameBatch:
+    """Lot de frames décodées dans un tampon partagé, transmis d'étage en étage."""
+
+    __slots__ = ("buffer", "frame_numbers", "detections")
+
+    def __init__(self, buffer, frame_numbers: List[int]):
+        self.buffer = buffer
+        self.frame_numbers = frame_numbers
+        self.detections = None
+
+    @property
+    def size(self) -> int:
+        return len(self.frame_numbers)
+
+    def frames(self) -> list:
+        return [self.buffer[i] for i in range(self.size)]
+
+
+class PipelineStageError(RuntimeError):
+    """Levée dans un étage en attente lorsque le pipeline a été interrompu par un autre étage."""
+
+
+class _StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.frames = 0
+        self.busy_s = 0.0
+        self.wait_s = 0.0
+
+    def to_dict(self, wall_time_s: float) -> dict:
+        return {
+            "items": self.items,
+            "frames": self.frames,
+            "busy_s": round(self.busy_s, 4),
+            "wait_s": round(self.wait_s, 4),
+            # Débit propre de l'étage s'il était seul à tourner.
+            "throughput_fps": round(self.frames / self.busy_s, 2) if self.busy_s > 0 else None,
+            "utilization": round(self.busy_s / wall_time_s, 3) if wall_time_s > 0 else 0.0,
+        }
+
+
+class _QueueStats:
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.samples = 0
+        self.total = 0
+        self.peak = 0
+
+    def sample(self, size: int):
+        self.samples += 1
+        self.total += size
+        self.peak = max(self.peak, size)
+
+    def to_dict(self) -> dict:
+        return {
+            "capacity": self.maxsize,
+            "avg_occupancy": round(self.total / self.samples, 2) if self.samples else 0.0,
+            "peak_occupancy": self.peak,
+        }
+
+
+class VideoPipeline:
+    """
+    Enchaîne une source et des étages de traitement reliés par des files bornées.
+
+    La source est un itérateur (ex. le décodage des frames) ; chaque étage est
+    une fonction `item -> item`. En mode threadé, chaque étage tourne dans son
+    propre thread et les files de taille `queue_size` assurent la contre-pression :
+    le décodage avance pendant l'inférence, l'encodage pendant le décodage, etc.
+    En mode séquentiel, les mêmes étages sont appelés l'un après l'autre, ce qui
+    donne des temps par étage comparables.
+
+    Les éléments peuvent exposer un attribut `size` (nombre de frames) pour que
+    le débit soit exprimé en frames par seconde.
+    """
+
+    def __init__(self, source_name: str, source: Iterator, stages: List[Tuple[str, Callable]], queue_size: int = 4, threaded: bool = True):
+        if queue_size < 1:
+            raise ValueError("queue_size doit être supérieur ou égal à 1")
+        self.source_name = source_name
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        self.threaded = threaded
+        self._stats = [_StageStats(source_name)] + [_StageStats(name) for name, _ in stages]
+        self._queue_stats = [_QueueStats(f"{source_name}->{stages[0][0]}", queue_size)] + [
+            _QueueStats(f"{stages[i][0]}->{stages[i + 1][0]}", queue_size) for i in range(len(stages) - 1)
+        ] if stages else []
+        self._failed = threading.Event()
+        self._errors = []
+        self._source_wait_s = 0.0
+
+    def take(self, source_queue: queue.Queue):
+        """
+        Prend un élément d'une file annexe (ex. pool de tampons) depuis la source.
+
+        Le temps d'attente est décompté du temps actif de la source, et
+        l'attente s'interrompt si un autre étage a échoué.
+        """
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return source_queue.get(timeout=_POLL_S)
+                except queue.Empty:
+                    if self._failed.is_set():
+                        raise PipelineStageError("Pipeline interrompu")
+        finally:
+            self._source_wait_s += time.perf_counter() - start
+
+    def run(self) -> dict:
+        start = time.perf_counter()
+        if self.threaded and self.stages:
+            self._run_threaded()
+        else:
+            self._run_sequential()
+        wall_time_s = time.perf_counter() - start
+        if self._errors:
+            raise self._errors[0]
+        return self._report(wall_time_s)
+
+    def _run_sequential(self):
+        source_stats = self._stats[0]
+        iterator = iter(self.source)
+        while True:
+            item = self._next_source_item(iterator, source_stats)
+            if item is _END:
+                break
+            for (_, function), stats in zip(self.stages, self._stats[1:]):
+                item = self._timed(function, item, stats)
+
+    def _next_source_item(self, iterator, stats: _StageStats):
+        wait_before = self._source_wait_s
+        begin = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return _END
+        finally:
+            waited = self._source_wait_s - wait_before
+            stats.busy_s += time.perf_counter() - begin - waited
+            stats.wait_s += waited
+        stats.items += 1
+        stats.frames += getattr(item, "size", 1)
+        return item
+
+    @staticmethod
+    def _timed(function: Callable, item, stats: _StageStats):
+        begin = time.perf_counter()
+        result = function(item)
+        stats.busy_s += time.perf_counter() - begin
+        stats.items += 1
+        stats.frames += getattr(item, "size", 1)
+        return result
+
+    def _put(self, target: queue.Queue, item, stats: _StageStats, queue_stats: _QueueStats):
+        begin = time.perf_counter()
+        while not self._failed.is_set():
+            try:
+                target.put(item, timeout=_POLL_S)
+                queue_stats.sample(target.qsize())
+                break
+            except queue.Full:
+                continue
+        stats.wait_s += time.perf_counter() - begin
+
+    def _get(self, source_queue: queue.Queue, stats: _StageStats):
+        begin = time.perf_counter()
+        try:
+            while not self._failed.is_set():
+                try:
+                    return source_queue.get(timeout=_POLL_S)
+                except queue.Empty:
+                    continue
+            return _END
+        finally:
+            stats.wait_s += time.perf_counter() - begin
+
+    def _fail(self, name: str, error: Exception):
+        # Seule la première erreur est conservée : les suivantes découlent de l'interruption.
+        if not self._errors:
+            self._errors.append(error)
+        self._failed.set()
+
+    def _run_threaded(self):
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+
+        def source_worker():
+            stats = self._stats[0]
+            iterator = iter(self.source)
+            try:
+                while not self._failed.is_set():
+                    item = self._next_source_item(iterator, stats)
+                    self._put(queues[0], item, stats, self._queue_stats[0])
+                    if item is _END:
+                        break
+            except Exception as e:
+                self._fail(self.source_name, e)
+
+        def stage_worker(index: int):
+            name, function = self.stages[index]
+            stats = self._stats[index + 1]
+            output = queues[index + 1] if index + 1 < len(queues) else None
+            try:
+                while not self._failed.is_set():
+                    item = self._get(queues[index], stats)
+                    if item is _END:
+                        if output is not None:
+                            self._put(output, _END, stats, self._queue_stats[index + 1])
+                        break
+                    result = self._timed(function, item, stats)
+                    if output is not None:
+                        self._put(output, result, stats, self._queue_stats[index + 1])
+            except Exception as e:
+                self._fail(name, e)
+
+        threads = [threading.Thread(target=source_worker, name=f"pipeline-{self.source_name}", daemon=True)]
+        threads += [
+            threading.Thread(target=stage_worker, args=(i,), name=f"pipeline-{name}", daemon=True)
+            for i, (name, _) in enumerate(self.stages)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _report(self, wall_time_s: float) -> dict:
+        stages = {stats.name: stats.to_dict(wall_time_s) for stats in self._stats}
+        bottleneck = max(self._stats, key=lambda stats: stats.busy_s).name if self._stats else None
+        return {
+            "threaded": self.threaded and bool(self.stages),
+            "wall_time_s": round(wall_time_s, 4),
+            "bottleneck": bottleneck,
+            "stages": stages,
+            "queues": {q.name: q.to_dict() for q in self._queue_stats} if self.threaded else {},
+        }
+
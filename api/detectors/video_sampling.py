@@ -0,0 +1,172 @@
+import bisect
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from api.detectors.detection_table import DetectionTable
+
+SAMPLING_MODES = ("all", "stride", "fps", "keyframes", "track")
+
+# Largeur de la vignette en niveaux de gris utilisée pour détecter les changements de plan.
+KEYFRAME_THUMBNAIL_WIDTH = 64
+DEFAULT_KEYFRAME_THRESHOLD = 12.0
+
+
+def thumbnail(frame: np.ndarray, width: int = KEYFRAME_THUMBNAIL_WIDTH) -> np.ndarray:
+    """Image en niveaux de gris réduite à `width` pixels de large (la réduction lisse le bruit)."""
+    height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+    small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+
+def thumbnail_change(small: np.ndarray, reference: np.ndarray, pixel_delta: Optional[int] = None) -> float:
+    """
+    Écart entre deux vignettes de même taille (voir `thumbnail`).
+
+    Sans `pixel_delta` : écart moyen de niveau de gris. Avec : part des
+    pixels dont le niveau a changé de plus de `pixel_delta`.
+    """
+    difference = cv2.absdiff(small, reference)
+    if pixel_delta is None:
+        return float(np.mean(difference))
+    return float(np.count_nonzero(difference > pixel_delta)) / difference.size
+
+
+class SamplingPolicy:
+    """
+    Décide quelles frames d'une vidéo passent réellement par le modèle.
+
+    - "all" : toutes les frames (comportement historique).
+    - "stride" : une frame sur `frame_stride`.
+    - "fps" : environ `target_fps` frames analysées par seconde de vidéo.
+    - "keyframes" : la première frame, puis chaque frame dont le contenu
+      s'écarte suffisamment de la dernière frame analysée. OpenCV n'exposant
+      pas les images clés du codec, elles sont détectées sur le contenu, avec
+      au plus `max_gap` frames entre deux analyses.
+    - "track" : toutes les frames reçoivent des détections, mais le modèle ne
+      tourne qu'une frame sur `frame_stride` (ou plus tôt si une piste faiblit) ;
+      les autres sont propagées par le suivi (voir `tracking.Tracker`).
+
+    Les indices de frame sont numérotés à partir de 1, comme `frame_number`.
+    """
+
+    def __init__(self, mode: str = "all", frame_stride: int = 1, target_fps: Optional[float] = None,
+                 video_fps: float = 0.0, keyframe_threshold: float = DEFAULT_KEYFRAME_THRESHOLD, max_gap: Optional[int] = None):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Mode d'échantillonnage inconnu : {mode} (attendu : {', '.join(SAMPLING_MODES)})")
+        if frame_stride < 1:
+            raise ValueError("frame_stride doit être supérieur ou égal à 1")
+        if mode == "fps" and (target_fps is None or target_fps <= 0):
+            raise ValueError("Le mode fps nécessite un target_fps strictement positif")
+        self.mode = mode
+        self.frame_stride = frame_stride
+        self.target_fps = target_fps
+        self.video_fps = video_fps
+        self.keyframe_threshold = keyframe_threshold
+        self.max_gap = max_gap or max(1, int(round(2 * video_fps)) if video_fps > 0 else 50)
+        self._last_thumbnail = None
+        self._last_analysed = 0
+
+    @property
+    def analyses_every_frame(self) -> bool:
+        if self.mode in ("all", "track"):
+            return True
+        if self.mode == "stride":
+            return self.frame_stride == 1
+        if self.mode == "fps":
+            return self.video_fps <= 0 or self.target_fps >= self.video_fps
+        return False
+
+    @property
+    def needs_pixels(self) -> bool:
+        """Indique si la décision dépend du contenu de la frame (sinon `grab` suffit)."""
+        return self.mode == "keyframes"
+
+    def should_analyse(self, frame_number: int, frame: Optional[np.ndarray] = None) -> bool:
+        if self.analyses_every_frame:
+            selected = True
+        elif self.mode == "stride":
+            selected = (frame_number - 1) % self.frame_stride == 0
+        elif self.mode == "fps":
+            # La frame est retenue quand elle franchit une nouvelle période de 1/target_fps.
+            step = self.video_fps / self.target_fps
+            selected = int((frame_number - 1) / step) != int((frame_number - 2) / step) or frame_number == 1
+        else:
+            selected = self._is_keyframe(frame_number, frame)
+        if selected:
+            self._last_analysed = frame_number
+        return selected
+
+    def _is_keyframe(self, frame_number: int, frame: np.ndarray) -> bool:
+        small = thumbnail(frame)
+        if self._last_thumbnail is None or frame_number - self._last_analysed >= self.max_gap:
+            self._last_thumbnail = small
+            return True
+        if thumbnail_change(small, self._last_thumbnail) > self.keyframe_threshold:
+            self._last_thumbnail = small
+            return True
+        return False
+
+
+def nearest_analysed_frame(analysed_frames: List[int], frame_number: int) -> int:
+    """Retourne la frame analysée la plus proche (la précédente en cas d'égalité)."""
+    position = bisect.bisect_left(analysed_frames, frame_number)
+    if position < len(analysed_frames) and analysed_frames[position] == frame_number:
+        return frame_number
+    before = analysed_frames[position - 1] if position > 0 else None
+    after = analysed_frames[position] if position < len(analysed_frames) else None
+    if before is None:
+        return after
+    if after is None:
+        return before
+    return before if frame_number - before <= after - frame_number else after
+
+
+def nearest_analysed_frames(analysed_frames: List[int], frame_count: int) -> np.ndarray:
+    """
+    Version vectorisée de `nearest_analysed_frame` pour les frames 1..`frame_count`.
+
+    Retourne un tableau dont l'élément `i` est la frame analysée rattachée à la frame `i + 1`.
+    """
+    analysed = np.asarray(analysed_frames, dtype=np.int64)
+    frames = np.arange(1, frame_count + 1, dtype=np.int64)
+    if frame_count <= 0 or len(analysed) == 0:
+        return np.empty(0, dtype=np.int64)
+    position = np.searchsorted(analysed, frames, side="left")
+    before = analysed[np.clip(position - 1, 0, len(analysed) - 1)]
+    after = analysed[np.clip(position, 0, len(analysed) - 1)]
+    use_before = (position > 0) & ((position == len(analysed)) | (frames - before <= after - frames))
+    return np.where(use_before, before, after)
+
+
+def expand_table(analysed: Dict[int, DetectionTable], frame_count: int, fps: float, class_names=()) -> tuple:
+    """
+    Attribue à chaque frame 1..`frame_count` les détections de la frame analysée la plus proche.
+
+    Chaque ligne porte le `frame_number` et le `timestamp` de la frame à
+    laquelle elle est rattachée, ainsi que `source_frame`, la frame réellement
+    analysée. Les lignes sont recopiées par indexation NumPy, sans
+    dictionnaire intermédiaire. Retourne `(frame_source_par_frame, table)`.
+    """
+    analysed_frames = sorted(analysed)
+    sources = nearest_analysed_frames(analysed_frames, frame_count)
+    if not analysed_frames:
+        return sources, DetectionTable(class_names=class_names)
+    tables = [analysed[frame] for frame in analysed_frames]
+    stacked = DetectionTable.concatenate(tables, class_names)
+    counts = np.array([len(table) for table in tables], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Pour chaque frame, les lignes [offset, offset + count) de sa frame source.
+    source_index = np.searchsorted(analysed_frames, sources)
+    frame_counts = counts[source_index]
+    row_starts = np.repeat(offsets[source_index], frame_counts)
+    frame_starts = np.repeat(np.cumsum(frame_counts) - frame_counts, frame_counts)
+    rows = stacked.rows[row_starts + np.arange(len(row_starts)) - frame_starts]
+
+    frame_numbers = np.repeat(np.arange(1, frame_count + 1), frame_counts)
+    rows["frame_number"] = frame_numbers
+    rows["timestamp"] = frame_numbers / fps if fps > 0 else 0.0
+    rows["source_frame"] = np.repeat(sources, frame_counts)
+    return sources, DetectionTable(rows, stacked.class_names)
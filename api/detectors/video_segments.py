@@ -0,0 +1,237 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from api.detectors.detection_table import DetectionTable
+from api.detectors.tracking import TRACK_MATCH_IOU, greedy_match, iou_matrix
+
+logger = logging.getLogger(__name__)
+
+# Nombre de segments traités en parallèle par défaut (1 = traitement séquentiel historique).
+VIDEO_SEGMENTS = int(os.getenv("YOLO_VIDEO_SEGMENTS", "1"))
+# Processus de travail du traitement segmenté, chacun avec son propre détecteur.
+SEGMENT_WORKERS = int(os.getenv("YOLO_VIDEO_SEGMENT_WORKERS", str(os.cpu_count() or 1)))
+# En dessous de cette longueur, un segment ne vaut pas le coût d'un positionnement et d'un processus.
+MIN_SEGMENT_FRAMES = int(os.getenv("YOLO_VIDEO_MIN_SEGMENT_FRAMES", "300"))
+CANCEL_POLL_S = 0.5
+
+# Détecteur propre à chaque processus de travail du traitement segmenté.
+_segment_detector = None
+
+
+def plan_segments(total_frames: int, segments: int, min_frames: int = MIN_SEGMENT_FRAMES) -> List[Tuple[int, Optional[int]]]:
+    """
+    Découpe les frames 1..`total_frames` en au plus `segments` intervalles contigus.
+
+    Chaque intervalle `(première, dernière)` compte au moins `min_frames`
+    frames ; une vidéo trop courte reste en un seul segment. `total_frames`
+    vient de CAP_PROP_FRAME_COUNT, une estimation : le dernier segment n'a pas
+    de borne de fin (None) et lit jusqu'à la fin réelle de la vidéo.
+    """
+    if total_frames <= 0:
+        return []
+    count = max(1, min(segments, total_frames // max(1, min_frames)))
+    bounds = np.linspace(0, total_frames, count + 1).round().astype(int)
+    plan = [(int(start) + 1, int(end)) for start, end in zip(bounds[:-1], bounds[1:])]
+    plan[-1] = (plan[-1][0], None)
+    return plan
+
+
+def _init_segment_worker(model_path: str, backend: str, precision: str, threads: int):
+    """Charge un détecteur dans le processus et partage les cœurs entre les processus du pool."""
+    global _segment_detector
+    import torch
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+    from api.detectors.detectors_yolo11 import YOLOv11Detector
+    # `precision` est celle que le processus parent a validée : pas de second contrôle par processus.
+    _segment_detector = YOLOv11Detector(model_path=model_path, backend=backend, precision=precision, verify_precision=False)
+
+
+def _run_segment(video_path: str, first_frame: int, last_frame: int, output_path: Optional[str], cancel_event, options: dict) -> dict:
+    start = time.perf_counter()
+    result = _segment_detector.process_segment(video_path, first_frame, last_frame, output_path, cancel_event=cancel_event, **options)
+    result["processing_time"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+class SegmentRunner:
+    """
+    Pool de processus qui traitent chacun un segment de vidéo.
+
+    Le pool (démarrage "spawn") et son gestionnaire d'événements sont créés
+    au premier appel puis réutilisés : les détecteurs ne sont chargés qu'une
+    fois par processus. Les threads de calcul de torch et d'OpenCV sont
+    répartis entre les processus pour ne pas surcharger les cœurs.
+    """
+
+    def __init__(self, model_path: str, backend: str, precision: str, workers: int = SEGMENT_WORKERS):
+        self.model_path = model_path
+        self.backend = backend
+        self.precision = precision
+        self.workers = max(1, workers)
+        self._pool = None
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._pool is not None:
+                return
+            context = multiprocessing.get_context("spawn")
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_segment_worker,
+                initargs=(self.model_path, self.backend, self.precision, threads),
+            )
+            self._manager = context.Manager()
+            logger.info(f"Pool de segments vidéo démarré ({self.workers} processus, {threads} thread(s) chacun)")
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+    def run(self, video_path: str, plan: List[Tuple[int, Optional[int]]], output_dir: Optional[str], options: dict,
+            cancel_event=None, progress: Optional[dict] = None) -> List[dict]:
+        """
+        Traite chaque segment de `plan` dans le pool et retourne leurs résultats dans l'ordre.
+
+        Si `output_dir` est fourni, chaque segment y écrit sa vidéo annotée
+        (`output_path` du résultat). Une erreur ou `cancel_event` interrompt
+        tous les segments encore en cours.
+        """
+        from api.detectors.detectors_yolo11 import ProcessingCancelled
+        self._start()
+        shared_cancel = self._manager.Event()
+        futures = {}
+        for index, (first_frame, last_frame) in enumerate(plan):
+            output_path = os.path.join(output_dir, f"segment_{index:03d}.mp4") if output_dir else None
+            future = self._pool.submit(_run_segment, video_path, first_frame, last_frame, output_path, shared_cancel, options)
+            futures[future] = (index, first_frame, output_path)
+
+        results = [None] * len(plan)
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=CANCEL_POLL_S, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    index, first_frame, output_path = futures[future]
+                    result = future.result()
+                    result.update({"first_frame": first_frame, "output_path": output_path})
+                    results[index] = result
+                    if progress is not None:
+                        # Frames réellement lues : le dernier segment n'a pas de borne connue à l'avance.
+                        progress["frames_done"] = progress.get("frames_done", 0) + max(0, result["last_frame"] - first_frame + 1)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ProcessingCancelled(f"Traitement segmenté de la vidéo interrompu ({len(plan) - len(pending)}/{len(plan)} segments)")
+        except BaseException:
+            shared_cancel.set()
+            for future in pending:
+                future.cancel()
+            raise
+        return results
+
+
+_runners: Dict[tuple, SegmentRunner] = {}
+_runners_lock = threading.Lock()
+
+
+def segment_runner(model_path: str, backend: str, precision: str, workers: int = SEGMENT_WORKERS) -> SegmentRunner:
+    """Pool partagé pour un modèle donné (créé à la première vidéo segmentée)."""
+    key = (os.path.abspath(model_path), backend, precision, workers)
+    with _runners_lock:
+        if key not in _runners:
+            _runners[key] = SegmentRunner(model_path, backend, precision, workers)
+        return _runners[key]
+
+
+def shutdown_segment_runners():
+    with _runners_lock:
+        for runner in _runners.values():
+            runner.shutdown()
+        _runners.clear()
+
+
+def relink_tracks(segments: List[Dict[int, DetectionTable]], iou_threshold: float = TRACK_MATCH_IOU):
+    """
+    Rend les `track_id` globaux d'un segment à l'autre (modifie les tables en place).
+
+    Les pistes de la première frame d'un segment sont associées par IoU à
+    celles de la dernière frame du segment précédent ; les autres reçoivent
+    un nouvel identifiant.
+    """
+    next_id = 1
+    previous_last = None
+    for analysed in segments:
+        if not analysed:
+            continue
+        frames = sorted(analysed)
+        local_ids = np.unique(np.concatenate([analysed[frame].rows["track_id"] for frame in frames]))
+        mapping = {}
+        first = analysed[frames[0]]
+        if previous_last is not None and len(first) and len(previous_last):
+            pairs, _, _ = greedy_match(iou_matrix(first.bboxes, previous_last.bboxes), iou_threshold)
+            mapping = {int(first.rows["track_id"][i]): int(previous_last.rows["track_id"][j]) for i, j in pairs}
+        for local_id in local_ids[local_ids > 0]:
+            if int(local_id) not in mapping:
+                mapping[int(local_id)] = next_id
+                next_id += 1
+        lookup = np.zeros(int(local_ids.max()) + 1 if len(local_ids) else 1, dtype=np.int32)
+        for local_id, global_id in mapping.items():
+            lookup[local_id] = global_id
+        for frame in frames:
+            rows = analysed[frame].rows
+            rows["track_id"] = lookup[rows["track_id"]]
+        next_id = max(next_id, int(lookup.max()) + 1)
+        previous_last = analysed[frames[-1]]
+
+
+def concat_videos(parts: List[str], output_path: str, fps: float, size: Tuple[int, int]) -> str:
+    """
+    Assemble les vidéos annotées des segments, dans l'ordre.
+
+    Avec ffmpeg, les flux sont recopiés sans réencodage ; sinon les frames
+    sont relues et réécrites avec OpenCV. Retourne la méthode utilisée.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        fd, list_path = tempfile.mkstemp(suffix=".txt")
+        try:
+            with os.fdopen(fd, "w") as listing:
+                listing.writelines(f"file '{os.path.abspath(part)}'\n" for part in parts)
+            subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path], check=True)
+        finally:
+            os.remove(list_path)
+        return "ffmpeg"
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    try:
+        for part in parts:
+            cap = cv2.VideoCapture(part)
+            try:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    out.write(frame)
+            finally:
+                cap.release()
+    finally:
+        out.release()
+    return "opencv"
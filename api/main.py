@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, Depends, HTTPException, Response
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -10,10 +10,16 @@ import cv2
 import numpy as np
 import asyncio
 
-# Importation des modules internes
-from api.detectors import detectors_yolo11
+# Importation des modules internes (torch et ultralytics sont importés au chargement du modèle)
+from api.detectors.batch_scheduler import BatchScheduler
+from api.detectors.inference_executor import InferenceExecutor
+from api.detectors.result_cache import ResultCache, RESULT_CACHE_ENABLED
+from api.detectors.video_segments import shutdown_segment_runners
+from api.video_jobs import VideoJobWorkerPool
+from api.model_loader import ModelLoader, RETRY_AFTER_S
 from api.routers import routers_yolo11, db_router, ui_router
-from api.database import engine, Base, get_db
+from api import metrics, profiling
+from api.database import engine, Base, get_db, SessionLocal
 from api import crud, models
 
 # Configuration du logging
@@ -23,6 +29,12 @@ logger = logging.getLogger(__name__)
 # Initialisation de l'application FastAPI
 app = FastAPI(title="YOLOv11 Dog Posture Detection API")
 
+# Profilage à la demande des routes /yolo (en-tête d'administration ou échantillonnage)
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Latence de chaque requête HTTP, par route, exposée sur /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Monter le répertoire statique pour servir les vidéos de référence et le CSS
 # Le chemin du dossier 'static' est relatif à la racine du projet, pas au dossier 'api'.
 static_dir = "static"
@@ -36,11 +48,49 @@ templates_dir = os.path.join(api_root, "routers")
 # Chemin absolu vers le modèle YOLOv11
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "final_model_yolo11.pt")
 
-# Initialisation du détecteur avec le modèle
-detector = detectors_yolo11.YOLOv11Detector(model_path=MODEL_PATH)
+# Composants d'inférence, créés une fois le modèle chargé (voir start_inference)
+detector = None
+inference_executor = None
+batch_scheduler = None
+result_cache = None
+job_pool = None
+
+async def start_inference(loaded_detector):
+    """Démarre l'exécuteur, le planificateur et les workers autour du détecteur chargé."""
+    global detector, inference_executor, batch_scheduler, result_cache, job_pool
+    detector = loaded_detector
+
+    # Exécuteur borné qui fait tourner l'inférence hors de la boucle d'événements
+    inference_executor = InferenceExecutor(detector=detector, model_path=MODEL_PATH)
+
+    # Planificateur qui regroupe les images des requêtes concurrentes en un seul appel au modèle
+    batch_scheduler = BatchScheduler(detector, executor=inference_executor)
+
+    # Cache des résultats sur image : un fichier déjà analysé n'est pas renvoyé au modèle
+    result_cache = ResultCache(model_version=detector.model_version) if RESULT_CACHE_ENABLED else None
+
+    # Workers qui traitent en arrière-plan les travaux vidéo enregistrés en base
+    job_pool = VideoJobWorkerPool(SessionLocal, inference_executor)
 
-# Injection du détecteur dans le routeur
-routers_yolo11.detector = detector
+    # Injection du détecteur, de l'exécuteur, du planificateur, du cache et des workers dans le routeur
+    routers_yolo11.detector = detector
+    routers_yolo11.inference_executor = inference_executor
+    routers_yolo11.batch_scheduler = batch_scheduler
+    routers_yolo11.result_cache = result_cache
+    routers_yolo11.job_pool = job_pool
+
+    # Profondeur des files d'inférence publiée sur /metrics
+    metrics.track_inference_queues(inference_executor, batch_scheduler)
+
+    inference_executor.start()
+    batch_scheduler.start()
+    await job_pool.start()
+    return inference_executor
+
+# Le modèle est chargé et préchauffé en arrière-plan : le port est ouvert immédiatement
+# et les routes /yolo répondent 503 jusqu'à ce qu'il soit prêt.
+model_loader = ModelLoader(MODEL_PATH, on_loaded=start_inference)
+routers_yolo11.model_loader = model_loader
 
 # Enregistrement des routes du routeur YOLOv11
 app.include_router(routers_yolo11.router)
@@ -56,7 +106,42 @@ async def startup_event():
     """Code exécuté au démarrage de l'application."""
     # Le seeding des données de référence est maintenant géré par la migration Alembic.
     # Cette fonction est maintenant beaucoup plus rapide.
-    logger.info("✅ Application démarrée avec succès.")
+    model_loader.start()
+    logger.info("✅ Application démarrée avec succès (chargement du modèle en arrière-plan).")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Code exécuté à l'arrêt de l'application."""
+    # Arrête le thread de capture et libère la webcam si un streaming est en cours.
+    await routers_yolo11.stop_stream()
+    await model_loader.stop()
+    if job_pool:
+        await job_pool.stop()
+    if batch_scheduler:
+        await batch_scheduler.stop()
+    if inference_executor:
+        inference_executor.shutdown()
+    shutdown_segment_runners()
+
+@app.get("/healthz", tags=["Santé"])
+async def healthz():
+    """Sonde de vivacité : le processus répond, sauf si le chargement du modèle a échoué."""
+    if model_loader.failed:
+        return JSONResponse(status_code=503, content=model_loader.status())
+    return {"status": "alive"}
+
+@app.get("/readyz", tags=["Santé"])
+async def readyz():
+    """Sonde de disponibilité : prête une fois le modèle chargé et préchauffé."""
+    if not model_loader.ready:
+        return JSONResponse(status_code=503, content=model_loader.status(), headers={"Retry-After": str(RETRY_AFTER_S)})
+    return model_loader.status()
+
+@app.get("/metrics", tags=["Santé"])
+async def prometheus_metrics():
+    """Métriques au format Prometheus : latences par route et par étape, écritures en base, streaming, files d'inférence."""
+    content, media_type = metrics.render()
+    return Response(content=content, media_type=media_type)
 
 @app.get("/", response_class=RedirectResponse, include_in_schema=False)
 async def root():
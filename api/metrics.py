@@ -0,0 +1,155 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# En mode d'exécution "process", les processus de travail écrivent leurs mesures dans
+# ce dossier (variable standard de prometheus_client) et /metrics les agrège.
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+REQUEST_LATENCY = Histogram(
+    "yolo_http_request_duration_seconds", "Durée des requêtes HTTP jusqu'au dernier octet envoyé, par route",
+    ["method", "route", "status"], buckets=REQUEST_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "yolo_detector_stage_duration_seconds", "Temps par frame de chaque étape du détecteur",
+    ["stage"], buckets=STAGE_BUCKETS
+)
+DB_WRITE_LATENCY = Histogram(
+    "yolo_db_write_duration_seconds", "Durée des écritures en base", ["operation"], buckets=DB_BUCKETS
+)
+WS_FRAMES = Counter("yolo_ws_frames_sent", "Frames envoyées sur les WebSockets de streaming")
+WS_FRAMES_DROPPED = Counter("yolo_ws_frames_dropped", "Frames non envoyées à un client WebSocket trop lent (file pleine)")
+WS_SEND_LAG = Histogram("yolo_ws_send_lag_seconds", "Durée de l'envoi d'une frame au client WebSocket", buckets=STAGE_BUCKETS)
+ACTIVE_STREAMS = Gauge("yolo_ws_active_streams", "WebSockets de streaming ouverts", multiprocess_mode="livesum")
+CAPTURE_FRAMES = Counter(
+    "yolo_capture_frames", "Frames lues sur la caméra de streaming (dropped : remplacées avant d'être analysées)", ["outcome"]
+)
+MOTION_FRAMES = Counter(
+    "yolo_motion_frames", "Frames du streaming analysées par le modèle (inferred) ou reprises de la précédente (skipped)", ["outcome"]
+)
+INGEST_FRAMES = Counter(
+    "yolo_ingest_frames", "Frames envoyées par les navigateurs (received, inferred, dropped, invalid)", ["outcome"]
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI qui mesure chaque requête HTTP jusqu'à la fin de l'envoi de la réponse.
+
+    La route est étiquetée par son modèle (`/yolo/jobs/{job_id}`) et non par
+    le chemin reçu, pour que le nombre de séries reste borné.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(scope["method"], getattr(route, "path", UNMATCHED_ROUTE), str(status_code)).observe(time.perf_counter() - start)
+
+
+def observe_stage(stage: str, seconds: float, frames: int = 1):
+    """Enregistre `seconds` passées dans `stage` pour `frames` frames (une mesure par frame)."""
+    if frames < 1:
+        return
+    histogram = STAGE_LATENCY.labels(stage)
+    per_frame = seconds / frames
+    for _ in range(frames):
+        histogram.observe(per_frame)
+
+
+def observe_inference(results, prepare_s: float, convert_s: float):
+    """
+    Étapes d'un appel au modèle sur un lot.
+
+    Les temps d'ultralytics (`Results.speed`, en ms par image) sont complétés
+    par la réduction des images avant l'appel (prétraitement) et la
+    conversion des boîtes en `DetectionTable` après (post-traitement).
+    """
+    if not results:
+        return
+    count = len(results)
+    for r in results:
+        speed = getattr(r, "speed", None) or {}
+        STAGE_LATENCY.labels("preprocess").observe(prepare_s / count + (speed.get("preprocess") or 0.0) / 1000)
+        STAGE_LATENCY.labels("infer").observe((speed.get("inference") or 0.0) / 1000)
+        STAGE_LATENCY.labels("postprocess").observe(convert_s / count + (speed.get("postprocess") or 0.0) / 1000)
+
+
+@contextmanager
+def db_write_timer(operation: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_WRITE_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+
+class InferenceQueueCollector:
+    """Profondeur des files d'inférence, lue dans l'exécuteur et le planificateur au moment de la collecte."""
+
+    def __init__(self):
+        self.executor = None
+        self.scheduler = None
+
+    def collect(self):
+        depth = GaugeMetricFamily("yolo_inference_queue_depth", "Travaux en attente d'inférence", labels=["queue"])
+        in_flight = GaugeMetricFamily("yolo_inference_in_flight", "Travaux soumis à l'exécuteur et non terminés")
+        if self.executor is not None:
+            stats = self.executor.stats()
+            depth.add_metric(["executor"], stats["queue_depth"])
+            in_flight.add_metric([], stats["in_flight"])
+        if self.scheduler is not None:
+            depth.add_metric(["batch"], self.scheduler.stats()["queued"])
+        yield depth
+        yield in_flight
+
+
+inference_queues = InferenceQueueCollector()
+REGISTRY.register(inference_queues)
+
+
+def track_inference_queues(executor, scheduler):
+    """Publie la profondeur des files de l'exécuteur et du planificateur (appelé depuis main.py)."""
+    inference_queues.executor = executor
+    inference_queues.scheduler = scheduler
+
+
+def _registry(multiprocess_dir: Optional[str] = MULTIPROCESS_DIR):
+    if not multiprocess_dir:
+        return REGISTRY
+    from prometheus_client import multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=multiprocess_dir)
+    registry.register(inference_queues)
+    return registry
+
+
+def render() -> tuple:
+    """Corps et type MIME de la réponse /metrics (format texte Prometheus)."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Inférences factices exécutées après le chargement, à la résolution servie (webcam 640x480 par défaut).
+WARMUP_RUNS = int(os.getenv("YOLO_WARMUP_RUNS", "2"))
+WARMUP_WIDTH = int(os.getenv("YOLO_WARMUP_WIDTH", "640"))
+WARMUP_HEIGHT = int(os.getenv("YOLO_WARMUP_HEIGHT", "480"))
+# Délai conseillé aux clients (en-tête Retry-After) tant que le modèle n'est pas prêt.
+RETRY_AFTER_S = int(os.getenv("YOLO_RETRY_AFTER_S", "5"))
+
+PENDING, LOADING, WARMING, READY, FAILED = "pending", "loading", "warming", "ready", "failed"
+
+
+def _build_detector(model_path: str):
+    # torch et ultralytics ne sont importés qu'ici, dans un thread, et non à l'import de l'application.
+    from api.detectors.detectors_yolo11 import YOLOv11Detector
+    return YOLOv11Detector(model_path=model_path)
+
+
+class ModelLoader:
+    """
+    Charge le détecteur en arrière-plan après le démarrage du serveur.
+
+    `start` lance une tâche qui construit le détecteur dans un thread, appelle
+    `on_loaded(detector)` (qui démarre l'exécuteur, le planificateur, etc. et
+    retourne l'exécuteur d'inférence), puis exécute `warmup_runs` inférences
+    factices de `warmup_size` (largeur, hauteur). En mode "process", chaque
+    passe soumet une inférence par processus de travail. Le modèle n'est
+    déclaré prêt qu'après ce préchauffage.
+    """
+
+    def __init__(self, model_path: str, on_loaded: Callable[[object], Awaitable[object]],
+                 warmup_runs: int = WARMUP_RUNS, warmup_size: tuple = (WARMUP_WIDTH, WARMUP_HEIGHT),
+                 build: Callable[[str], object] = _build_detector):
+        self.model_path = model_path
+        self.on_loaded = on_loaded
+        self.warmup_runs = warmup_runs
+        self.warmup_size = warmup_size
+        self.build = build
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.load_time_s: Optional[float] = None
+        self.warmup_time_s: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    @property
+    def failed(self) -> bool:
+        return self.state == FAILED
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._load())
+
+    async def wait_ready(self):
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _load(self):
+        self.state = LOADING
+        start = time.perf_counter()
+        try:
+            detector = await asyncio.to_thread(self.build, self.model_path)
+            self.load_time_s = round(time.perf_counter() - start, 3)
+            self.state = WARMING
+            executor = await self.on_loaded(detector)
+            start = time.perf_counter()
+            await self._warmup(executor)
+            self.warmup_time_s = round(time.perf_counter() - start, 3)
+            self.state = READY
+            logger.info(f"✅ Modèle prêt (chargement {self.load_time_s}s, préchauffage {self.warmup_time_s}s).")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e) or type(e).__name__
+            logger.error(f"❌ Échec du chargement du modèle : {self.error}")
+
+    async def _warmup(self, executor):
+        width, height = self.warmup_size
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        parallel = executor.max_workers if executor.mode == "process" else 1
+        for _ in range(self.warmup_runs):
+            await asyncio.gather(*(executor.run("process_image", frame) for _ in range(parallel)))
+
+    def status(self) -> dict:
+        return {
+            "status": self.state,
+            "error": self.error,
+            "load_time_s": self.load_time_s,
+            "warmup_time_s": self.warmup_time_s,
+            "warmup_runs": self.warmup_runs,
+        }
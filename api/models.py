@@ -13,6 +13,12 @@ class PostureEnum(PyEnum):
     debout = "debout"
     a_pieds = "a_pieds"
 
+class JobStatusEnum(PyEnum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
 class Dog(Base):
     __tablename__ = "dogs"
     id = Column(Integer, primary_key=True, nullable=False)
@@ -61,4 +67,24 @@ class ValidatedPosture(Base):
     id = Column(Integer, primary_key=True, nullable=False)
     dog_id = Column(Integer, ForeignKey("dogs.id"), nullable=False)
     posture = Column(Enum(PostureEnum), nullable=False)
-    validated_at = Column(DateTime(timezone=True), server_default=sa.text('now()'), nullable=True)
\ No newline at end of file
+    validated_at = Column(DateTime(timezone=True), server_default=sa.text('now()'), nullable=True)
+
+class VideoJob(Base):
+    __tablename__ = "video_jobs"
+    __table_args__ = (sa.Index("ix_video_jobs_status_id", "status", "id"),)
+    id = Column(Integer, primary_key=True, nullable=False)
+    session_id = Column(Integer, ForeignKey("video_sessions.id"), nullable=False)
+    video_id = Column(Integer, ForeignKey("reference_posture_videos.id"), nullable=False)
+    status = Column(Enum(JobStatusEnum), nullable=False, server_default=JobStatusEnum.queued.value)
+    input_path = Column(Text, nullable=False)
+    output_path = Column(Text, nullable=True)
+    sampling = Column(Text, nullable=False, server_default="all")
+    frame_stride = Column(Integer, nullable=False, server_default="1")
+    target_fps = Column(Float, nullable=True)
+    total_frames = Column(Integer, nullable=True)
+    frames_done = Column(Integer, nullable=False, server_default="0")
+    result_id = Column(Integer, ForeignKey("posture_detection_results.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False)
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
\ No newline at end of file
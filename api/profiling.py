@@ -0,0 +1,217 @@
+import contextvars
+import cProfile
+import glob
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Profilage à la demande : en-tête `X-Profile-Token` égal à ce jeton (vide = en-tête ignoré)...
+PROFILE_TOKEN = os.getenv("YOLO_PROFILE_TOKEN", "")
+# ... ou échantillonnage d'une fraction des requêtes /yolo (0 = désactivé).
+PROFILE_SAMPLE_RATE = float(os.getenv("YOLO_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("YOLO_PROFILE_DIR", "profiles")
+# Nombre de profils conservés : les plus anciens sont supprimés au-delà.
+PROFILE_MAX_PROFILES = int(os.getenv("YOLO_PROFILE_MAX_PROFILES", "20"))
+# Profileur torch autour des appels au détecteur (trace Chrome + table des opérateurs).
+PROFILE_TORCH = os.getenv("YOLO_PROFILE_TORCH", "1") == "1"
+PROFILE_ROUTE_PREFIX = "/yolo"
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+SUMMARY_ROWS = 25
+
+# Profil de la requête en cours, propagé aux threads de l'exécuteur d'inférence.
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("current_profile", default=None)
+# cProfile ne profile qu'un thread à la fois par profileur : une seule requête profilée à la fois.
+_busy = threading.Lock()
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    return _current_profile.get()
+
+
+def run_in_context(function, /, *args, **kwargs):
+    """
+    Appelle `function` dans le thread courant, sous cProfile et le profileur torch si la requête est profilée.
+
+    Soumis via `contextvars.copy_context().run` par l'exécuteur d'inférence,
+    pour que le profil de la requête soit visible dans le thread de travail.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return function(*args, **kwargs)
+    return profile.run(function, *args, **kwargs)
+
+
+class RequestProfile:
+    """
+    Mesures d'une requête profilée.
+
+    Le thread de la boucle d'événements (décodage, écritures en base, envoi)
+    et chaque appel au détecteur dans un thread de l'exécuteur ont leur
+    propre cProfile ; leurs statistiques sont réunies dans un seul fichier
+    `.prof`. Sur la boucle d'événements, le profil inclut aussi les autres
+    requêtes servies au même moment.
+    """
+
+    def __init__(self, name: str, method: str, path: str, trigger: str, directory: str = PROFILE_DIR, torch_enabled: bool = PROFILE_TORCH):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.directory = directory
+        self.torch_enabled = torch_enabled
+        self.detector_calls = []
+        self.torch_tables = []
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def add(self, profiler: cProfile.Profile):
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profiler)
+            else:
+                self._stats.add(profiler)
+
+    def _torch_profiler(self):
+        # torch n'est pas importé par le profilage : sans modèle chargé, il n'y a rien à mesurer.
+        if not self.torch_enabled or "torch" not in sys.modules:
+            return None
+        import torch
+        return torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU])
+
+    def run(self, function, /, *args, **kwargs):
+        profiler = cProfile.Profile()
+        torch_profiler = self._torch_profiler()
+        start = time.perf_counter()
+        if torch_profiler is not None:
+            torch_profiler.__enter__()
+        profiler.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            self.add(profiler)
+            call = {"function": getattr(function, "__qualname__", repr(function)), "time_s": round(elapsed, 4)}
+            if torch_profiler is not None:
+                torch_profiler.__exit__(None, None, None)
+                with self._lock:
+                    index = len(self.torch_tables)
+                    self.torch_tables.append(torch_profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=15))
+                call["torch_trace"] = f"{self.name}.torch{index}.json"
+                torch_profiler.export_chrome_trace(os.path.join(self.directory, call["torch_trace"]))
+            with self._lock:
+                self.detector_calls.append(call)
+
+    def save(self, status_code: Optional[int], wall_s: float) -> str:
+        """Écrit `<nom>.prof` (pstats) et `<nom>.txt` (résumé lisible) ; retourne le chemin du résumé."""
+        summary = io.StringIO()
+        summary.write(f"{self.method} {self.path} -> {status_code} en {wall_s * 1000:.1f} ms (déclenchement : {self.trigger})\n")
+        for call in self.detector_calls:
+            summary.write(f"  appel au détecteur {call['function']} : {call['time_s'] * 1000:.1f} ms"
+                          f"{' (trace torch : ' + call['torch_trace'] + ')' if 'torch_trace' in call else ''}\n")
+        if self._stats is not None:
+            self._stats.dump_stats(os.path.join(self.directory, f"{self.name}.prof"))
+            summary.write(f"\nFonctions les plus coûteuses (temps cumulé, {SUMMARY_ROWS} premières) :\n")
+            self._stats.stream = summary
+            self._stats.sort_stats("cumulative").print_stats(SUMMARY_ROWS)
+        for index, table in enumerate(self.torch_tables):
+            summary.write(f"\nOpérateurs torch (appel {index}) :\n{table}\n")
+        summary_path = os.path.join(self.directory, f"{self.name}.txt")
+        with open(summary_path, "w", encoding="utf-8") as output:
+            output.write(summary.getvalue())
+        return summary_path
+
+
+def rotate(directory: str = PROFILE_DIR, keep: int = PROFILE_MAX_PROFILES):
+    """Supprime les fichiers des profils les plus anciens pour n'en garder que `keep`."""
+    summaries = sorted(glob.glob(os.path.join(directory, "*.txt")), key=os.path.getmtime)
+    for summary in summaries[:max(0, len(summaries) - keep)]:
+        name = os.path.splitext(summary)[0]
+        for path in glob.glob(f"{glob.escape(name)}.*"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI qui profile les requêtes HTTP des routes d'inférence.
+
+    Une requête est profilée si elle porte l'en-tête `X-Profile-Token` avec le
+    jeton d'administration, ou si elle est tirée au sort (`sample_rate`). La
+    réponse porte alors l'en-tête `X-Profile-Id`, nom des fichiers écrits
+    dans `directory`. Une requête qui arrive pendant un profilage n'est pas
+    profilée.
+    """
+
+    def __init__(self, app, token: str = PROFILE_TOKEN, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 directory: str = PROFILE_DIR, max_profiles: int = PROFILE_MAX_PROFILES, torch_enabled: bool = PROFILE_TORCH):
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.torch_enabled = torch_enabled
+
+    def _trigger(self, scope) -> Optional[str]:
+        if scope["type"] != "http" or not scope["path"].startswith(PROFILE_ROUTE_PREFIX):
+            return None
+        if self.token:
+            header = dict(scope["headers"]).get(PROFILE_HEADER)
+            if header is not None and hmac.compare_digest(header, self.token.encode()):
+                return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampling"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope)
+        if trigger is None or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, trigger)
+        finally:
+            _busy.release()
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['path'].strip('/').replace('/', '_')}-{os.urandom(3).hex()}"
+        profile = RequestProfile(name, scope["method"], scope["path"], trigger, self.directory, self.torch_enabled)
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(PROFILE_ID_HEADER, name.encode())]}
+            await send(message)
+
+        token = _current_profile.set(profile)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            wall_s = time.perf_counter() - start
+            _current_profile.reset(token)
+            profile.add(profiler)
+            try:
+                summary_path = profile.save(status_code, wall_s)
+                rotate(self.directory, self.max_profiles)
+                logger.info(f"Profil de {scope['method']} {scope['path']} enregistré : {summary_path}")
+            except OSError as e:
+                logger.warning(f"Impossible d'enregistrer le profil de {scope['path']} : {e}")
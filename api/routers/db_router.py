@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from .. import crud
 from ..schemas import db_schemas
 from ..database import get_db
+from ..detectors.reference_index import ReferenceIndex
 
 router = APIRouter(prefix="/db", tags=["Database"])
+# Détections précalculées des vidéos de référence (python -m api.detectors.reference_index build)
+reference_index = ReferenceIndex()
 
 @router.post("/dogs/", response_model=db_schemas.Dog, status_code=201, summary="Créer un nouveau chien")
 async def create_dog_endpoint(dog: db_schemas.DogCreate, db: AsyncSession = Depends(get_db)):
@@ -40,4 +43,25 @@ async def get_next_videos_endpoint(session_id: int, db: AsyncSession = Depends(g
 
 @router.get("/dogs/{dog_id}/validated_postures", response_model=List[db_schemas.ValidatedPosture], summary="Lister les postures validées pour un chien")
 async def get_validated_postures_endpoint(dog_id: int, db: AsyncSession = Depends(get_db)):
-    return await crud.get_validated_postures_by_dog(db=db, dog_id=dog_id)
\ No newline at end of file
+    return await crud.get_validated_postures_by_dog(db=db, dog_id=dog_id)
+
+@router.get("/reference_videos/{video_id}/index", response_model=db_schemas.ReferenceVideoIndex, summary="Détections précalculées d'une vidéo de référence")
+async def get_reference_video_index_endpoint(
+    video_id: int,
+    include_detections: bool = Query(False, description="Inclure les détections frame par frame"),
+    db: AsyncSession = Depends(get_db)
+):
+    video = await crud.get_reference_video(db, video_id=video_id)
+    if video is None:
+        raise HTTPException(status_code=404, detail="Reference video not found")
+    entry = reference_index.get(video.video_path)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Reference video {video_id} is not indexed")
+    return db_schemas.ReferenceVideoIndex(
+        video=db_schemas.VideoReference.model_validate(video),
+        sha256=entry["sha256"],
+        model_version=entry["model_version"],
+        indexed_at=entry["indexed_at"],
+        summary=entry["summary"],
+        detections=reference_index.detections(video.video_path).to_records() if include_detections else None
+    )
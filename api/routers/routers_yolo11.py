@@ -1,31 +1,143 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, WebSocket, WebSocketDisconnect, Query, Depends
+from fastapi import APIRouter, File, UploadFile, HTTPException, WebSocket, WebSocketDisconnect, WebSocketException, Query, Depends, Request, status
 from fastapi.responses import Response, JSONResponse, FileResponse
-from api.schemas.schemas_yolo11 import DetectionResponse, VideoDetectionResponse, OutputFormat, Detection
-from api.detectors.detectors_yolo11 import YOLOv11Detector
-from api import crud, schemas, database
+from starlette.background import BackgroundTask
+from starlette.requests import HTTPConnection
+from api.schemas.schemas_yolo11 import DetectionResponse, VideoDetectionResponse, OutputFormat, Detection, ImageEncoding, SamplingMode, StreamProtocol, DropPolicy, VideoJobStatus
+from api.detectors.detection_table import EXPORT_FORMATS
+from api.detectors.tracking import Tracker
+from api.detectors.video_segments import VIDEO_SEGMENTS
+from api.streaming.protocol import StreamEncoder
+from api.streaming.capture import LatestFrameCapture
+from api.streaming.broadcaster import StreamHub, SUBSCRIBER_QUEUE_SIZE
+from api.streaming.motion import MotionGate, MOTION_THRESHOLD
+from api.streaming.ingest import IngestSession, decode_ingest_frame, INGEST_CREDITS, INGEST_HEADER
+from api.detectors.preprocessing import STRIDE, MAX_IMGSZ, DEFAULT_CONF
+from api.detectors.inference_executor import InferenceTimeout, ClientDisconnected, IMAGE_TIMEOUT_S, VIDEO_TIMEOUT_S
+from api import crud, schemas, database, models
+from api.metrics import ACTIVE_STREAMS, WS_FRAMES, WS_SEND_LAG
+from api.profiling import current_profile
+from api.video_jobs import JOB_INPUT_DIR
+from api.model_loader import RETRY_AFTER_S
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 import os
+import json
 import tempfile
 import numpy as np
 from io import BytesIO
 from PIL import Image
 import cv2
 import asyncio
-import base64
 import logging
 import time
 
-router = APIRouter(prefix="/yolo", tags=["YOLOv11"])
-detector = None  # Le détecteur sera injecté depuis main.py
+def require_model_ready(connection: HTTPConnection):
+    """Refuse les requêtes (503 + Retry-After) tant que le modèle n'est pas chargé et préchauffé."""
+    if model_loader is not None and model_loader.ready:
+        return
+    detail = "Le modèle est en cours de chargement, réessayez plus tard."
+    if model_loader is not None and model_loader.failed:
+        detail = f"Le modèle n'a pas pu être chargé : {model_loader.error}"
+    if connection.scope["type"] == "websocket":
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason=detail[:120])
+    raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(RETRY_AFTER_S)})
+
+router = APIRouter(prefix="/yolo", tags=["YOLOv11"], dependencies=[Depends(require_model_ready)])
+model_loader = None  # Chargement du modèle en arrière-plan, injecté depuis main.py
+detector = None  # Le détecteur sera injecté depuis main.py une fois chargé
+batch_scheduler = None  # Planificateur de lots injecté depuis main.py
+result_cache = None  # Cache des résultats sur image injecté depuis main.py (None si désactivé)
+inference_executor = None  # Exécuteur d'inférence injecté depuis main.py
+job_pool = None  # Workers des travaux vidéo injectés depuis main.py
 video_source = None
+frame_capture = None  # Thread de lecture de video_source : seule la frame la plus récente est conservée
+stream_hub = None  # Boucles d'inférence de frame_capture partagées par les WebSockets
 streaming_active = False
 
+# Taille des blocs lus depuis l'upload : la vidéo n'est jamais entièrement chargée en mémoire.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def _spool_upload(file: UploadFile, suffix: str, directory: Optional[str] = None) -> str:
+    """Copie l'upload sur disque par blocs et retourne le chemin du fichier créé."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as spooled:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                spooled.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def _remove_files(*paths: Optional[str]):
+    for path in paths:
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"Impossible de supprimer le fichier temporaire {path} : {e}")
+
+def inference_options(
+    connection: HTTPConnection,
+    imgsz: Optional[int] = Query(None, ge=STRIDE, le=MAX_IMGSZ, description=f"Taille d'entrée du modèle (multiple de {STRIDE}); les images plus grandes sont réduites"),
+    conf: float = Query(DEFAULT_CONF, gt=0, lt=1, description="Seuil de confiance des détections")
+) -> dict:
+    """Paramètres d'inférence propres à la requête, pour adapter latence et précision au client."""
+    if imgsz is not None and imgsz % STRIDE != 0:
+        detail = f"imgsz doit être un multiple de {STRIDE}"
+        if connection.scope["type"] == "websocket":
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=detail)
+        raise HTTPException(status_code=422, detail=detail)
+    return {"imgsz": imgsz, "conf": conf}
+
+@router.get("/executor/stats")
+async def executor_stats():
+    """Occupation de l'exécuteur d'inférence, du planificateur de lots, du cache de résultats et de la capture caméra."""
+    return {
+        "executor": inference_executor.stats(),
+        "batching": batch_scheduler.stats(),
+        "cache": result_cache.stats() if result_cache is not None else None,
+        "capture": frame_capture.stats() if frame_capture is not None else None,
+        "streams": stream_hub.stats() if stream_hub is not None else []
+    }
+
+async def _detect_image(image_np: np.ndarray, options: dict) -> tuple:
+    """Détections d'une image, depuis le cache si elle a déjà été analysée avec les mêmes options."""
+    if current_profile() is not None:
+        # Une requête profilée n'est pas regroupée avec d'autres : l'appel au modèle lui est attribué.
+        return await inference_executor.run("process_image", image_np, **options)
+    if result_cache is None:
+        return await batch_scheduler.submit(image_np, **options)
+    # Le condensé d'une grande image prend quelques dizaines de ms : il est calculé hors de la boucle.
+    key = await asyncio.to_thread(result_cache.make_key, image_np, options)
+    computed = False
+
+    async def compute():
+        nonlocal computed
+        computed = True
+        return await batch_scheduler.submit(image_np, **options)
+
+    start = time.perf_counter()
+    detections, metrics = await result_cache.get_or_compute(key, compute)
+    if not computed:
+        # Résultat servi par le cache (ou par l'inférence d'une requête identique) : le temps
+        # enregistré est celui de cette requête, pas celui de l'inférence d'origine.
+        metrics = {**metrics, "prediction_time": time.perf_counter() - start, "cached": True}
+    return detections, metrics
+
 @router.post("/predict")
 async def predict(
+    request: Request,
     file: UploadFile = File(...),
     session_id: int = Query(...),
     video_id: int = Query(...),
-    output_format: OutputFormat = Query(OutputFormat.IMAGE, description="Format de sortie: image, json, ou csv"),
+    output_format: OutputFormat = Query(OutputFormat.IMAGE, description="Format de sortie: image, json, csv, parquet ou arrow"),
+    image_encoding: ImageEncoding = Query(ImageEncoding.JPEG, description="Encodage de l'image annotée: jpeg ou webp"),
+    image_quality: int = Query(90, ge=1, le=100, description="Qualité de l'image annotée (1-100)"),
+    options: dict = Depends(inference_options),
     db: AsyncSession = Depends(database.get_db)
 ):
     if not file.content_type.startswith("image/"):
@@ -36,7 +148,9 @@ async def predict(
         image = Image.open(BytesIO(contents)).convert("RGB")
         image_np = np.array(image)
 
-        detections, metrics = detector.process_image(image_np)
+        detections, metrics = await inference_executor.guard(
+            _detect_image(image_np, options), timeout=IMAGE_TIMEOUT_S, request=request, label="predict"
+        )
         
         if detections:
             attempt = schemas.PostureAttemptCreate(
@@ -50,13 +164,12 @@ async def predict(
             await crud.create_posture_attempt(db, attempt)
 
         if output_format == OutputFormat.IMAGE:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_output:
-                temp_output_path = temp_output.name
-                detector.process_image(image_np, temp_output_path)
-            with open(temp_output_path, "rb") as annotated_file:
-                encoded_image = annotated_file.read()
-            os.remove(temp_output_path)
-            return Response(content=encoded_image, media_type="image/jpeg")
+            # Les détections du passage précédent sont réutilisées : pas de seconde inférence ni de fichier temporaire.
+            encoded_image = await inference_executor.run(
+                "annotate_and_encode", image_np, detections,
+                image_format=image_encoding.value, quality=image_quality, rgb_input=True, request=request
+            )
+            return Response(content=encoded_image, media_type=f"image/{image_encoding.value}")
         
         elif output_format == OutputFormat.JSON:
             detection_objects = [
@@ -71,42 +184,60 @@ async def predict(
                 total_detections=len(detections),
                 prediction_time=metrics["prediction_time"],
                 avg_confidence=metrics["avg_confidence"],
-                frames_processed=metrics["frames_processed"]
+                frames_processed=metrics["frames_processed"],
+                cached=metrics.get("cached", False)
             )
             
-        elif output_format == OutputFormat.CSV:
+        else:
+            extension, media_type = EXPORT_FORMATS[output_format.value]
             os.makedirs("temp_results", exist_ok=True)
-            csv_filename = f"detections_{file.filename.split('.')[0]}.csv"
-            csv_path = os.path.join("temp_results", csv_filename)
-            detector.save_detections_to_csv(detections, csv_path)
+            export_filename = f"detections_{file.filename.split('.')[0]}{extension}"
+            export_path = os.path.join("temp_results", export_filename)
+            detector.save_detections(detections, export_path, output_format.value)
             return FileResponse(
-                path=csv_path,
-                filename=csv_filename,
-                media_type="text/csv"
+                path=export_path,
+                filename=export_filename,
+                media_type=media_type
             )
 
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected as e:
+        raise HTTPException(status_code=499, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur : {str(e)}")
 
 @router.post("/predict-video")
 async def predict_video(
+    request: Request,
     file: UploadFile = File(...),
     session_id: int = Query(...),
     video_id: int = Query(...),
+    output_format: OutputFormat = Query(OutputFormat.IMAGE, description="Format de sortie: image (vidéo annotée), json, csv, parquet ou arrow"),
+    sampling: SamplingMode = Query(SamplingMode.ALL, description="Frames analysées: all, stride, fps, keyframes ou track (suivi des chiens)"),
+    frame_stride: int = Query(1, ge=1, le=300, description="Modes stride et track: une frame analysée (détectée) sur N"),
+    target_fps: Optional[float] = Query(None, gt=0, le=120, description="Mode fps: nombre de frames analysées par seconde"),
+    segments: int = Query(VIDEO_SEGMENTS, ge=1, le=64, description="Segments temporels traités en parallèle (vidéos longues)"),
+    options: dict = Depends(inference_options),
     db: AsyncSession = Depends(database.get_db)
 ):
     if not file.content_type.startswith("video/"):
         raise HTTPException(status_code=400, detail="File must be a video")
+    if sampling == SamplingMode.FPS and target_fps is None:
+        raise HTTPException(status_code=400, detail="target_fps is required when sampling=fps")
 
+    temp_input_path = temp_output_path = None
     try:
-        contents = await file.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_input:
-            temp_input.write(contents)
-            temp_input_path = temp_input.name
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_output:
-            temp_output_path = temp_output.name
-            result = detector.process_video(temp_input_path, temp_output_path)
+        temp_input_path = await _spool_upload(file, ".mp4")
+        # La vidéo annotée n'est produite que si elle est demandée.
+        if output_format == OutputFormat.IMAGE:
+            fd, temp_output_path = tempfile.mkstemp(suffix=".mp4")
+            os.close(fd)
+        result = await inference_executor.run(
+            "process_video", temp_input_path, temp_output_path,
+            sampling=sampling.value, frame_stride=frame_stride, target_fps=target_fps, segments=segments, **options,
+            timeout=VIDEO_TIMEOUT_S, request=request, cancellable=True
+        )
 
         if result["detections"]:
             attempt = schemas.PostureAttemptCreate(
@@ -119,104 +250,435 @@ async def predict_video(
             )
             await crud.create_posture_attempt(db, attempt) # On ne récupère pas le retour
 
-        with open(temp_output_path, "rb") as output_file:
-            encoded_video = output_file.read()
-
-        os.remove(temp_input_path)
-        os.remove(temp_output_path)
+        base_name = os.path.splitext(file.filename or 'video')[0]
+        if output_format == OutputFormat.JSON:
+            return VideoDetectionResponse(
+                detections=[
+                    Detection(class_name=det["class_name"], confidence=det["confidence"], bbox=det["bbox"], track_id=det.get("track_id"))
+                    for det in result["detections"]
+                ],
+                prediction_time=result["prediction_time"],
+                avg_confidence=result["avg_confidence"],
+                frames_processed=result["frames_processed"],
+                tracks=result.get("tracks")
+            )
+        if output_format != OutputFormat.IMAGE:
+            # Export colonnaire des détections de toutes les frames, supprimé après envoi.
+            extension, media_type = EXPORT_FORMATS[output_format.value]
+            fd, temp_output_path = tempfile.mkstemp(suffix=extension)
+            os.close(fd)
+            detector.save_detections(result["detections"], temp_output_path, output_format.value)
+            response = FileResponse(
+                path=temp_output_path,
+                media_type=media_type,
+                filename=f"detections_{base_name}{extension}",
+                background=BackgroundTask(_remove_files, temp_output_path)
+            )
+            temp_output_path = None
+            return response
 
-        return Response(content=encoded_video, media_type="video/mp4")
+        # La vidéo annotée est servie depuis le disque (requêtes Range acceptées)
+        # et supprimée une fois la réponse entièrement envoyée.
+        response = FileResponse(
+            path=temp_output_path,
+            media_type="video/mp4",
+            filename=f"annotated_{base_name}.mp4",
+            content_disposition_type="inline",
+            background=BackgroundTask(_remove_files, temp_output_path)
+        )
+        temp_output_path = None
+        return response
 
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected as e:
+        raise HTTPException(status_code=499, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors du traitement de la vidéo : {str(e)}")
+    finally:
+        _remove_files(temp_input_path, temp_output_path)
+
+def _count_frames(video_path: str) -> Optional[int]:
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+def _job_status(request: Request, job) -> VideoJobStatus:
+    links = {"self": str(request.url_for("get_video_job", job_id=job.id))}
+    if job.status == models.JobStatusEnum.completed:
+        links["result"] = str(request.url_for("get_video_job_result", job_id=job.id))
+    progress = min(1.0, job.frames_done / job.total_frames) if job.total_frames else None
+    if job.status == models.JobStatusEnum.completed:
+        progress = 1.0
+    return VideoJobStatus(
+        **schemas.db_schemas.VideoJob.model_validate(job).model_dump(),
+        progress=progress,
+        links=links
+    )
+
+@router.post("/jobs", response_model=VideoJobStatus, status_code=202)
+async def create_video_job(
+    request: Request,
+    file: UploadFile = File(...),
+    session_id: int = Query(...),
+    video_id: int = Query(...),
+    sampling: SamplingMode = Query(SamplingMode.ALL, description="Frames analysées: all, stride, fps, keyframes ou track (suivi des chiens)"),
+    frame_stride: int = Query(1, ge=1, le=300, description="Modes stride et track: une frame analysée (détectée) sur N"),
+    target_fps: Optional[float] = Query(None, gt=0, le=120, description="Mode fps: nombre de frames analysées par seconde"),
+    db: AsyncSession = Depends(database.get_db)
+):
+    """Enregistre une vidéo à traiter en arrière-plan et retourne immédiatement l'identifiant du travail."""
+    if not file.content_type.startswith("video/"):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    if sampling == SamplingMode.FPS and target_fps is None:
+        raise HTTPException(status_code=400, detail="target_fps is required when sampling=fps")
+    # Existence et posture vérifiées avant d'écrire la vidéo sur disque (create_video_job les vérifie de nouveau).
+    await crud.get_session_and_video(db, session_id, video_id)
+
+    os.makedirs(JOB_INPUT_DIR, exist_ok=True)
+    input_path = await _spool_upload(file, ".mp4", directory=JOB_INPUT_DIR)
+    try:
+        total_frames = await asyncio.to_thread(_count_frames, input_path)
+        if total_frames is None:
+            raise HTTPException(status_code=400, detail="Unreadable video file")
+        job = await crud.create_video_job(db, schemas.db_schemas.VideoJobCreate(
+            session_id=session_id,
+            video_id=video_id,
+            input_path=input_path,
+            sampling=sampling.value,
+            frame_stride=frame_stride,
+            target_fps=target_fps,
+            total_frames=total_frames
+        ))
+    except BaseException:
+        _remove_files(input_path)
+        raise
+    job_pool.wake()
+    return _job_status(request, job)
+
+@router.get("/jobs/{job_id}", response_model=VideoJobStatus)
+async def get_video_job(request: Request, job_id: int, db: AsyncSession = Depends(database.get_db)):
+    """État et avancement (frames traitées / total) d'un travail vidéo."""
+    job = await crud.get_video_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Video job with id {job_id} not found")
+    return _job_status(request, job)
+
+@router.get("/jobs/{job_id}/result")
+async def get_video_job_result(job_id: int, db: AsyncSession = Depends(database.get_db)):
+    """Vidéo annotée d'un travail terminé (requêtes Range acceptées)."""
+    job = await crud.get_video_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Video job with id {job_id} not found")
+    if job.status != models.JobStatusEnum.completed:
+        raise HTTPException(status_code=409, detail=f"Video job {job_id} is {job.status.value}")
+    if not job.output_path or not os.path.exists(job.output_path):
+        # Supprimé par la rétention des résultats (YOLO_JOB_RESULT_TTL_S).
+        raise HTTPException(status_code=410, detail=f"Result of video job {job_id} is no longer available")
+    return FileResponse(
+        path=job.output_path,
+        media_type="video/mp4",
+        filename=f"job_{job_id}.mp4",
+        content_disposition_type="inline"
+    )
 
 @router.post("/start-stream")
 async def start_stream():
-    global video_source, streaming_active
+    global video_source, frame_capture, stream_hub, streaming_active
     if not streaming_active:
         video_source = cv2.VideoCapture(0)
         if not video_source.isOpened():
             return JSONResponse(status_code=500, content={"message": "Webcam inaccessible"})
+        frame_capture = LatestFrameCapture(video_source, name="webcam")
+        frame_capture.start()
+        stream_hub = StreamHub(frame_capture)
         streaming_active = True
         return JSONResponse(content={"message": "Streaming activé"})
     return JSONResponse(content={"message": "Streaming déjà actif"})
 
 @router.post("/stop-stream")
 async def stop_stream():
-    global video_source, streaming_active
+    global video_source, frame_capture, stream_hub, streaming_active
     if streaming_active:
+        if stream_hub:
+            await stream_hub.close()
+            stream_hub = None
+        if frame_capture:
+            await asyncio.to_thread(frame_capture.stop)
+            frame_capture = None
         if video_source:
             video_source.release()
         streaming_active = False
         return JSONResponse(content={"message": "Streaming arrêté"})
     return JSONResponse(content={"message": "Déjà arrêté"})
 
+async def _track_frame(tracker: Tracker, frame_number: int, frame: np.ndarray, options: dict) -> list:
+    """Détecte sur la frame si le suivi le demande, sinon propage les pistes sans passer par le modèle."""
+    if tracker.needs_detection(frame_number):
+        detections = await inference_executor.run("detect_table", frame, **{**options, "conf": tracker.low_conf})
+        table = tracker.update(frame_number, detections)
+    else:
+        table = tracker.propagate(frame_number)
+    return table.to_records(frame_fields=False)
+
+def _stream_inference(options: dict, track: bool, track_every: int, motion_threshold: float = MOTION_THRESHOLD):
+    """
+    Inférence d'une boucle de diffusion ; le traqueur éventuel est partagé par ses abonnés.
+
+    Avec `motion_threshold` > 0, une frame quasi identique à la dernière frame
+    analysée reprend ses détections sans passer par le modèle ; en mode suivi,
+    les pistes sont propagées jusqu'à cette frame pour que leur état avance
+    avec les numéros de frame.
+    """
+    tracker = Tracker(detect_every=track_every, high_conf=options["conf"]) if track else None
+    gate = MotionGate(motion_threshold) if motion_threshold > 0 else None
+    previous = None
+
+    async def infer(frame_number: int, frame: np.ndarray) -> list:
+        nonlocal previous
+        # Sans résultat précédent, rien ne peut être réutilisé : la frame passe et devient la référence.
+        if gate is not None and not gate.should_infer(frame, force=previous is None):
+            if tracker is None:
+                return previous
+            return tracker.propagate(frame_number).to_records(frame_fields=False)
+        if tracker is None:
+            detections, _ = await inference_executor.run("process_image", frame, **options)
+        else:
+            # Numéro de frame de la caméra : le suivi tient compte des frames sautées.
+            detections = await _track_frame(tracker, frame_number, frame, options)
+        previous = detections
+        return detections
+
+    infer.motion_gate = gate
+    infer.tracker = tracker
+    return infer
+
 @router.websocket("/ws/{session_id}/{video_id}")
-async def stream_video(websocket: WebSocket, session_id: int, video_id: int):
-    global video_source, streaming_active
+async def stream_video(
+    websocket: WebSocket,
+    session_id: int,
+    video_id: int,
+    options: dict = Depends(inference_options),
+    track: bool = Query(False, description="Suivi des chiens : identifiant de piste stable, détection intermittente"),
+    track_every: int = Query(5, ge=1, le=300, description="Mode suivi : une frame détectée sur N"),
+    protocol: StreamProtocol = Query(StreamProtocol.JSON, description="json (frame JPEG en base64) ou binary (en-tête + détections empaquetées + JPEG brut)"),
+    quality: Optional[int] = Query(None, ge=10, le=100, description="Qualité JPEG maximale des frames envoyées"),
+    max_width: Optional[int] = Query(None, ge=64, le=4096, description="Largeur maximale des frames envoyées (les boîtes restent dans le repère de la frame analysée)"),
+    pixels: bool = Query(True, description="false : détections seules, sans image"),
+    adaptive: Optional[bool] = Query(None, description="Baisse la qualité JPEG quand l'envoi au client ralentit (par défaut : protocole binary uniquement)"),
+    queue_size: int = Query(SUBSCRIBER_QUEUE_SIZE, ge=1, le=100, description="Frames analysées en attente d'envoi à ce client"),
+    drop: DropPolicy = Query(DropPolicy.OLDEST, description="File pleine : oldest (rester en direct) ou newest (ignorer les nouvelles frames)"),
+    motion_threshold: float = Query(MOTION_THRESHOLD, ge=0, le=1, description="Part des pixels changés sous laquelle les détections précédentes sont réutilisées (0 : modèle sur chaque frame)")
+):
     await websocket.accept()
-    if not streaming_active or not video_source or not video_source.isOpened():
+    hub = stream_hub
+    if not streaming_active or hub is None:
         await websocket.close()
         return
 
+    # La caméra est lue par son propre thread et chaque jeu d'options d'inférence n'est
+    # analysé qu'une fois, quel que soit le nombre de clients : cette connexion ne fait
+    # qu'encoder et envoyer les résultats publiés dans sa file.
+    stream_key = (options["imgsz"], options["conf"], track, track_every if track else None, motion_threshold)
+    subscriber = hub.subscribe(stream_key, lambda: _stream_inference(options, track, track_every, motion_threshold), queue_size, drop.value)
+    ACTIVE_STREAMS.inc()
     try:
         frame_count = 0
         confidences = []
         start_time = time.time()
-        while streaming_active:
-            ret, frame = video_source.read()
-            if not ret:
+        encoder = StreamEncoder(detector.class_names, protocol.value, quality, max_width, pixels, adaptive)
+        if encoder.binary:
+            await websocket.send_json(encoder.hello())
+        while True:
+            result = await subscriber.get()
+            if result is None:
                 break
+            frame_number, frame, detections = result
             frame_count += 1
-            detections, metrics = detector.process_image(frame)
             for det in detections:
                 confidences.append(det["confidence"])
             
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            await websocket.send_json({"frame": frame_base64, "detections": detections})
-            await asyncio.sleep(0.1)
+            message = encoder.encode(frame_number, frame, detections)
+            send_start = time.perf_counter()
+            if encoder.binary:
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_json(message)
+            send_lag = time.perf_counter() - send_start
+            WS_SEND_LAG.observe(send_lag)
+            WS_FRAMES.inc()
+            encoder.record_send_lag(send_lag)
         
         prediction_time = time.time() - start_time
         avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
         print(f"WebSocket stream: {frame_count} frames, {prediction_time:.2f}s, avg confidence: {avg_confidence:.2f}")
+        # Fin de la capture ou arrêt du streaming : le client est prévenu par une fermeture normale.
+        await websocket.close()
 
     except WebSocketDisconnect:
         logging.info("Client disconnected from WebSocket.")
     except Exception as e:
         logging.error(f"An error occurred in the WebSocket stream: {e}")
     finally:
+        hub.unsubscribe(subscriber)
+        ACTIVE_STREAMS.dec()
         # La connexion est gérée par le contexte de FastAPI, pas besoin de fermer ici.
         logging.info("WebSocket stream loop ended.")
 
+@router.websocket("/ws-ingest/{session_id}")
+async def ingest_stream(
+    websocket: WebSocket,
+    session_id: int,
+    options: dict = Depends(inference_options),
+    track: bool = Query(False, description="Suivi des chiens : identifiant de piste stable, détection intermittente"),
+    track_every: int = Query(5, ge=1, le=300, description="Mode suivi : une frame détectée sur N"),
+    protocol: StreamProtocol = Query(StreamProtocol.JSON, description="Format des résultats : json ou binary (mêmes messages que /ws, sans image)"),
+    credits: int = Query(INGEST_CREDITS, ge=1, le=16, description="Frames que le client peut envoyer sans attendre de réponse"),
+    motion_threshold: float = Query(MOTION_THRESHOLD, ge=0, le=1, description="Part des pixels changés sous laquelle les détections précédentes sont réutilisées (0 : modèle sur chaque frame)")
+):
+    """
+    Streaming depuis la caméra du navigateur : le client envoie ses frames, le serveur renvoie les détections.
+
+    Chaque frame envoyée consomme un crédit ; chaque réponse (résultat, frame
+    `dropped` ou `error`) en rend un. Un message texte
+    `{"type": "validate", "video_id": N}` enregistre une tentative pour la
+    vidéo de référence N (qui change au fil de la session, d'où son absence
+    du chemin) à partir de la prochaine frame analysée.
+    """
+    await websocket.accept()
+    session = IngestSession(credits)
+    encoder = StreamEncoder(detector.class_names, protocol.value, pixels=False)
+    infer = _stream_inference(options, track, track_every, motion_threshold)
+    send_lock = asyncio.Lock()
+    validations = []
+
+    async def send(message):
+        async with send_lock:
+            if isinstance(message, bytes):
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_json(message)
+
+    async def receive_frames():
+        # Réception indépendante de l'inférence : une frame arrivée pendant l'analyse
+        # remplace celle en attente et le crédit de l'ancienne est rendu aussitôt.
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    try:
+                        dropped = session.offer(message["bytes"])
+                    except ValueError as e:
+                        await send({"type": "error", "message": str(e), "credits": 1})
+                        continue
+                    if dropped is not None:
+                        await send({"type": "dropped", "frame_number": dropped, "credits": 1})
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                        if control.get("type") == "validate":
+                            target = control.get("video_id")
+                            if not isinstance(target, int) or isinstance(target, bool):
+                                raise ValueError("video_id entier requis")
+                            validations.append(target)
+                    except (ValueError, TypeError, AttributeError) as e:
+                        await send({"type": "error", "message": f"Message de contrôle invalide : {e}"})
+        finally:
+            session.close()
+
+    ACTIVE_STREAMS.inc()
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        await send({**encoder.hello(), "mode": "ingest", "credits": credits, "ingest_header_size": INGEST_HEADER.size})
+        while True:
+            payload = await session.take()
+            if payload is None:
+                break
+            try:
+                frame_number, frame = await asyncio.to_thread(decode_ingest_frame, payload)
+            except ValueError as e:
+                session.reject()
+                await send({"type": "error", "message": str(e), "credits": 1})
+                continue
+            start = time.perf_counter()
+            detections = await infer(frame_number, frame)
+            prediction_time = time.perf_counter() - start
+            session.mark_inferred()
+            message = encoder.encode(frame_number, frame, detections)
+            if isinstance(message, dict):
+                message = {"type": "result", "frame_number": frame_number, "credits": 1, **message}
+            send_start = time.perf_counter()
+            await send(message)
+            WS_SEND_LAG.observe(time.perf_counter() - send_start)
+            WS_FRAMES.inc()
+            while validations:
+                await send(await _validate_ingested(session_id, validations.pop(0), detections, prediction_time))
+        motion = infer.motion_gate.stats() if infer.motion_gate is not None else None
+        logging.info(f"Ingestion WebSocket terminée : {session.stats()}, filtre de mouvement : {motion}")
+    except WebSocketDisconnect:
+        logging.info("Client disconnected from ingestion WebSocket.")
+    except Exception as e:
+        logging.error(f"An error occurred in the ingestion WebSocket: {e}")
+    finally:
+        receiver.cancel()
+        ACTIVE_STREAMS.dec()
+
+async def _validate_ingested(session_id: int, video_id: int, detections: list, prediction_time: float) -> dict:
+    """Enregistre une tentative à partir des détections d'une frame envoyée par le navigateur."""
+    async with database.SessionLocal() as db:
+        # La vidéo vient du client : elle doit exister et correspondre à la posture de la session.
+        try:
+            await crud.get_session_and_video(db, session_id, video_id)
+        except HTTPException as e:
+            return {"type": "validation", "recorded": False, "video_id": video_id, "message": e.detail}
+        if not detections:
+            return {"type": "validation", "recorded": False, "message": "No posture detected in the current frame."}
+        result = await _record_attempt(db, session_id, video_id, detections[0], prediction_time)
+    return {"type": "validation", "recorded": True, "result": result, "message": f"Attempt recorded with result: {result}"}
+
+async def _record_attempt(db: AsyncSession, session_id: int, video_id: int, detection: dict, prediction_time: float) -> str:
+    attempt = schemas.PostureAttemptCreate(
+        session_id=session_id,
+        video_id=video_id,
+        confidence=detection["confidence"],
+        result=detection["result"],
+        prediction_time=prediction_time,
+        frames_processed=1
+    )
+    await crud.create_posture_attempt(db, attempt)
+    return detection["result"]
+
 @router.post("/validate-posture")
 async def validate_posture(
+    request: Request,
     session_id: int = Query(...),
     video_id: int = Query(...),
     db: AsyncSession = Depends(database.get_db)
 ):
-    global video_source, streaming_active
-    if not streaming_active or not video_source or not video_source.isOpened():
+    if not streaming_active or frame_capture is None:
         raise HTTPException(status_code=400, detail="Streaming is not active.")
 
-    ret, frame = video_source.read()
-    if not ret:
+    # Frame la plus récente lue par le thread de capture (la caméra n'est jamais lue ici).
+    latest = frame_capture.latest() or await frame_capture.next_frame(0)
+    if latest is None:
         raise HTTPException(status_code=500, detail="Failed to capture frame from webcam.")
+    _, frame = latest
 
-    detections, metrics = detector.process_image(frame)
+    try:
+        detections, metrics = await inference_executor.run("process_image", frame, request=request)
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected as e:
+        raise HTTPException(status_code=499, detail=str(e))
 
     if not detections:
         return JSONResponse(status_code=400, content={"message": "No posture detected in the current frame."})
 
-    first_detection = detections[0]
-    attempt = schemas.PostureAttemptCreate(
-        session_id=session_id,
-        video_id=video_id,
-        confidence=first_detection["confidence"],
-        result=first_detection["result"],
-        prediction_time=metrics["prediction_time"],
-        frames_processed=1
-    )
-    await crud.create_posture_attempt(db, attempt)
-
-    return JSONResponse(content={"message": f"Attempt recorded with result: {first_detection['result']}"})
\ No newline at end of file
+    result = await _record_attempt(db, session_id, video_id, detections[0], metrics["prediction_time"])
+    return JSONResponse(content={"message": f"Attempt recorded with result: {result}"})
\ No newline at end of file
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
-from ..models import PostureEnum
+from typing import Optional, List, Dict, Any
+from ..models import PostureEnum, JobStatusEnum
 
 class DogBase(BaseModel):
     name: str
@@ -71,5 +71,40 @@ class VideoReference(BaseModel):
     id: int
     posture: PostureEnum
     video_path: str
+    class Config:
+        from_attributes = True
+
+class ReferenceVideoIndex(BaseModel):
+    video: VideoReference
+    sha256: str
+    model_version: str
+    indexed_at: str
+    summary: Dict[str, Any]
+    detections: Optional[List[Dict[str, Any]]] = None
+
+class VideoJobCreate(BaseModel):
+    session_id: int
+    video_id: int
+    input_path: str
+    sampling: str = "all"
+    frame_stride: int = 1
+    target_fps: Optional[float] = None
+    total_frames: Optional[int] = None
+
+class VideoJob(BaseModel):
+    id: int
+    session_id: int
+    video_id: int
+    status: JobStatusEnum
+    sampling: str
+    frame_stride: int
+    target_fps: Optional[float] = None
+    total_frames: Optional[int] = None
+    frames_done: int
+    result_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,16 +1,49 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Dict, Optional
 from enum import Enum
+from .db_schemas import VideoJob
 
 class OutputFormat(str, Enum):
     IMAGE = "image"
     JSON = "json"
     CSV = "csv"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+class ImageEncoding(str, Enum):
+    JPEG = "jpeg"
+    WEBP = "webp"
+
+class StreamProtocol(str, Enum):
+    JSON = "json"
+    BINARY = "binary"
+
+class DropPolicy(str, Enum):
+    OLDEST = "oldest"
+    NEWEST = "newest"
+
+class SamplingMode(str, Enum):
+    ALL = "all"
+    STRIDE = "stride"
+    FPS = "fps"
+    KEYFRAMES = "keyframes"
+    TRACK = "track"
 
 class Detection(BaseModel):
     class_name: str
     confidence: float
     bbox: List[float]
+    track_id: Optional[int] = None
+
+class TrackSummary(BaseModel):
+    track_id: int
+    first_frame: int
+    last_frame: int
+    frames: int
+    detected_frames: int
+    class_name: str
+    mean_confidence: float
+    class_frames: Dict[str, int]
 
 class DetectionResponse(BaseModel):
     detections: List[Detection]
@@ -18,9 +51,16 @@ class DetectionResponse(BaseModel):
     prediction_time: float
     avg_confidence: float
     frames_processed: int
+    # True si le résultat vient du cache : prediction_time est alors le temps de lecture du cache.
+    cached: bool = False
 
 class VideoDetectionResponse(BaseModel):
     detections: List[Detection]
     prediction_time: float
     avg_confidence: float
-    frames_processed: int
\ No newline at end of file
+    frames_processed: int
+    tracks: Optional[List[TrackSummary]] = None
+
+class VideoJobStatus(VideoJob):
+    progress: Optional[float] = None
+    links: Dict[str, str]
\ No newline at end of file
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+from collections import namedtuple
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from api.metrics import WS_FRAMES_DROPPED
+from api.streaming.capture import LatestFrameCapture
+
+logger = logging.getLogger(__name__)
+
+# Résultats en attente par abonné : au-delà, la politique d'abandon s'applique.
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("YOLO_WS_QUEUE_SIZE", "2"))
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+
+# Frame analysée publiée aux abonnés (la frame n'est jamais modifiée après publication).
+StreamResult = namedtuple("StreamResult", ["frame_number", "frame", "detections"])
+
+
+class Subscriber:
+    """
+    File bornée d'un client du streaming.
+
+    La publication ne bloque jamais : file pleine, `drop="oldest"` remplace le
+    résultat le plus ancien (le client reste au plus près du direct) et
+    `drop="newest"` ignore le nouveau (le client voit toutes les frames qu'il
+    a pu recevoir, avec du retard).
+    """
+
+    def __init__(self, key: Hashable, queue_size: int = SUBSCRIBER_QUEUE_SIZE, drop: str = DROP_OLDEST):
+        if queue_size < 1:
+            raise ValueError("queue_size doit être supérieur ou égal à 1")
+        if drop not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Politique d'abandon inconnue : {drop}")
+        self.key = key
+        self.drop = drop
+        self.broadcaster: Optional["StreamBroadcaster"] = None
+        self.queue_size = queue_size
+        # La borne est appliquée par `publish` : la marque de fin trouve toujours sa place.
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def publish(self, result: StreamResult):
+        if self.closed:
+            return
+        if self._queue.qsize() >= self.queue_size:
+            self.dropped += 1
+            WS_FRAMES_DROPPED.inc()
+            if self.drop == DROP_NEWEST:
+                return
+            self._queue.get_nowait()
+        self._queue.put_nowait(result)
+
+    def close(self):
+        """Signale la fin du flux : `get` retourne None une fois la file vidée."""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put_nowait(None)
+
+    async def get(self) -> Optional[StreamResult]:
+        result = await self._queue.get()
+        if result is not None:
+            self.delivered += 1
+        return result
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "delivered": self.delivered, "dropped": self.dropped, "drop": self.drop}
+
+
+class StreamBroadcaster:
+    """
+    Boucle d'inférence unique d'une source, publiée à tous ses abonnés.
+
+    La tâche prend la frame la plus récente de la capture, appelle `infer`
+    une seule fois quel que soit le nombre de clients, puis dépose le
+    résultat dans la file de chaque abonné. Elle démarre avec le premier
+    abonné et s'arrête avec le dernier, ou à la fin de la capture (les
+    abonnés restants sont alors fermés). `frames_skipped` compte les frames
+    de la caméra que cette boucle n'a pas analysées (elle était occupée) ;
+    l'abandon global de la capture est dans ses propres statistiques.
+    """
+
+    def __init__(self, capture: LatestFrameCapture, infer: Callable[[int, np.ndarray], Awaitable[List[Dict]]], key: Hashable = None):
+        self.capture = capture
+        self.infer = infer
+        self.key = key
+        self.subscribers: List[Subscriber] = []
+        self._task: Optional[asyncio.Task] = None
+        self.frames_published = 0
+        self.frames_skipped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def add(self, subscriber: Subscriber):
+        subscriber.broadcaster = self
+        self.subscribers.append(subscriber)
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    def remove(self, subscriber: Subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+        subscriber.close()
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        frame_number = 0
+        try:
+            while self.subscribers:
+                latest = await self.capture.next_frame(frame_number)
+                if latest is None:
+                    if self.capture.ended:
+                        break
+                    continue
+                if frame_number:
+                    self.frames_skipped += latest[0] - frame_number - 1
+                frame_number, frame = latest
+                detections = await self.infer(frame_number, frame)
+                result = StreamResult(frame_number, frame, detections)
+                for subscriber in list(self.subscribers):
+                    subscriber.publish(result)
+                self.frames_published += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erreur dans la boucle d'inférence du streaming : {e}")
+        # Fin de la capture ou erreur : les clients restants terminent leur flux.
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+
+    async def stop(self):
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+        self.subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        motion_gate = getattr(self.infer, "motion_gate", None)
+        return {
+            "running": self.running,
+            "frames_published": self.frames_published,
+            "frames_skipped": self.frames_skipped,
+            "motion": motion_gate.stats() if motion_gate is not None else None,
+            "subscribers": [subscriber.stats() for subscriber in self.subscribers],
+        }
+
+
+class StreamHub:
+    """
+    Diffuseurs d'une capture, un par jeu d'options d'inférence.
+
+    Les clients qui demandent les mêmes options (taille d'entrée, seuil,
+    suivi) partagent la même boucle d'inférence ; `make_infer` n'est appelé
+    qu'à la création d'un nouveau diffuseur (état du suivi compris).
+    """
+
+    def __init__(self, capture: LatestFrameCapture):
+        self.capture = capture
+        self.broadcasters: Dict[Hashable, StreamBroadcaster] = {}
+
+    def subscribe(self, key: Hashable, make_infer: Callable[[], Callable], queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+                  drop: str = DROP_OLDEST) -> Subscriber:
+        subscriber = Subscriber(key, queue_size, drop)
+        broadcaster = self.broadcasters.get(key)
+        if broadcaster is None or not broadcaster.running:
+            broadcaster = self.broadcasters[key] = StreamBroadcaster(self.capture, make_infer(), key)
+        broadcaster.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        broadcaster = subscriber.broadcaster
+        if broadcaster is None:
+            subscriber.close()
+            return
+        broadcaster.remove(subscriber)
+        if not broadcaster.subscribers and self.broadcasters.get(subscriber.key) is broadcaster:
+            del self.broadcasters[subscriber.key]
+
+    async def close(self):
+        broadcasters = list(self.broadcasters.values())
+        self.broadcasters.clear()
+        for broadcaster in broadcasters:
+            await broadcaster.stop()
+
+    def stats(self) -> List[dict]:
+        return [{"options": str(key), **broadcaster.stats()} for key, broadcaster in self.broadcasters.items()]
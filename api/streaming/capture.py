@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from api.metrics import CAPTURE_FRAMES
+
+logger = logging.getLogger(__name__)
+
+# Délai maximal d'attente d'une nouvelle frame avant de rendre la main (arrêt du streaming, etc.).
+CAPTURE_POLL_S = 0.5
+FPS_SMOOTHING = 0.1
+
+
+class LatestFrameCapture:
+    """
+    Thread qui vide en continu une capture OpenCV dans un emplacement unique.
+
+    La caméra est lue à son propre rythme, indépendamment de l'inférence :
+    chaque nouvelle frame remplace la précédente (la plus récente gagne) et
+    une frame remplacée sans avoir été lue par aucun consommateur est
+    comptée comme abandonnée (`dropped`, global à la capture).
+    Les consommateurs attendent une frame plus récente que la dernière
+    qu'ils ont traitée (`wait_newer` / `next_frame`) : le débit de sortie
+    suit la vitesse de l'inférence et la latence ne s'accumule pas.
+    """
+
+    def __init__(self, source, name: str = "capture"):
+        self.source = source
+        self.name = name
+        self._condition = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._sequence = 0
+        self._consumed = 0
+        self._thread = None
+        self._stop = threading.Event()
+        # Attentes asynchrones en cours : (boucle, événement) réveillés par le thread de capture.
+        self._waiters = set()
+        self.ended = False
+        self.captured = 0
+        self.dropped = 0
+        self.capture_fps = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 2.0):
+        """Arrête le thread de capture ; la capture elle-même est libérée par l'appelant."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._mark_ended()
+
+    def _mark_ended(self):
+        with self._condition:
+            self.ended = True
+            self._condition.notify_all()
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Réveille les attentes de `next_frame` (appelé sous `_condition`, depuis n'importe quel thread)."""
+        for loop, event in self._waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Boucle déjà fermée : l'attente ne sera jamais reprise.
+                pass
+
+    def _run(self):
+        last_read = None
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.source.read()
+                if not ret:
+                    logger.info(f"Capture {self.name} terminée ({self.captured} frames, {self.dropped} abandonnées)")
+                    break
+                now = time.perf_counter()
+                if last_read is not None and now > last_read:
+                    instant_fps = 1 / (now - last_read)
+                    self.capture_fps = instant_fps if not self.capture_fps else FPS_SMOOTHING * instant_fps + (1 - FPS_SMOOTHING) * self.capture_fps
+                last_read = now
+                with self._condition:
+                    if self._sequence > self._consumed:
+                        self.dropped += 1
+                        CAPTURE_FRAMES.labels("dropped").inc()
+                    self._frame = frame
+                    self._sequence += 1
+                    self.captured += 1
+                    self._condition.notify_all()
+                    self._wake_waiters()
+                CAPTURE_FRAMES.labels("captured").inc()
+        except Exception as e:
+            logger.error(f"Erreur de lecture de la capture {self.name} : {e}")
+        finally:
+            self._mark_ended()
+
+    def latest(self) -> Optional[tuple]:
+        """`(numéro, frame)` le plus récent sans attendre (None si aucune frame n'a encore été lue)."""
+        with self._condition:
+            if self._frame is None:
+                return None
+            self._consumed = max(self._consumed, self._sequence)
+            return self._sequence, self._frame
+
+    def wait_newer(self, after: int, timeout: Optional[float] = CAPTURE_POLL_S) -> Optional[tuple]:
+        """
+        Attend une frame de numéro supérieur à `after` et retourne `(numéro, frame)`.
+
+        Retourne None si rien de nouveau n'arrive avant `timeout` ou si la
+        capture est terminée (voir `ended`).
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._sequence > after or self.ended, timeout):
+                return None
+            return self._take_newer(after)
+
+    def _take_newer(self, after: int) -> Optional[tuple]:
+        """`(numéro, frame)` si une frame plus récente que `after` est disponible (appelé sous `_condition`)."""
+        if self._sequence <= after:
+            return None
+        self._consumed = max(self._consumed, self._sequence)
+        return self._sequence, self._frame
+
+    async def next_frame(self, after: int, timeout: Optional[float] = CAPTURE_POLL_S) -> Optional[tuple]:
+        """
+        Version asynchrone de `wait_newer`.
+
+        L'attente ne mobilise aucun thread : le thread de capture réveille un
+        `asyncio.Event` propre à l'appel, quel que soit le nombre de consommateurs.
+        """
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._condition:
+            latest = self._take_newer(after)
+            if latest is not None or self.ended:
+                return latest
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._waiters.discard(waiter)
+        with self._condition:
+            return self._take_newer(after)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "captured": self.captured,
+                "dropped": self.dropped,
+                "capture_fps": round(self.capture_fps, 2),
+                "ended": self.ended,
+            }
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import struct
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from api.metrics import INGEST_FRAMES
+
+INGEST_VERSION = 1
+# Frames qu'un client peut envoyer sans attendre de réponse (crédits initiaux).
+INGEST_CREDITS = int(os.getenv("YOLO_INGEST_CREDITS", "2"))
+# Taille maximale d'une frame reçue (JPEG ou pixels bruts).
+INGEST_MAX_BYTES = int(os.getenv("YOLO_INGEST_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# En-tête d'une frame envoyée par le client : version, format, numéro de frame, largeur, hauteur
+# (les dimensions ne sont utilisées que pour les pixels bruts).
+INGEST_HEADER = struct.Struct("<BBIHH")
+FORMAT_JPEG = 0
+FORMAT_RGBA = 1  # ImageData d'un canvas
+FORMAT_BGR = 2   # Tableau OpenCV
+RAW_CHANNELS = {FORMAT_RGBA: 4, FORMAT_BGR: 3}
+
+
+def pack_ingest_frame(frame_number: int, data: bytes, fmt: int = FORMAT_JPEG, width: int = 0, height: int = 0) -> bytes:
+    """Message binaire d'une frame envoyée au serveur (clients Python, tests)."""
+    return INGEST_HEADER.pack(INGEST_VERSION, fmt, frame_number & 0xFFFFFFFF, width, height) + data
+
+
+def read_ingest_header(payload: bytes) -> tuple:
+    """`(format, numéro de frame, largeur, hauteur)` ; ValueError si l'en-tête est invalide."""
+    if len(payload) < INGEST_HEADER.size:
+        raise ValueError("Message trop court pour contenir l'en-tête de frame")
+    version, fmt, frame_number, width, height = INGEST_HEADER.unpack_from(payload)
+    if version != INGEST_VERSION:
+        raise ValueError(f"Version du protocole non supportée : {version}")
+    if fmt != FORMAT_JPEG and fmt not in RAW_CHANNELS:
+        raise ValueError(f"Format de frame inconnu : {fmt}")
+    return fmt, frame_number, width, height
+
+
+def decode_ingest_frame(payload: bytes) -> tuple:
+    """Décode un message `pack_ingest_frame` en `(numéro de frame, image BGR)`."""
+    fmt, frame_number, width, height = read_ingest_header(payload)
+    data = np.frombuffer(payload, dtype=np.uint8, offset=INGEST_HEADER.size)
+    if fmt == FORMAT_JPEG:
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Image JPEG illisible")
+        return frame_number, frame
+    channels = RAW_CHANNELS[fmt]
+    if not width or not height or data.size != width * height * channels:
+        raise ValueError(f"Taille des pixels bruts incohérente avec {width}x{height}x{channels}")
+    frame = data.reshape(height, width, channels)
+    return frame_number, cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR) if fmt == FORMAT_RGBA else frame.copy()
+
+
+class IngestSession:
+    """
+    Frames reçues d'un client, analysées une à la fois.
+
+    Le client dispose de `credits` frames d'avance : chaque réponse du
+    serveur (résultat, frame abandonnée ou invalide) lui rend un crédit. Une
+    seule frame attend l'inférence ; si une autre arrive avant qu'elle soit
+    prise (crédits trop larges ou client trop pressé), l'ancienne est
+    abandonnée au profit de la plus récente.
+    """
+
+    def __init__(self, credits: int = INGEST_CREDITS, max_bytes: int = INGEST_MAX_BYTES):
+        if credits < 1:
+            raise ValueError("credits doit être supérieur ou égal à 1")
+        self.credits = credits
+        self.max_bytes = max_bytes
+        self._pending: Optional[bytes] = None
+        self._pending_number: Optional[int] = None
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.inferred = 0
+        self.dropped = 0
+        self.invalid = 0
+
+    def offer(self, payload: bytes) -> Optional[int]:
+        """
+        Dépose une frame reçue ; retourne le numéro de la frame abandonnée à sa place, s'il y en a une.
+
+        Lève ValueError si le message est invalide (la frame précédente reste en attente).
+        """
+        self.received += 1
+        INGEST_FRAMES.labels("received").inc()
+        if len(payload) > self.max_bytes:
+            self.reject()
+            raise ValueError(f"Frame trop volumineuse ({len(payload)} octets, maximum {self.max_bytes})")
+        try:
+            _, frame_number, _, _ = read_ingest_header(payload)
+        except ValueError:
+            self.reject()
+            raise
+        dropped = self._pending_number if self._pending is not None else None
+        if dropped is not None:
+            self.dropped += 1
+            INGEST_FRAMES.labels("dropped").inc()
+        self._pending, self._pending_number = payload, frame_number
+        self._ready.set()
+        return dropped
+
+    def reject(self):
+        self.invalid += 1
+        INGEST_FRAMES.labels("invalid").inc()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def take(self) -> Optional[bytes]:
+        """Attend la frame la plus récente ; None une fois la connexion fermée (la frame en attente est alors ignorée)."""
+        while self._pending is None or self.closed:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        payload, self._pending, self._pending_number = self._pending, None, None
+        return payload
+
+    def mark_inferred(self):
+        self.inferred += 1
+        INGEST_FRAMES.labels("inferred").inc()
+
+    def stats(self) -> dict:
+        return {"received": self.received, "inferred": self.inferred, "dropped": self.dropped, "invalid": self.invalid}
@@ -0,0 +1,70 @@
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from api.detectors.video_sampling import thumbnail, thumbnail_change
+from api.metrics import MOTION_FRAMES
+
+# Part des pixels (image réduite) qui doivent avoir changé pour relancer le modèle ; 0 désactive le filtre.
+MOTION_THRESHOLD = float(os.getenv("YOLO_MOTION_THRESHOLD", "0.01"))
+# Écart de niveau de gris à partir duquel un pixel est considéré comme changé (bruit du capteur en dessous).
+MOTION_PIXEL_DELTA = int(os.getenv("YOLO_MOTION_PIXEL_DELTA", "12"))
+# Largeur de l'image réduite comparée.
+MOTION_WIDTH = int(os.getenv("YOLO_MOTION_WIDTH", "64"))
+# Durée maximale de réutilisation des détections d'une scène immobile.
+MOTION_MAX_AGE_S = float(os.getenv("YOLO_MOTION_MAX_AGE_S", "2"))
+
+
+class MotionGate:
+    """
+    Filtre de changement placé devant le modèle pour le streaming en direct.
+
+    Chaque frame est réduite en niveaux de gris (même vignette que
+    l'échantillonnage "keyframes" de `video_sampling`) et comparée à la dernière
+    frame analysée (et non à la précédente : une dérive lente finit par être
+    détectée). Si la part des pixels qui ont changé de plus de `pixel_delta`
+    reste sous `threshold`, les détections précédentes peuvent être
+    réutilisées. Le modèle repasse au plus tard après `max_age_s` secondes.
+    """
+
+    def __init__(self, threshold: float = MOTION_THRESHOLD, pixel_delta: int = MOTION_PIXEL_DELTA,
+                 width: int = MOTION_WIDTH, max_age_s: float = MOTION_MAX_AGE_S):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.max_age_s = max_age_s
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = 0.0
+        self.last_score = None
+        self.inferred = 0
+        self.skipped = 0
+
+    def score(self, small: np.ndarray) -> float:
+        """Part des pixels qui ont changé par rapport à la dernière frame analysée (1.0 sans référence)."""
+        if self._reference is None or self._reference.shape != small.shape:
+            return 1.0
+        return thumbnail_change(small, self._reference, self.pixel_delta)
+
+    def should_infer(self, frame: np.ndarray, force: bool = False) -> bool:
+        """
+        True si la frame doit passer par le modèle ; elle devient alors la référence.
+
+        `force` (aucun résultat à réutiliser) la fait passer quel que soit son score.
+        """
+        small = thumbnail(frame, self.width)
+        self.last_score = self.score(small)
+        now = time.monotonic()
+        if not force and self.last_score < self.threshold and now - self._reference_time < self.max_age_s:
+            self.skipped += 1
+            MOTION_FRAMES.labels("skipped").inc()
+            return False
+        self._reference = small
+        self._reference_time = now
+        self.inferred += 1
+        MOTION_FRAMES.labels("inferred").inc()
+        return True
+
+    def stats(self) -> dict:
+        return {"inferred": self.inferred, "skipped": self.skipped, "last_score": self.last_score}
@@ -0,0 +1,172 @@
+import base64
+import os
+import struct
+from typing import Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from api.detectors.detection_table import SUCCESS_CONFIDENCE
+
+# Version du format binaire, envoyée dans le message d'accueil et dans chaque en-tête.
+PROTOCOL_VERSION = 1
+DEFAULT_QUALITY = int(os.getenv("YOLO_WS_QUALITY", "80"))
+# Qualité JPEG minimale atteinte par l'adaptation au délai d'envoi.
+MIN_QUALITY = int(os.getenv("YOLO_WS_MIN_QUALITY", "30"))
+QUALITY_STEP = int(os.getenv("YOLO_WS_QUALITY_STEP", "10"))
+# Délai d'envoi visé : au-dessus, la qualité baisse ; sous la moitié, elle remonte.
+TARGET_SEND_LAG_S = float(os.getenv("YOLO_WS_TARGET_LAG_MS", "50")) / 1000
+LAG_SMOOTHING = 0.3
+
+# En-tête d'une frame binaire : version, drapeaux, nombre de détections, numéro de frame,
+# largeur et hauteur de la frame analysée (repère des boîtes), qualité JPEG (0 sans image).
+HEADER = struct.Struct("<BBHIHHB")
+FLAG_IMAGE = 0x01
+# Une détection : boîte dans le repère de la frame analysée, confiance, classe, piste (0 hors suivi).
+WIRE_DETECTION_DTYPE = np.dtype([
+    ("x1", "<f4"), ("y1", "<f4"), ("x2", "<f4"), ("y2", "<f4"),
+    ("confidence", "<f4"), ("class_id", "<u2"), ("track_id", "<i4"),
+])
+
+
+class AdaptiveQuality:
+    """
+    Qualité JPEG ajustée au délai d'envoi mesuré.
+
+    Le délai est lissé (moyenne exponentielle) ; au-dessus de `target_lag_s`
+    la qualité baisse de `step`, sous la moitié elle remonte, sans dépasser
+    la qualité négociée par le client.
+    """
+
+    def __init__(self, quality: int, enabled: bool = True, min_quality: int = MIN_QUALITY,
+                 step: int = QUALITY_STEP, target_lag_s: float = TARGET_SEND_LAG_S):
+        self.max_quality = quality
+        self.quality = quality
+        self.enabled = enabled
+        self.min_quality = min(min_quality, quality)
+        self.step = step
+        self.target_lag_s = target_lag_s
+        self.lag_s = None
+
+    def update(self, lag_s: float) -> int:
+        self.lag_s = lag_s if self.lag_s is None else LAG_SMOOTHING * lag_s + (1 - LAG_SMOOTHING) * self.lag_s
+        if self.enabled:
+            if self.lag_s > self.target_lag_s:
+                self.quality = max(self.min_quality, self.quality - self.step)
+            elif self.lag_s < self.target_lag_s / 2:
+                self.quality = min(self.max_quality, self.quality + self.step)
+        return self.quality
+
+
+def encode_jpeg(frame: np.ndarray, quality: int, max_width: Optional[int] = None) -> bytes:
+    """JPEG de la frame, réduite à `max_width` pixels de large si elle est plus grande."""
+    height, width = frame.shape[:2]
+    if max_width and width > max_width:
+        frame = cv2.resize(frame, (max_width, round(height * max_width / width)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise RuntimeError("Échec de l'encodage JPEG de la frame")
+    return buffer.tobytes()
+
+
+def pack_detections(detections: List[Dict], class_names: Sequence[str]) -> bytes:
+    index = {name: i for i, name in enumerate(class_names)}
+    rows = np.zeros(len(detections), dtype=WIRE_DETECTION_DTYPE)
+    for row, det in zip(rows, detections):
+        row["x1"], row["y1"], row["x2"], row["y2"] = det["bbox"]
+        row["confidence"] = det["confidence"]
+        row["class_id"] = index.get(det["class_name"], 0xFFFF)
+        row["track_id"] = det.get("track_id", 0)
+    return rows.tobytes()
+
+
+def pack_frame(frame_number: int, frame_size: tuple, detections: List[Dict], class_names: Sequence[str],
+               jpeg: Optional[bytes] = None, quality: int = 0) -> bytes:
+    """Message binaire : en-tête, détections empaquetées puis, si présent, le JPEG brut."""
+    width, height = frame_size
+    header = HEADER.pack(PROTOCOL_VERSION, FLAG_IMAGE if jpeg is not None else 0, len(detections),
+                         frame_number & 0xFFFFFFFF, width, height, quality if jpeg is not None else 0)
+    return header + pack_detections(detections, class_names) + (jpeg or b"")
+
+
+def unpack_frame(payload: bytes, class_names: Sequence[str]) -> dict:
+    """Décode un message produit par `pack_frame` (clients Python, tests)."""
+    version, flags, count, frame_number, width, height, quality = HEADER.unpack_from(payload)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Version du protocole non supportée : {version}")
+    end = HEADER.size + count * WIRE_DETECTION_DTYPE.itemsize
+    rows = np.frombuffer(payload, dtype=WIRE_DETECTION_DTYPE, count=count, offset=HEADER.size)
+    detections = []
+    for row in rows:
+        confidence = float(row["confidence"])
+        class_id = int(row["class_id"])
+        det = {
+            "class_name": class_names[class_id] if class_id < len(class_names) else str(class_id),
+            "confidence": confidence,
+            "bbox": [float(row["x1"]), float(row["y1"]), float(row["x2"]), float(row["y2"])],
+            "result": "success" if confidence > SUCCESS_CONFIDENCE else "failure",
+        }
+        if row["track_id"] > 0:
+            det["track_id"] = int(row["track_id"])
+        detections.append(det)
+    return {
+        "frame_number": frame_number,
+        "frame_size": (width, height),
+        "quality": quality,
+        "detections": detections,
+        "jpeg": bytes(payload[end:]) if flags & FLAG_IMAGE else None,
+    }
+
+
+class StreamEncoder:
+    """
+    Mise en forme des frames envoyées sur le WebSocket de streaming selon les options négociées.
+
+    - protocole `json` : `{"frame": <JPEG base64>, "detections": [...]}` (format historique) ;
+    - protocole `binary` : message `pack_frame`, précédé d'un message texte
+      d'accueil (`hello`) qui donne la version et la liste des classes.
+
+    `pixels=False` n'envoie que les détections. La qualité JPEG part de la
+    valeur demandée et s'adapte au délai d'envoi si `adaptive` ; sans choix
+    explicite, seul le protocole binaire s'adapte (le format JSON historique
+    garde une qualité fixe).
+    """
+
+    def __init__(self, class_names: Sequence[str], protocol: str = "json", quality: Optional[int] = None,
+                 max_width: Optional[int] = None, pixels: bool = True, adaptive: Optional[bool] = None):
+        self.class_names = tuple(class_names)
+        self.binary = protocol == "binary"
+        self.max_width = max_width
+        self.pixels = pixels
+        # Sans qualité demandée, le format JSON garde la qualité par défaut d'OpenCV (95).
+        if adaptive is None:
+            adaptive = self.binary
+        self.quality = AdaptiveQuality(quality or (DEFAULT_QUALITY if self.binary else 95), adaptive)
+
+    def hello(self) -> dict:
+        return {
+            "type": "hello",
+            "protocol": "binary" if self.binary else "json",
+            "version": PROTOCOL_VERSION,
+            "classes": list(self.class_names),
+            "quality": self.quality.quality,
+            "max_width": self.max_width,
+            "pixels": self.pixels,
+            "header_size": HEADER.size,
+            "detection_size": WIRE_DETECTION_DTYPE.itemsize,
+        }
+
+    def encode(self, frame_number: int, frame: np.ndarray, detections: List[Dict]):
+        """Message à envoyer pour cette frame : `bytes` en binaire, `dict` en JSON."""
+        quality = self.quality.quality
+        jpeg = encode_jpeg(frame, quality, self.max_width) if self.pixels else None
+        if self.binary:
+            height, width = frame.shape[:2]
+            return pack_frame(frame_number, (width, height), detections, self.class_names, jpeg, quality)
+        message = {"detections": detections}
+        if jpeg is not None:
+            message["frame"] = base64.b64encode(jpeg).decode("utf-8")
+        return message
+
+    def record_send_lag(self, lag_s: float) -> int:
+        return self.quality.update(lag_s)
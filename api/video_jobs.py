@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional
+
+from api import crud, schemas
+from api.detectors.inference_executor import VIDEO_TIMEOUT_S
+
+logger = logging.getLogger(__name__)
+
+# Les vidéos en attente et les résultats sont conservés sur disque : un redémarrage ne perd rien.
+JOB_INPUT_DIR = os.path.join("uploads", "jobs")
+JOB_OUTPUT_DIR = os.path.join("temp_results", "jobs")
+
+DEFAULT_JOB_WORKERS = int(os.getenv("YOLO_JOB_WORKERS", "1"))
+JOB_POLL_INTERVAL_S = float(os.getenv("YOLO_JOB_POLL_S", "2"))
+# Fréquence d'écriture de l'avancement en base pendant un traitement.
+PROGRESS_FLUSH_S = 2.0
+# Durée de conservation des vidéos annotées des travaux terminés (au-delà : 410 sur /result).
+JOB_RESULT_TTL_S = float(os.getenv("YOLO_JOB_RESULT_TTL_S", str(24 * 3600)))
+JOB_SWEEP_INTERVAL_S = float(os.getenv("YOLO_JOB_SWEEP_S", "600"))
+
+
+def job_output_path(job_id: int) -> str:
+    return os.path.join(JOB_OUTPUT_DIR, f"job_{job_id}.mp4")
+
+
+def sweep_expired_results(directory: str = JOB_OUTPUT_DIR, ttl_s: float = JOB_RESULT_TTL_S, now: Optional[float] = None) -> int:
+    """Supprime les résultats plus anciens que `ttl_s` secondes ; retourne le nombre de fichiers supprimés."""
+    if not os.path.isdir(directory):
+        return 0
+    deadline = (now if now is not None else time.time()) - ttl_s
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < deadline:
+                os.remove(path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Résultat {path} non supprimé : {e}")
+    return removed
+
+
+class VideoJobWorkerPool:
+    """
+    Workers asyncio qui traitent les travaux vidéo enregistrés dans `video_jobs`.
+
+    Chaque worker réserve le plus ancien travail en file, soumet
+    `process_video` à l'exécuteur d'inférence, enregistre régulièrement
+    l'avancement, puis crée le `PostureDetectionResult` correspondant. Au
+    démarrage, les travaux restés `running` (processus interrompu) sont remis
+    en file ; le pool suppose donc une seule instance de l'application par base.
+    Les vidéos annotées sont supprimées `JOB_RESULT_TTL_S` secondes après leur
+    création.
+    """
+
+    def __init__(self, session_factory, executor, workers: int = DEFAULT_JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL_S):
+        if workers < 1:
+            raise ValueError("workers doit être supérieur ou égal à 1")
+        self.session_factory = session_factory
+        self.executor = executor
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self):
+        if self._tasks:
+            return
+        async with self.session_factory() as db:
+            requeued = await crud.requeue_running_video_jobs(db)
+        if requeued:
+            logger.info(f"{requeued} travail(aux) vidéo interrompu(s) remis en file.")
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _sweeper(self):
+        while True:
+            removed = await asyncio.to_thread(sweep_expired_results)
+            if removed:
+                logger.info(f"{removed} résultat(s) de travaux vidéo expiré(s) supprimé(s).")
+            await asyncio.sleep(JOB_SWEEP_INTERVAL_S)
+
+    def wake(self):
+        """Réveille les workers sans attendre la prochaine scrutation (nouveau travail en file)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait_for_work(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                async with self.session_factory() as db:
+                    job = await crud.claim_next_video_job(db)
+                    job_data = schemas.db_schemas.VideoJob.model_validate(job) if job else None
+                    input_path = job.input_path if job else None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker vidéo {index} : impossible de lire la file de travaux : {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if job_data is None:
+                await self._wait_for_work()
+                continue
+            logger.info(f"Worker vidéo {index} : traitement du travail {job_data.id}")
+            await self._run_job(job_data, input_path)
+
+    async def _run_job(self, job: schemas.db_schemas.VideoJob, input_path: str):
+        os.makedirs(JOB_OUTPUT_DIR, exist_ok=True)
+        output_path = job_output_path(job.id)
+        progress = self.executor.new_progress()
+        task = asyncio.create_task(self.executor.run(
+            "process_video", input_path, output_path,
+            sampling=job.sampling, frame_stride=job.frame_stride, target_fps=job.target_fps,
+            progress=progress, timeout=VIDEO_TIMEOUT_S, cancellable=True
+        ))
+        try:
+            await self._track_progress(job.id, task, progress)
+            result = task.result()
+            result_id = None
+            async with self.session_factory() as db:
+                if result["detections"]:
+                    attempt = await crud.create_posture_attempt(db, schemas.PostureAttemptCreate(
+                        session_id=job.session_id,
+                        video_id=job.video_id,
+                        confidence=result["avg_confidence"],
+                        result=result["detections"][0]["result"],
+                        prediction_time=result["prediction_time"],
+                        frames_processed=result["frames_processed"]
+                    ))
+                    result_id = attempt.id
+                await crud.complete_video_job(db, job.id, output_path, result["frames_processed"], result_id)
+            logger.info(f"Travail vidéo {job.id} terminé ({result['frames_processed']} frames).")
+        except asyncio.CancelledError:
+            # Arrêt de l'application : le travail reste `running` et sera remis en file au
+            # redémarrage, la vidéo d'entrée doit donc rester sur disque.
+            task.cancel()
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+            logger.error(f"Échec du travail vidéo {job.id} : {detail}")
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            try:
+                async with self.session_factory() as db:
+                    await crud.fail_video_job(db, job.id, detail)
+            except Exception as db_error:
+                logger.error(f"Échec du travail vidéo {job.id} non enregistré : {db_error}")
+        if os.path.exists(input_path):
+            os.remove(input_path)
+
+    async def _track_progress(self, job_id: int, task: asyncio.Task, progress):
+        last_flushed = None
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=PROGRESS_FLUSH_S)
+            if done:
+                return
+            frames_done = progress.get("frames_done", 0)
+            if frames_done != last_flushed:
+                try:
+                    async with self.session_factory() as db:
+                        await crud.update_video_job_progress(db, job_id, frames_done, progress.get("total_frames"))
+                    last_flushed = frames_done
+                except Exception as e:
+                    logger.warning(f"Avancement du travail {job_id} non enregistré : {e}")
@@ -0,0 +1,428 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import psutil
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_VIDEOS_DIR = os.path.join(PROJECT_ROOT, "static", "videos")
+# À incrémenter si la structure du rapport change : la comparaison refuse alors les anciens rapports.
+REPORT_VERSION = 1
+
+STAGES = ("decode", "inference", "postprocess", "annotate", "encode")
+PERCENTILES = (50, 95, 99)
+# Sens d'amélioration de chaque métrique comparée à la référence.
+HIGHER_IS_BETTER = {"fps"}
+RSS_SAMPLE_S = 0.01
+
+
+def latency_summary(latencies_s: List[float]) -> dict:
+    """p50 / p95 / p99, moyenne et maximum d'une série de latences, en millisecondes."""
+    if not latencies_s:
+        return {"count": 0}
+    values = np.asarray(latencies_s, dtype=np.float64) * 1000
+    summary = {f"p{p}_ms": round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+    summary.update({"mean_ms": round(float(values.mean()), 3), "max_ms": round(float(values.max()), 3), "count": len(values)})
+    return summary
+
+
+def stage_breakdown(stage_s: Dict[str, float], frames: int) -> dict:
+    """Temps total et par frame de chaque étape, dans l'ordre de `STAGES`."""
+    total = sum(stage_s.values())
+    return {
+        stage: {
+            "total_s": round(stage_s.get(stage, 0.0), 4),
+            "per_frame_ms": round(stage_s.get(stage, 0.0) * 1000 / frames, 3) if frames else 0.0,
+            "share": round(stage_s.get(stage, 0.0) / total, 4) if total > 0 else 0.0,
+        }
+        for stage in STAGES
+    }
+
+
+class PeakRSS:
+    """Pic de mémoire résidente (processus et enfants) échantillonné pendant un bloc `with`."""
+
+    def __init__(self, interval_s: float = RSS_SAMPLE_S):
+        self.interval_s = interval_s
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rss(self) -> int:
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_s):
+            self.peak_bytes = max(self.peak_bytes, self._rss())
+
+    def __enter__(self):
+        self.peak_bytes = self._rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._rss())
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak_bytes / 2 ** 20, 1)
+
+
+class ModelTimer:
+    """
+    Mesure les appels au modèle d'un détecteur pendant un bloc `with`.
+
+    Les temps de prétraitement et d'inférence sont ceux rapportés par
+    ultralytics pour chaque image (`Results.speed`) ; le reste du temps passé
+    dans l'étape d'inférence du détecteur (NMS, redimensionnement, conversion
+    en `DetectionTable`, suivi) est compté comme post-traitement.
+    `frame_latencies` reçoit, pour chaque image, la durée de son appel au
+    modèle divisée par la taille du lot.
+    """
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.model_s = 0.0
+        self.calls = 0
+        self.frame_latencies = []
+
+    def __enter__(self):
+        predict = self.detector._predict
+
+        def timed_predict(source, **kwargs):
+            begin = time.perf_counter()
+            results = predict(source, **kwargs)
+            elapsed = time.perf_counter() - begin
+            self.calls += 1
+            self.model_s += sum((r.speed.get("preprocess") or 0.0) + (r.speed.get("inference") or 0.0) for r in results) / 1000
+            self.frame_latencies.extend([elapsed / len(results)] * len(results))
+            return results
+
+        self.detector._predict = timed_predict
+        return self
+
+    def __exit__(self, *exc):
+        del self.detector._predict
+
+
+def list_clips(videos_dir: str, limit: Optional[int] = None) -> List[str]:
+    """Vidéos `.mp4` lisibles de `videos_dir`, dans l'ordre alphabétique (les pointeurs Git LFS sont ignorés)."""
+    clips = []
+    for path in sorted(glob.glob(os.path.join(videos_dir, "*.mp4"))):
+        cap = cv2.VideoCapture(path)
+        readable = cap.isOpened() and cap.read()[0]
+        cap.release()
+        if readable:
+            clips.append(path)
+        else:
+            print(f"⚠️ Vidéo illisible ignorée : {path}")
+    return clips[:limit] if limit else clips
+
+
+def sample_frames(clips: List[str], per_clip: int) -> List[np.ndarray]:
+    """`per_clip` frames régulièrement espacées de chaque vidéo."""
+    frames = []
+    for path in clips:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for index in np.linspace(0, max(total - 1, 0), per_clip).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+    return frames
+
+
+def bench_images(detector, frames: List[np.ndarray], repeat: int = 1, warmup: int = 3, imgsz: Optional[int] = None, conf: float = 0.5) -> dict:
+    """
+    Parcours d'une requête /predict : décodage JPEG, `process_image`, annotation et encodage JPEG.
+
+    Chaque frame est traitée `repeat` fois ; la latence d'une frame couvre les quatre étapes.
+    """
+    from api.detectors.detectors_yolo11 import IMAGE_ENCODINGS
+    extension, quality_flag = IMAGE_ENCODINGS["jpeg"]
+    payloads = [cv2.imencode(extension, frame, [quality_flag, 90])[1] for frame in frames]
+    for payload in payloads[:warmup]:
+        detector.process_image(cv2.imdecode(payload, cv2.IMREAD_COLOR), imgsz=imgsz, conf=conf)
+
+    stage_s = dict.fromkeys(STAGES, 0.0)
+    latencies = []
+    with PeakRSS() as rss, ModelTimer(detector) as model:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for payload in payloads:
+                t0 = time.perf_counter()
+                image = cv2.imdecode(payload, cv2.IMREAD_COLOR)
+                t1 = time.perf_counter()
+                detections, _ = detector.process_image(image, imgsz=imgsz, conf=conf)
+                t2 = time.perf_counter()
+                annotated = detector._draw_detections(image.copy(), detections)
+                t3 = time.perf_counter()
+                cv2.imencode(extension, annotated, [quality_flag, 90])
+                t4 = time.perf_counter()
+                stage_s["decode"] += t1 - t0
+                stage_s["postprocess"] += t2 - t1
+                stage_s["annotate"] += t3 - t2
+                stage_s["encode"] += t4 - t3
+                latencies.append(t4 - t0)
+        wall_s = time.perf_counter() - start
+    stage_s["inference"] = model.model_s
+    stage_s["postprocess"] -= model.model_s
+    count = len(latencies)
+    return {
+        "frames": count,
+        "wall_time_s": round(wall_s, 4),
+        "fps": round(count / wall_s, 2) if wall_s > 0 else 0.0,
+        "latency": latency_summary(latencies),
+        "stages": stage_breakdown(stage_s, count),
+        "peak_rss_mb": rss.peak_mb,
+    }
+
+
+def _pipeline_stage_s(pipeline_stats: dict) -> Dict[str, float]:
+    """Temps actif des étapes d'un ou plusieurs passages du pipeline vidéo, par nom d'étape."""
+    totals = {}
+    for name in ("analysis", "render"):
+        for stage, stats in pipeline_stats.get(name, {}).get("stages", {}).items():
+            totals[stage] = totals.get(stage, 0.0) + stats["busy_s"]
+    return totals
+
+
+def bench_video(detector, clip: str, annotate: bool = True, pipelined: Optional[bool] = None, **options) -> dict:
+    """
+    `process_video` sur une vidéo complète, avec la vidéo annotée si `annotate`.
+
+    Les temps par étape sont les temps actifs des étages du pipeline ; la
+    latence par frame est celle de l'appel au modèle divisée par la taille du lot.
+    """
+    if pipelined is not None:
+        options["pipelined"] = pipelined
+    output_path = None
+    if annotate:
+        fd, output_path = tempfile.mkstemp(suffix=".mp4")
+        os.close(fd)
+    try:
+        with PeakRSS() as rss, ModelTimer(detector) as model:
+            start = time.perf_counter()
+            result = detector.process_video(clip, output_path, **options)
+            wall_s = time.perf_counter() - start
+    finally:
+        if output_path:
+            os.remove(output_path)
+
+    stage_s = _pipeline_stage_s(result["pipeline"])
+    stage_s["postprocess"] = max(stage_s.pop("inference", 0.0) - model.model_s, 0.0)
+    stage_s["inference"] = model.model_s
+    frames = result["frames_processed"]
+    return {
+        "clip": os.path.basename(clip),
+        "frames": frames,
+        "frames_analyzed": result["frames_analyzed"],
+        "wall_time_s": round(wall_s, 4),
+        "fps": round(frames / wall_s, 2) if wall_s > 0 else 0.0,
+        "latency": latency_summary(model.frame_latencies),
+        "stages": stage_breakdown(stage_s, frames),
+        "peak_rss_mb": rss.peak_mb,
+        "pipeline_threaded": result["pipeline"].get("analysis", {}).get("threaded"),
+    }
+
+
+def _video_totals(clips: List[dict]) -> dict:
+    frames = sum(clip["frames"] for clip in clips)
+    wall_s = sum(clip["wall_time_s"] for clip in clips)
+    stage_s = {stage: sum(clip["stages"][stage]["total_s"] for clip in clips) for stage in STAGES}
+    return {
+        "frames": frames,
+        "wall_time_s": round(wall_s, 4),
+        "fps": round(frames / wall_s, 2) if wall_s > 0 else 0.0,
+        "stages": stage_breakdown(stage_s, frames),
+        "peak_rss_mb": max((clip["peak_rss_mb"] for clip in clips), default=0.0),
+    }
+
+
+def environment(detector) -> dict:
+    import torch
+    import ultralytics
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "ultralytics": ultralytics.__version__,
+        "opencv": cv2.__version__,
+        "device": detector.device,
+        "model_version": detector.model_version,
+        "git_commit": commit,
+    }
+
+
+def run_benchmarks(detector, clips: List[str], image_frames: int = 10, image_repeat: int = 3, annotate: bool = True,
+                   pipelined: Optional[bool] = None, imgsz: Optional[int] = None, conf: float = 0.5) -> dict:
+    """Exécute les scénarios image et vidéo et retourne le rapport complet."""
+    options = {"imgsz": imgsz, "conf": conf}
+    report = {
+        "version": REPORT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(detector),
+        "options": {**options, "image_frames": image_frames, "image_repeat": image_repeat, "annotate": annotate, "pipelined": pipelined},
+        "clips": [os.path.basename(clip) for clip in clips],
+        "scenarios": {},
+    }
+    if image_frames:
+        report["scenarios"]["image"] = bench_images(detector, sample_frames(clips, image_frames), image_repeat, **options)
+    videos = [bench_video(detector, clip, annotate, pipelined, **options) for clip in clips]
+    if videos:
+        report["scenarios"]["video"] = {"total": _video_totals(videos), "clips": {clip["clip"]: clip for clip in videos}}
+    report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+def _comparable_metrics(report: dict) -> Dict[str, float]:
+    """Métriques comparées d'un rapport, à plat : `scénario.métrique`."""
+    metrics = {}
+    scenarios = dict(report.get("scenarios", {}))
+    video = scenarios.pop("video", None)
+    if video:
+        scenarios["video"] = video["total"]
+        scenarios.update({f"video[{name}]": clip for name, clip in video["clips"].items()})
+    for name, scenario in scenarios.items():
+        metrics[f"{name}.fps"] = scenario["fps"]
+        metrics[f"{name}.peak_rss_mb"] = scenario["peak_rss_mb"]
+        for key in (f"p{p}_ms" for p in PERCENTILES):
+            if key in scenario.get("latency", {}):
+                metrics[f"{name}.latency.{key}"] = scenario["latency"][key]
+        for stage, stats in scenario["stages"].items():
+            metrics[f"{name}.stages.{stage}.per_frame_ms"] = stats["per_frame_ms"]
+    return metrics
+
+
+def compare_reports(baseline: dict, current: dict, tolerance: float = 0.05, min_delta_ms: float = 0.5) -> dict:
+    """
+    Compare `current` à `baseline` métrique par métrique.
+
+    Une métrique régresse si elle se dégrade de plus de `tolerance` (relatif)
+    et, pour les temps, de plus de `min_delta_ms` (pour ignorer le bruit
+    des étapes de quelques microsecondes).
+    """
+    if baseline.get("version") != current.get("version"):
+        raise ValueError(f"Rapports de versions différentes : {baseline.get('version')} et {current.get('version')}")
+    before, after = _comparable_metrics(baseline), _comparable_metrics(current)
+    rows, regressions, improvements = {}, [], []
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name], after[name]
+        change = (new - old) / old if old else 0.0
+        better = change > 0 if name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change < 0
+        significant = abs(change) > tolerance and (not name.endswith("_ms") or abs(new - old) > min_delta_ms)
+        rows[name] = {"baseline": old, "current": new, "change": round(change, 4)}
+        if significant:
+            (improvements if better else regressions).append(name)
+    return {
+        "tolerance": tolerance,
+        "metrics": rows,
+        "regressions": regressions,
+        "improvements": improvements,
+        "missing": sorted(set(before) ^ set(after)),
+    }
+
+
+def print_comparison(comparison: dict):
+    for name, row in comparison["metrics"].items():
+        marker = "❌" if name in comparison["regressions"] else "✅" if name in comparison["improvements"] else "  "
+        print(f"{marker} {name:<50} {row['baseline']:>10} -> {row['current']:>10} ({row['change'] * 100:+.1f}%)")
+    if comparison["regressions"]:
+        print(f"❌ {len(comparison['regressions'])} régression(s) au-delà de {comparison['tolerance'] * 100:.0f}%")
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as source:
+        return json.load(source)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du détecteur YOLOv11 sur les vidéos de référence.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Mesure le détecteur et écrit le rapport JSON")
+    run_parser.add_argument("--videos", default=DEFAULT_VIDEOS_DIR)
+    run_parser.add_argument("--clips", type=int, default=None, help="Nombre maximal de vidéos (toutes par défaut)")
+    run_parser.add_argument("--model", default=None, help="Checkpoint PyTorch (.pt) ; modèle de l'API par défaut")
+    run_parser.add_argument("--backend", default=None, help="Moteur d'inférence (YOLO_BACKEND par défaut)")
+    run_parser.add_argument("--precision", default=None, help="Mode de précision (YOLO_PRECISION par défaut)")
+    run_parser.add_argument("--imgsz", type=int, default=None)
+    run_parser.add_argument("--conf", type=float, default=0.5)
+    run_parser.add_argument("--image-frames", type=int, default=10, help="Frames par vidéo pour le scénario image (0 = ignoré)")
+    run_parser.add_argument("--image-repeat", type=int, default=3)
+    run_parser.add_argument("--no-annotate", action="store_true", help="N'écrit pas de vidéo annotée")
+    run_parser.add_argument("--pipeline", choices=["on", "off"], default=None, help="Force le pipeline vidéo threadé (YOLO_VIDEO_PIPELINE par défaut)")
+    run_parser.add_argument("--output", default="benchmark.json")
+    run_parser.add_argument("--baseline", default=None, help="Rapport de référence auquel comparer les résultats")
+    run_parser.add_argument("--tolerance", type=float, default=0.05)
+
+    compare_parser = commands.add_parser("compare", help="Compare deux rapports existants")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.05)
+    compare_parser.add_argument("--output", default=None, help="Écrit aussi la comparaison en JSON")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        comparison = compare_reports(_load(args.baseline), _load(args.current), args.tolerance)
+    else:
+        clips = list_clips(args.videos, args.clips)
+        if not clips:
+            print(f"❌ Aucune vidéo lisible dans {args.videos}")
+            return 1
+        # torch et ultralytics ne sont chargés qu'une fois les vidéos trouvées.
+        from api.detectors.detectors_yolo11 import YOLOv11Detector
+        detector_kwargs = {key: value for key, value in (("model_path", args.model), ("backend", args.backend), ("precision", args.precision)) if value}
+        pipelined = None if args.pipeline is None else args.pipeline == "on"
+        report = run_benchmarks(YOLOv11Detector(**detector_kwargs), clips, args.image_frames, args.image_repeat,
+                                not args.no_annotate, pipelined, args.imgsz, args.conf)
+        if args.baseline:
+            report["comparison"] = compare_reports(_load(args.baseline), report, args.tolerance)
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        print(f"✅ Rapport écrit dans {args.output}")
+        for name, scenario in report["scenarios"].items():
+            summary = scenario.get("total", scenario)
+            print(f"   {name} : {summary['fps']} fps, pic RSS {summary['peak_rss_mb']} Mo")
+        comparison = report.get("comparison")
+        if comparison is None:
+            return 0
+    print_comparison(comparison)
+    if getattr(args, "output", None) and args.command == "compare":
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(comparison, output, indent=2, ensure_ascii=False)
+    return 1 if comparison["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, PROJECT_ROOT)
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.batch_scheduler import BatchScheduler
+
+
+class FakeDetector:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def process_batch(self, images):
+        self.batch_sizes.append(len(images))
+        return [
+            ([{"class_name": "assis", "confidence": float(image[0, 0, 0]) / 100, "bbox": [0.0, 0.0, 1.0, 1.0], "result": "success"}],
+             {"prediction_time": 0.0, "avg_confidence": float(image[0, 0, 0]) / 100, "frames_processed": 1})
+            for image in images
+        ]
+
+
+def _image(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_batch():
+    detector = FakeDetector()
+    scheduler = BatchScheduler(detector, max_batch_size=8, max_wait_ms=50)
+    try:
+        results = await asyncio.gather(*(scheduler.submit(_image(v)) for v in range(5)))
+    finally:
+        await scheduler.stop()
+    assert detector.batch_sizes == [5]
+    # Chaque appelant reçoit le résultat de sa propre image
+    assert [detections[0]["confidence"] for detections, _ in results] == [v / 100 for v in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_batch_size_is_capped():
+    detector = FakeDetector()
+    scheduler = BatchScheduler(detector, max_batch_size=3, max_wait_ms=50)
+    try:
+        await asyncio.gather(*(scheduler.submit(_image(v)) for v in range(7)))
+    finally:
+        await scheduler.stop()
+    assert detector.batch_sizes == [3, 3, 1]
+    assert scheduler.stats()["images_processed"] == 7
+
+
+@pytest.mark.asyncio
+async def test_errors_are_propagated_to_every_waiter():
+    class FailingDetector:
+        def process_batch(self, images):
+            raise RuntimeError("boom")
+
+    scheduler = BatchScheduler(FailingDetector(), max_batch_size=4, max_wait_ms=20)
+    try:
+        results = await asyncio.gather(*(scheduler.submit(_image(v)) for v in range(2)), return_exceptions=True)
+    finally:
+        await scheduler.stop()
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_requests_with_different_options_are_not_mixed():
+    class OptionsDetector(FakeDetector):
+        def __init__(self):
+            super().__init__()
+            self.calls = []
+
+        def process_batch(self, images, imgsz=None, conf=0.5):
+            self.calls.append((len(images), imgsz, conf))
+            return super().process_batch(images)
+
+    detector = OptionsDetector()
+    scheduler = BatchScheduler(detector, max_batch_size=8, max_wait_ms=50)
+    try:
+        await asyncio.gather(
+            scheduler.submit(_image(1), imgsz=320, conf=0.25),
+            scheduler.submit(_image(2), imgsz=640, conf=0.5),
+            scheduler.submit(_image(3), imgsz=320, conf=0.25),
+        )
+    finally:
+        await scheduler.stop()
+    assert sorted(detector.calls) == [(1, 640, 0.5), (2, 320, 0.25)]
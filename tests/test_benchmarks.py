@@ -0,0 +1,54 @@
+import copy
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.detector_benchmark import REPORT_VERSION, STAGES, compare_reports, latency_summary, stage_breakdown
+
+
+def _report(fps=10.0, p95_ms=120.0, inference_s=5.0):
+    scenario = {
+        "fps": fps,
+        "peak_rss_mb": 800.0,
+        "latency": {"p50_ms": 100.0, "p95_ms": p95_ms, "p99_ms": 150.0},
+        "stages": stage_breakdown({"decode": 0.2, "inference": inference_s, "postprocess": 0.3, "encode": 0.5}, 50),
+    }
+    return {"version": REPORT_VERSION, "scenarios": {"image": scenario, "video": {"total": copy.deepcopy(scenario), "clips": {}}}}
+
+
+def test_latency_summary_percentiles_in_ms():
+    summary = latency_summary([i / 1000 for i in range(1, 101)])
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p99_ms"] == pytest.approx(99.01)
+    assert summary["max_ms"] == 100.0 and summary["count"] == 100
+    assert latency_summary([]) == {"count": 0}
+
+
+def test_stage_breakdown_lists_every_stage():
+    breakdown = stage_breakdown({"inference": 1.5, "decode": 0.5}, 100)
+    assert list(breakdown) == list(STAGES)
+    assert breakdown["inference"]["per_frame_ms"] == 15.0
+    assert breakdown["inference"]["share"] == 0.75
+    assert breakdown["annotate"]["total_s"] == 0.0
+
+
+def test_compare_flags_regressions_and_improvements():
+    comparison = compare_reports(_report(), _report(fps=8.0, p95_ms=100.0))
+    assert "image.fps" in comparison["regressions"] and "video.fps" in comparison["regressions"]
+    assert "image.latency.p95_ms" in comparison["improvements"]
+    assert comparison["metrics"]["image.fps"]["change"] == pytest.approx(-0.2)
+
+
+def test_compare_ignores_noise():
+    # +4 % est sous la tolérance ; +0.2 ms par frame est sous le seuil absolu.
+    comparison = compare_reports(_report(), _report(fps=9.6, inference_s=5.01))
+    assert comparison["regressions"] == [] and comparison["improvements"] == []
+
+
+def test_compare_rejects_other_report_versions():
+    baseline = _report()
+    baseline["version"] = REPORT_VERSION + 1
+    with pytest.raises(ValueError):
+        compare_reports(baseline, _report())
@@ -0,0 +1,125 @@
+import asyncio
+import numpy as np
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.streaming.broadcaster import StreamHub, StreamResult, Subscriber
+
+
+class FakeFrameCapture:
+    """Capture factice pilotée par le test : `push` publie une nouvelle frame, `end` termine le flux."""
+
+    def __init__(self):
+        self.sequence = 0
+        self.ended = False
+        self.changed = asyncio.Event()
+
+    def push(self):
+        self.sequence += 1
+        self.changed.set()
+
+    def end(self):
+        self.ended = True
+        self.changed.set()
+
+    async def next_frame(self, after, timeout=None):
+        while self.sequence <= after and not self.ended:
+            self.changed.clear()
+            await self.changed.wait()
+        if self.sequence <= after:
+            return None
+        return self.sequence, np.full((2, 2, 3), self.sequence, dtype=np.uint8)
+
+
+def _counting_infer(calls):
+    def make_infer():
+        async def infer(frame_number, frame):
+            calls.append(frame_number)
+            return [{"frame": frame_number}]
+        return infer
+    return make_infer
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_full_queue_applies_the_drop_policy():
+    async def scenario():
+        oldest, newest = Subscriber("key", queue_size=2), Subscriber("key", queue_size=2, drop="newest")
+        for number in (1, 2, 3):
+            oldest.publish(StreamResult(number, None, []))
+            newest.publish(StreamResult(number, None, []))
+        oldest.close()
+        newest.close()
+        return [await _drain(oldest), await _drain(newest), oldest.dropped, newest.dropped]
+
+    async def _drain(subscriber):
+        numbers = []
+        while (result := await subscriber.get()) is not None:
+            numbers.append(result.frame_number)
+        return numbers
+
+    assert asyncio.run(scenario()) == [[2, 3], [1, 2], 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_one_inference_per_frame_is_shared_by_all_subscribers():
+    capture, calls = FakeFrameCapture(), []
+    hub = StreamHub(capture)
+    fast = hub.subscribe("options", _counting_infer(calls), queue_size=10)
+    slow = hub.subscribe("options", _counting_infer(calls), queue_size=1)
+    for _ in range(3):
+        capture.push()
+        await _settle()
+    assert calls == [1, 2, 3]
+    assert [(await fast.get()).frame_number for _ in range(3)] == [1, 2, 3]
+    # Le client lent ne bloque pas la diffusion : il ne garde que la frame la plus récente.
+    assert (await slow.get()).frame_number == 3 and slow.dropped == 2
+    assert len(hub.broadcasters) == 1 and hub.stats()[0]["frames_published"] == 3
+
+    other = hub.subscribe("other-options", _counting_infer(calls))
+    assert len(hub.broadcasters) == 2
+    hub.unsubscribe(other)
+    assert len(hub.broadcasters) == 1
+
+    capture.end()
+    await _settle()
+    assert await fast.get() is None and await slow.get() is None
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_last_subscriber_leaving_stops_the_inference_loop():
+    capture, calls = FakeFrameCapture(), []
+    hub = StreamHub(capture)
+    subscriber = hub.subscribe("options", _counting_infer(calls))
+    broadcaster = subscriber.broadcaster
+    await _settle()
+    assert broadcaster.running
+    hub.unsubscribe(subscriber)
+    await _settle()
+    assert not broadcaster.running and not hub.broadcasters
+    capture.push()
+    await _settle()
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_frames_missed_by_a_busy_loop_are_counted_per_broadcaster():
+    capture, calls = FakeFrameCapture(), []
+    hub = StreamHub(capture)
+    subscriber = hub.subscribe("options", _counting_infer(calls))
+    capture.push()
+    await _settle()
+    # Trois frames arrivent pendant que la boucle est occupée : seule la plus récente est analysée.
+    for _ in range(3):
+        capture.push()
+    await _settle()
+    assert calls == [1, 4]
+    assert hub.stats()[0]["frames_skipped"] == 2 and subscriber.dropped == 0
+    await hub.close()
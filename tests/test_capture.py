@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import numpy as np
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.streaming.capture import LatestFrameCapture
+
+
+class SteppedCapture:
+    """Caméra factice : chaque lecture attend l'autorisation du test, -1 signale la fin du flux."""
+
+    def __init__(self):
+        self.pending = []
+        self.ready = threading.Condition()
+
+    def push(self, *values):
+        with self.ready:
+            self.pending.extend(values)
+            self.ready.notify_all()
+
+    def read(self):
+        with self.ready:
+            self.ready.wait_for(lambda: self.pending)
+            value = self.pending.pop(0)
+        if value < 0:
+            return False, None
+        return True, np.full((2, 2, 3), value, dtype=np.uint8)
+
+
+def _wait_for_captured(capture, count):
+    for _ in range(200):
+        if capture.captured >= count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{capture.captured} frames lues, {count} attendues")
+
+
+def test_latest_frame_wins_and_stale_frames_are_dropped():
+    source = SteppedCapture()
+    capture = LatestFrameCapture(source)
+    capture.start()
+    try:
+        source.push(1, 2, 3)
+        _wait_for_captured(capture, 3)
+        number, frame = capture.wait_newer(0)
+        assert number == 3 and frame[0, 0, 0] == 3
+        assert capture.stats()["dropped"] == 2
+        # Rien de plus récent : l'attente expire sans frame.
+        assert capture.wait_newer(number, timeout=0.05) is None and not capture.ended
+        source.push(4)
+        assert capture.wait_newer(number, timeout=1)[0] == 4
+        assert capture.stats()["dropped"] == 2
+    finally:
+        source.push(-1)
+        capture.stop()
+    assert capture.ended
+
+
+def test_end_of_stream_still_delivers_the_last_frame():
+    source = SteppedCapture()
+    capture = LatestFrameCapture(source)
+    capture.start()
+    source.push(7, -1)
+    try:
+        number, frame = capture.wait_newer(0, timeout=1)
+        assert number == 1 and frame[0, 0, 0] == 7
+        assert capture.wait_newer(number, timeout=1) is None and capture.ended
+        assert capture.latest()[0] == 1
+    finally:
+        capture.stop()
+
+
+@pytest.mark.asyncio
+async def test_next_frame_waits_without_blocking_the_event_loop():
+    source = SteppedCapture()
+    capture = LatestFrameCapture(source)
+    capture.start()
+    try:
+        waiting = asyncio.create_task(capture.next_frame(0, timeout=2))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        source.push(5)
+        number, frame = await waiting
+        assert number == 1 and frame[0, 0, 0] == 5
+    finally:
+        source.push(-1)
+        capture.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_waiters_do_not_park_threads():
+    source = SteppedCapture()
+    capture = LatestFrameCapture(source)
+    capture.start()
+    try:
+        threads_before = threading.active_count()
+        waiting = [asyncio.create_task(capture.next_frame(0, timeout=2)) for _ in range(20)]
+        await asyncio.sleep(0.05)
+        # Les attentes sont des événements asyncio réveillés par le thread de capture, pas des threads.
+        assert threading.active_count() == threads_before
+        source.push(9)
+        results = await asyncio.gather(*waiting)
+        assert all(number == 1 and frame[0, 0, 0] == 9 for number, frame in results)
+        assert not capture._waiters
+        assert await capture.next_frame(1, timeout=0.05) is None
+    finally:
+        source.push(-1)
+        capture.stop()
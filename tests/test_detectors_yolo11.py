@@ -0,0 +1,138 @@
+import cv2
+import numpy as np
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.detectors_yolo11 import YOLOv11Detector
+from api.detectors.detection_table import DetectionTable
+
+CLASSES = ("assis", "couche", "debout")
+DETECTIONS = [{"class_name": "debout", "confidence": 0.875, "bbox": [20.0, 30.0, 100.0, 90.0], "result": "success"}]
+
+
+def _detector():
+    """Détecteur sans modèle : seules les méthodes qui ne font pas d'inférence sont appelées."""
+    detector = YOLOv11Detector.__new__(YOLOv11Detector)
+    detector.class_names = CLASSES
+    return detector
+
+
+def _frame():
+    """Image RGB bruitée (le bruit rend la taille encodée sensible à la qualité), moitié gauche rouge pur."""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (120, 160, 3), dtype=np.uint8)
+    frame[:, :10] = (255, 0, 0)
+    return frame
+
+
+@pytest.mark.parametrize("image_format, magic", [("jpeg", b"\xff\xd8\xff"), ("webp", b"RIFF")])
+def test_annotate_and_encode_formats_and_quality(image_format, magic):
+    detector = _detector()
+    frame = _frame()
+    low = detector.annotate_and_encode(frame, DETECTIONS, image_format=image_format, quality=10)
+    high = detector.annotate_and_encode(frame, DETECTIONS, image_format=image_format, quality=95)
+    assert low.startswith(magic) and high.startswith(magic)
+    if image_format == "webp":
+        assert low[8:12] == b"WEBP"
+    assert len(low) < len(high)
+    with pytest.raises(ValueError):
+        detector.annotate_and_encode(frame, DETECTIONS, image_format="gif")
+
+
+def test_annotate_and_encode_converts_rgb_input_and_draws_detections():
+    detector = _detector()
+    frame = _frame()
+    original = frame.copy()
+    encoded = detector.annotate_and_encode(frame, DETECTIONS, image_format="jpeg", quality=100, rgb_input=True)
+    decoded = cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_COLOR)
+    assert np.array_equal(frame, original)  # l'image de l'appelant n'est pas modifiée
+
+    # Le rouge de l'image RGB reste rouge une fois décodée en BGR.
+    b, g, r = decoded[60:110, 2:8].reshape(-1, 3).mean(axis=0)
+    assert r > 200 and b < 60 and g < 60
+    # Le cadre vert de la détection est dessiné sur le bord gauche de la boîte.
+    b, g, r = decoded[50:80, 20].astype(int).mean(axis=0)
+    assert g > 200 and r < 60 and b < 60
+
+
+def test_detect_table_returns_the_inferred_table_as_is():
+    table = DetectionTable.from_records(DETECTIONS, CLASSES)
+    calls = []
+    detector = _detector()
+    detector._infer = lambda images, imgsz=None, conf=None: calls.append((len(images), imgsz, conf)) or [table]
+    assert detector.detect_table(_frame(), imgsz=320, conf=0.1) is table
+    assert calls == [(1, 320, 0.1)]
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_batched_video_yields_one_result_per_frame_in_order(tmp_path, pipelined):
+    video_path = str(tmp_path / "video.mp4")
+    values = [20 * i + 10 for i in range(11)]  # 11 frames, lots de 4 : le dernier lot n'en contient que 3
+    out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (64, 48))
+    for value in values:
+        out.write(np.full((48, 64, 3), value, dtype=np.uint8))
+    out.release()
+
+    batches = []
+
+    def infer(images, imgsz=None, conf=None):
+        batches.append(len(images))
+        # La confiance porte la luminosité de la frame : l'ordre des résultats est vérifiable.
+        return [DetectionTable.from_records([{"class_name": "assis", "confidence": float(image.mean()) / 255,
+                                              "bbox": [0.0, 0.0, 8.0, 8.0], "result": "success"}], CLASSES)
+                for image in images]
+
+    detector = _detector()
+    detector._infer = infer
+    result = detector.process_video(video_path, batch_size=4, pipelined=pipelined)
+    assert batches == [4, 4, 3]
+    assert result["frames_processed"] == 11 and result["frames_analyzed"] == 11
+    detections = result["detections"]
+    assert list(detections.rows["frame_number"]) == list(range(1, 12))
+    assert detections.rows["confidence"] * 255 == pytest.approx(values, abs=8)
+
+
+def test_segmented_sampling_renders_the_same_sources_as_the_detections(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from api.detectors import detectors_yolo11, video_segments
+
+    video_path = str(tmp_path / "video.mp4")
+    out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (64, 48))
+    for frame_number in range(1, 31):
+        out.write(np.full((48, 64, 3), 8 * frame_number, dtype=np.uint8))
+    out.release()
+
+    detector = _detector()
+    detector.backend = SimpleNamespace(source_path="model.pt", name="pytorch", precision="fp32")
+    # Chaque frame analysée porte son numéro (retrouvé depuis sa luminosité) dans sa confiance.
+    detector._infer = lambda images, imgsz=None, conf=None: [
+        DetectionTable.from_records([{"class_name": "assis", "confidence": round(float(image.mean()) / 8) / 100,
+                                      "bbox": [0.0, 0.0, 8.0, 8.0]}], CLASSES)
+        for image in images
+    ]
+    drawn = []
+    detector._draw_detections = lambda image, detections: drawn.append(round(float(detections[0]["confidence"]) * 100)) or image
+
+    class InProcessRunner:
+        workers = 1
+
+        def run(self, video_path, plan, output_dir, options, cancel_event=None, progress=None):
+            results = []
+            for index, (first, last) in enumerate(plan):
+                output = os.path.join(output_dir, f"segment_{index}.mp4") if output_dir else None
+                result = detector.process_segment(video_path, first, last, output, **options)
+                results.append({**result, "first_frame": first, "output_path": output, "processing_time": 0.0})
+            return results
+
+    monkeypatch.setattr(detectors_yolo11, "segment_runner", lambda *args: InProcessRunner())
+    monkeypatch.setattr(detectors_yolo11, "plan_segments", lambda total, segments: video_segments.plan_segments(total, segments, min_frames=5))
+    result = detector.process_video(video_path, str(tmp_path / "annotated.mp4"), sampling="stride", frame_stride=6,
+                                    segments=2, batch_size=4, pipelined=False)
+
+    sources = list(result["detections"].rows["source_frame"])
+    # Frame 16 : à égale distance des frames analysées 13 (segment précédent) et 19, la précédente l'emporte.
+    assert sources[15] == 13
+    assert drawn == sources and len(drawn) == 30
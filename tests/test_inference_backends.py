@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+import torch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.inference_backends import exported_model_path, match_detections, match_rate, check_precision, PrecisionUnavailable
+
+
+def _det(class_name, confidence, bbox):
+    return {"class_name": class_name, "confidence": confidence, "bbox": bbox}
+
+
+def test_exported_model_sits_next_to_checkpoint():
+    assert exported_model_path("/models/final_model_yolo11.pt", "onnx") == "/models/final_model_yolo11.onnx"
+    assert exported_model_path("/models/final_model_yolo11.pt", "torchscript") == "/models/final_model_yolo11.torchscript"
+    with pytest.raises(ValueError):
+        exported_model_path("/models/final_model_yolo11.pt", "tensorrt")
+
+
+def test_match_detections_requires_same_class_and_overlap():
+    reference = [_det("assis", 0.9, [0, 0, 10, 10]), _det("debout", 0.8, [20, 20, 30, 30])]
+    candidate = [_det("assis", 0.85, [1, 1, 10, 10]), _det("couche", 0.8, [20, 20, 30, 30]), _det("assis", 0.6, [50, 50, 60, 60])]
+    match = match_detections(reference, candidate)
+    assert match["matched"] == 1
+    assert match["missing"] == 1
+    assert match["extra"] == 2
+    assert match["confidence_deltas"] == [pytest.approx(0.05)]
+    assert match["ious"][0] == pytest.approx(0.81)
+
+
+class FakeBoxes:
+    def __init__(self, xyxy, conf):
+        self.xyxy = torch.tensor(xyxy, dtype=torch.float32)
+        self.conf = torch.tensor(conf, dtype=torch.float32)
+        self.cls = torch.zeros(len(conf))
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class FakeBackend:
+    """Moteur factice dont chaque mode décale les boîtes et les confiances d'une valeur fixe."""
+
+    names = {0: "assis"}
+
+    def __init__(self, shifts, failing=()):
+        self.shifts = shifts
+        self.failing = failing
+        self.precision = "fp32"
+
+    def apply_precision(self, precision):
+        if precision not in self.shifts:
+            raise PrecisionUnavailable(f"{precision} indisponible")
+        self.precision = precision
+
+    def restore_fp32(self):
+        self.precision = "fp32"
+
+    def predict(self, frame, conf=0.5, verbose=False):
+        if self.precision in self.failing:
+            raise RuntimeError(f"{self.precision} : échec au premier passage avant")
+        offset, confidence_delta = self.shifts.get(self.precision, (0, 0.0))
+        return [FakeResult(FakeBoxes([[10 + offset, 10, 110 + offset, 110]], [0.9 - confidence_delta]))]
+
+
+def test_precision_within_tolerance_is_enabled():
+    backend = FakeBackend({"bf16": (1, 0.01)})
+    report = check_precision(backend, "bf16", [np.zeros((4, 4, 3), dtype=np.uint8)] * 3)
+    assert report["accepted"]
+    assert backend.precision == "bf16"
+    assert report["mean_confidence_drift"] == pytest.approx(0.01, abs=1e-4)
+    strict = check_precision(FakeBackend({"bf16": (1, 0.01)}), "bf16", [np.zeros((4, 4, 3), dtype=np.uint8)] * 3,
+                             mean_confidence_drift=0.005)
+    assert not strict["accepted"] and "dérive de confiance moyenne" in strict["reason"]
+
+
+@pytest.mark.parametrize("shifts", [{"compile": (40, 0.0)}, {"compile": (0, 0.2)}, {}])
+def test_precision_beyond_tolerance_is_refused(shifts):
+    backend = FakeBackend(shifts)
+    report = check_precision(backend, "compile", [np.zeros((4, 4, 3), dtype=np.uint8)] * 3)
+    assert not report["accepted"]
+    assert report["reason"]
+    assert backend.precision == "fp32"
+
+
+def test_precision_without_reference_frames_is_refused():
+    backend = FakeBackend({"bf16": (0, 0.0)})
+    assert not check_precision(backend, "bf16", [])["accepted"]
+    assert backend.precision == "fp32"
+
+
+def test_precision_failing_on_first_inference_falls_back_to_fp32():
+    backend = FakeBackend({"compile": (0, 0.0)}, failing=("compile",))
+    report = check_precision(backend, "compile", [np.zeros((4, 4, 3), dtype=np.uint8)] * 3)
+    assert not report["accepted"]
+    assert "premier passage" in report["reason"]
+    assert backend.precision == "fp32"
+
+
+def test_match_rate_counts_extra_detections():
+    reference = [_det("assis", 0.9, [0, 0, 10, 10])]
+    match = match_detections(reference, reference + [_det("assis", 0.7, [50, 50, 60, 60])])
+    assert match_rate(match["matched"], match["missing"], match["extra"]) == 0.5
+
+
+def test_worker_processes_reuse_the_precision_accepted_by_the_parent(monkeypatch):
+    from api.detectors import detectors_yolo11, inference_executor, video_segments
+
+    class LoadedBackend(FakeBackend):
+        def __init__(self, model_path, backend):
+            super().__init__({"bf16": (0, 0.0)})
+            self.path = model_path
+            self.device = "cpu"
+
+    def no_check(*args, **kwargs):
+        raise AssertionError("le contrôle de précision ne doit tourner que dans le processus parent")
+
+    monkeypatch.setattr(detectors_yolo11, "InferenceBackend", LoadedBackend)
+    monkeypatch.setattr(detectors_yolo11, "check_precision", no_check)
+    detector = detectors_yolo11.YOLOv11Detector("model.onnx", backend="onnx", precision="bf16", verify_precision=False)
+    assert detector.precision == "bf16" and detector.precision_report is None
+
+    inference_executor._init_worker_process("model.onnx", "onnx", "bf16")
+    assert inference_executor._worker_detector.precision == "bf16"
+    monkeypatch.setattr(video_segments.cv2, "setNumThreads", lambda threads: None)
+    monkeypatch.setattr(torch, "set_num_threads", lambda threads: None)
+    video_segments._init_segment_worker("model.onnx", "onnx", "bf16", 1)
+    assert video_segments._segment_detector.precision == "bf16"
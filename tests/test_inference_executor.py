@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.inference_executor import InferenceExecutor, InferenceTimeout
+
+
+class SlowDetector:
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def process_image(self, value):
+        return value * 2
+
+    def process_video(self, duration, cancel_event=None):
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            if cancel_event is not None and cancel_event.is_set():
+                self.cancelled.set()
+                raise RuntimeError("cancelled")
+            time.sleep(0.01)
+        return "done"
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_off_the_event_loop():
+    executor = InferenceExecutor(detector=SlowDetector(), max_workers=1)
+    try:
+        assert await executor.run("process_image", 21) == 42
+        stats = executor.stats()
+        assert stats["completed"] == 1
+        assert stats["in_flight"] == 0
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timeout_signals_cancellation_to_running_job():
+    detector = SlowDetector()
+    executor = InferenceExecutor(detector=detector, max_workers=1)
+    try:
+        with pytest.raises(InferenceTimeout):
+            await executor.run("process_video", 5, timeout=0.05, cancellable=True)
+        assert await asyncio.to_thread(detector.cancelled.wait, 2)
+        assert executor.stats()["timed_out"] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_depth_counts_jobs_waiting_for_a_worker():
+    executor = InferenceExecutor(detector=SlowDetector(), max_workers=1)
+    try:
+        jobs = [asyncio.create_task(executor.run("process_video", 0.2)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["queue_depth"] == 2
+        assert await asyncio.gather(*jobs) == ["done"] * 3
+    finally:
+        executor.shutdown()
@@ -0,0 +1,119 @@
+import asyncio
+import cv2
+import numpy as np
+import pytest
+import sys
+import os
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.streaming.ingest import FORMAT_BGR, FORMAT_RGBA, IngestSession, decode_ingest_frame, pack_ingest_frame
+from api.detectors.inference_executor import InferenceExecutor
+from api.routers import routers_yolo11
+
+CLASSES = ("assis", "couche", "debout")
+DETECTION = {"class_name": "assis", "confidence": 0.875, "bbox": [1.0, 2.0, 3.0, 4.0], "result": "success"}
+
+
+class FakeDetector:
+    class_names = CLASSES
+
+    def __init__(self):
+        self.shapes = []
+
+    def process_image(self, frame, imgsz=None, conf=0.5):
+        self.shapes.append(frame.shape)
+        return [DETECTION], {"prediction_time": 0.0, "avg_confidence": 0.875, "frames_processed": 1}
+
+
+def _jpeg(frame):
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def test_frames_decode_from_jpeg_and_raw_pixels():
+    frame = np.zeros((4, 6, 3), dtype=np.uint8)
+    frame[..., 2] = 255  # rouge en BGR
+    number, decoded = decode_ingest_frame(pack_ingest_frame(9, _jpeg(frame)))
+    assert number == 9 and decoded.shape == (4, 6, 3)
+
+    rgba = np.zeros((4, 6, 4), dtype=np.uint8)
+    rgba[..., 0] = 255  # rouge en RGBA
+    rgba[..., 3] = 255
+    _, decoded = decode_ingest_frame(pack_ingest_frame(1, rgba.tobytes(), FORMAT_RGBA, 6, 4))
+    assert np.array_equal(decoded, frame)
+    _, decoded = decode_ingest_frame(pack_ingest_frame(2, frame.tobytes(), FORMAT_BGR, 6, 4))
+    assert np.array_equal(decoded, frame)
+
+    for payload in (b"\x01", pack_ingest_frame(1, b"not a jpeg"), pack_ingest_frame(1, b"\x00" * 10, FORMAT_BGR, 6, 4),
+                    pack_ingest_frame(1, b"", fmt=7)):
+        with pytest.raises(ValueError):
+            decode_ingest_frame(payload)
+
+
+def test_newest_frame_replaces_the_one_waiting_for_inference():
+    async def scenario():
+        session = IngestSession(credits=4)
+        assert session.offer(pack_ingest_frame(1, b"a")) is None
+        assert session.offer(pack_ingest_frame(2, b"b")) == 1
+        with pytest.raises(ValueError):
+            session.offer(b"\x02")
+        taken = await session.take()
+        session.close()
+        return taken, await session.take(), session.stats()
+
+    taken, after_close, stats = asyncio.run(scenario())
+    assert taken == pack_ingest_frame(2, b"b") and after_close is None
+    assert stats == {"received": 3, "inferred": 0, "dropped": 1, "invalid": 1}
+
+
+def test_websocket_ingestion_returns_detections_and_credits(monkeypatch):
+    detector = FakeDetector()
+    executor = InferenceExecutor(detector=detector, max_workers=1)
+    recorded = []
+
+    async def record_attempt(db, session_id, video_id, detection, prediction_time):
+        recorded.append((session_id, video_id, detection["result"]))
+        return detection["result"]
+
+    async def session_and_video(db, session_id, video_id):
+        # La vidéo 12 est d'une autre posture que la session.
+        if video_id == 12:
+            raise HTTPException(status_code=400, detail="posture mismatch")
+        return None, None
+
+    monkeypatch.setattr(routers_yolo11, "model_loader", type("Loader", (), {"ready": True, "failed": False})())
+    monkeypatch.setattr(routers_yolo11, "detector", detector)
+    monkeypatch.setattr(routers_yolo11, "inference_executor", executor)
+    monkeypatch.setattr(routers_yolo11, "_record_attempt", record_attempt)
+    monkeypatch.setattr(routers_yolo11.crud, "get_session_and_video", session_and_video)
+    app = FastAPI()
+    app.include_router(routers_yolo11.router)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    try:
+        with TestClient(app).websocket_connect("/yolo/ws-ingest/3?credits=2") as websocket:
+            hello = websocket.receive_json()
+            assert hello["mode"] == "ingest" and hello["credits"] == 2 and hello["classes"] == list(CLASSES)
+            websocket.send_bytes(b"\x01")
+            error = websocket.receive_json()
+            assert error["type"] == "error" and error["credits"] == 1
+
+            websocket.send_json({"type": "validate", "video_id": 11})
+            websocket.send_bytes(pack_ingest_frame(5, _jpeg(frame)))
+            result = websocket.receive_json()
+            assert result == {"type": "result", "frame_number": 5, "credits": 1, "detections": [DETECTION]}
+            validation = websocket.receive_json()
+            assert validation["type"] == "validation" and validation["result"] == "success"
+
+            websocket.send_json({"type": "validate"})
+            assert websocket.receive_json()["type"] == "error"
+            websocket.send_json({"type": "validate", "video_id": 12})
+            websocket.send_bytes(pack_ingest_frame(6, _jpeg(frame)))
+            assert websocket.receive_json()["frame_number"] == 6
+            refused = websocket.receive_json()
+            assert refused["type"] == "validation" and not refused["recorded"] and refused["message"] == "posture mismatch"
+    finally:
+        executor.shutdown()
+    assert detector.shapes == [(48, 64, 3)]
+    assert recorded == [(3, 11, "success")]
@@ -0,0 +1,77 @@
+import pytest
+import sys
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import metrics
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class FakeResult:
+    def __init__(self, preprocess, inference, postprocess):
+        self.speed = {"preprocess": preprocess, "inference": inference, "postprocess": postprocess}
+
+
+class FakeExecutor:
+    def stats(self):
+        return {"queue_depth": 3, "in_flight": 5}
+
+
+class FakeScheduler:
+    def stats(self):
+        return {"queued": 2}
+
+
+def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = _value("yolo_http_request_duration_seconds_count", **labels)
+    client = TestClient(app)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/missing").status_code == 404
+    assert _value("yolo_http_request_duration_seconds_count", **labels) == before + 2
+    assert _value("yolo_http_request_duration_seconds_count", method="GET", route=metrics.UNMATCHED_ROUTE, status="404") >= 1
+
+
+def test_inference_stages_combine_ultralytics_and_detector_timings():
+    before = {stage: _value("yolo_detector_stage_duration_seconds_sum", stage=stage) for stage in ("preprocess", "infer", "postprocess")}
+    # Deux images : 2 ms de réduction et 4 ms de conversion pour le lot.
+    metrics.observe_inference([FakeResult(1.0, 10.0, 2.0), FakeResult(1.0, 10.0, 2.0)], prepare_s=0.002, convert_s=0.004)
+    after = {stage: _value("yolo_detector_stage_duration_seconds_sum", stage=stage) for stage in before}
+    assert after["preprocess"] - before["preprocess"] == pytest.approx(0.004)
+    assert after["infer"] - before["infer"] == pytest.approx(0.02)
+    assert after["postprocess"] - before["postprocess"] == pytest.approx(0.008)
+
+
+def test_batch_stage_timings_are_recorded_per_frame():
+    before = _value("yolo_detector_stage_duration_seconds_count", stage="encode")
+    metrics.observe_stage("encode", 0.08, frames=8)
+    assert _value("yolo_detector_stage_duration_seconds_count", stage="encode") == before + 8
+
+
+def test_metrics_endpoint_exposes_queue_depth():
+    metrics.track_inference_queues(FakeExecutor(), FakeScheduler())
+    try:
+        content, media_type = metrics.render()
+    finally:
+        metrics.track_inference_queues(None, None)
+    text = content.decode()
+    assert media_type.startswith("text/plain")
+    assert 'yolo_inference_queue_depth{queue="executor"} 3.0' in text
+    assert 'yolo_inference_queue_depth{queue="batch"} 2.0' in text
+    assert "yolo_inference_in_flight 5.0" in text
+    assert "yolo_ws_active_streams" in text
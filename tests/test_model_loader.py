@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+import sys
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.model_loader import ModelLoader
+from api.detectors.inference_executor import InferenceExecutor
+from api.routers import routers_yolo11
+
+
+class FakeDetector:
+    def __init__(self):
+        self.calls = []
+
+    def process_image(self, frame):
+        self.calls.append(frame.shape)
+        return [], {"prediction_time": 0.0, "avg_confidence": 0.0, "frames_processed": 1}
+
+
+@pytest.mark.asyncio
+async def test_loader_warms_up_before_becoming_ready():
+    detector = FakeDetector()
+    executor = InferenceExecutor(detector=detector, max_workers=1)
+
+    async def on_loaded(loaded):
+        assert loader.state == "warming"
+        executor.start()
+        return executor
+
+    loader = ModelLoader("/fake/model.pt", on_loaded, warmup_runs=3, warmup_size=(320, 240), build=lambda path: detector)
+    try:
+        loader.start()
+        await loader.wait_ready()
+        assert loader.ready
+        assert detector.calls == [(240, 320, 3)] * 3
+        assert loader.status()["load_time_s"] is not None
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_loader_reports_failure():
+    def build(path):
+        raise FileNotFoundError("model missing")
+
+    loader = ModelLoader("/fake/model.pt", None, build=build)
+    loader.start()
+    await loader.wait_ready()
+    assert loader.failed
+    assert loader.error == "model missing"
+
+
+def test_yolo_routes_return_503_until_model_is_ready(monkeypatch):
+    loader = ModelLoader("/fake/model.pt", None)
+    monkeypatch.setattr(routers_yolo11, "model_loader", loader)
+    app = FastAPI()
+    app.include_router(routers_yolo11.router)
+    response = TestClient(app).get("/yolo/executor/stats")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"].isdigit()
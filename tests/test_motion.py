@@ -0,0 +1,93 @@
+import asyncio
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.detection_table import DetectionTable
+from api.streaming.motion import MotionGate
+from api.routers import routers_yolo11
+
+
+def _scene(dog_x=None, noise=0, light=90):
+    rng = np.random.default_rng(0 if dog_x is None else dog_x)
+    frame = np.full((240, 320, 3), light, dtype=np.uint8)
+    if dog_x is not None:
+        frame[80:200, dog_x:dog_x + 60] = 220
+    if noise:
+        frame = np.clip(frame.astype(np.int16) + rng.integers(-noise, noise + 1, frame.shape), 0, 255).astype(np.uint8)
+    return frame
+
+
+def test_still_scene_is_skipped_and_movement_is_inferred():
+    gate = MotionGate(threshold=0.01, max_age_s=60)
+    assert gate.should_infer(_scene(40))
+    # Bruit du capteur : lissé par la réduction, il reste sous l'écart par pixel.
+    assert not gate.should_infer(_scene(40, noise=6))
+    assert gate.should_infer(_scene(120))
+    assert not gate.should_infer(_scene(120, noise=6))
+    assert gate.stats()["inferred"] == 2 and gate.stats()["skipped"] == 2
+
+
+def test_slow_drift_and_max_age_force_inference():
+    gate = MotionGate(threshold=0.01, max_age_s=60)
+    gate.should_infer(_scene(40))
+    # Comparaison avec la dernière frame analysée : une lumière qui change peu à peu finit par compter.
+    decisions = [gate.should_infer(_scene(40, light=light)) for light in range(92, 120, 2)]
+    assert not decisions[0] and any(decisions)
+
+    stale = MotionGate(threshold=0.01, max_age_s=0)
+    assert stale.should_infer(_scene(40)) and stale.should_infer(_scene(40))
+
+
+def test_stream_inference_reuses_detections_of_unchanged_frames(monkeypatch):
+    class CountingExecutor:
+        calls = 0
+
+        async def run(self, method, frame, **options):
+            self.calls += 1
+            return [{"class_name": "assis", "confidence": 0.9, "bbox": [0, 0, 1, 1], "result": "success", "call": self.calls}], {}
+
+    executor = CountingExecutor()
+    monkeypatch.setattr(routers_yolo11, "inference_executor", executor)
+    options = {"imgsz": 640, "conf": 0.5}
+
+    async def run(threshold):
+        infer = routers_yolo11._stream_inference(options, False, 5, threshold)
+        return [await infer(number, _scene(x)) for number, x in enumerate((40, 40, 40, 200), start=1)], infer
+
+    results, infer = asyncio.run(run(0.01))
+    assert [detections[0]["call"] for detections in results] == [1, 1, 1, 2]
+    assert infer.motion_gate.stats()["skipped"] == 2
+    results, infer = asyncio.run(run(0))
+    assert infer.motion_gate is None and executor.calls == 6
+
+
+def test_skipped_frames_advance_the_tracker(monkeypatch):
+    class DetectingExecutor:
+        calls = 0
+
+        async def run(self, method, frame, **options):
+            assert method == "detect_table"
+            self.calls += 1
+            return DetectionTable.from_records(
+                [{"class_name": "assis", "confidence": 0.9, "bbox": [40.0, 80.0, 100.0, 200.0]}], ("assis", "couche", "debout")
+            )
+
+    executor = DetectingExecutor()
+    monkeypatch.setattr(routers_yolo11, "inference_executor", executor)
+    monkeypatch.setattr(routers_yolo11, "detector", type("Detector", (), {"class_names": ("assis", "couche", "debout")})())
+
+    async def run():
+        infer = routers_yolo11._stream_inference({"imgsz": 640, "conf": 0.5}, True, 2, 0.01)
+        return [await infer(number, _scene(40)) for number in range(1, 5)], infer
+
+    results, infer = asyncio.run(run())
+    assert executor.calls == 1
+    # La première frame n'a rien à réutiliser : elle compte comme analysée, pas comme ignorée.
+    assert infer.motion_gate.stats()["inferred"] == 1 and infer.motion_gate.stats()["skipped"] == 3
+    # Les frames ignorées propagent les pistes : leur état suit les numéros de frame.
+    assert infer.tracker.stats()["frames_propagated"] == 3
+    assert [track.frame for track in infer.tracker.tracks] == [4]
+    assert [detections[0]["track_id"] for detections in results] == [1, 1, 1, 1]
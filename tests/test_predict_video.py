@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+import tempfile
+import sys
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import database
+from api.routers import routers_yolo11
+
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 64
+ANNOTATED = b"annotated-video"
+
+
+class FakeExecutor:
+    """Remplace `process_video` : écrit la vidéo annotée ou échoue en cours de traitement."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.paths = None
+
+    async def run(self, method, input_path, output_path, **kwargs):
+        assert method == "process_video"
+        self.paths = (input_path, output_path)
+        assert open(input_path, "rb").read() == VIDEO
+        with open(output_path, "wb") as out:
+            out.write(ANNOTATED)
+        if self.fail:
+            raise RuntimeError("décodage impossible")
+        return {"detections": [], "prediction_time": 0.1, "avg_confidence": 0.0, "frames_processed": 0}
+
+
+class BrokenUpload:
+    """Upload dont la lecture échoue après le premier bloc (client déconnecté)."""
+
+    def __init__(self):
+        self.reads = 0
+
+    async def read(self, size):
+        self.reads += 1
+        if self.reads > 1:
+            raise ConnectionError("client parti")
+        return b"x" * size
+
+
+async def _no_db():
+    yield None
+
+
+def _client(monkeypatch, tmp_path, executor):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(routers_yolo11, "model_loader", type("Loader", (), {"ready": True, "failed": False})())
+    monkeypatch.setattr(routers_yolo11, "inference_executor", executor)
+    app = FastAPI()
+    app.include_router(routers_yolo11.router)
+    app.dependency_overrides[database.get_db] = _no_db
+    return TestClient(app)
+
+
+def test_annotated_video_and_upload_are_removed_after_the_response(monkeypatch, tmp_path):
+    executor = FakeExecutor()
+    response = _client(monkeypatch, tmp_path, executor).post(
+        "/yolo/predict-video?session_id=1&video_id=1", files={"file": ("chien.mp4", VIDEO, "video/mp4")}
+    )
+    assert response.status_code == 200 and response.content == ANNOTATED
+    input_path, output_path = executor.paths
+    assert os.path.dirname(input_path) == str(tmp_path) and os.path.dirname(output_path) == str(tmp_path)
+    # La tâche de fond a supprimé la vidéo annotée une fois envoyée ; l'upload l'a été dès la fin du traitement.
+    assert os.listdir(tmp_path) == []
+
+
+def test_temporary_files_are_removed_when_processing_fails(monkeypatch, tmp_path):
+    executor = FakeExecutor(fail=True)
+    response = _client(monkeypatch, tmp_path, executor).post(
+        "/yolo/predict-video?session_id=1&video_id=1", files={"file": ("chien.mp4", VIDEO, "video/mp4")}
+    )
+    assert response.status_code == 500
+    assert executor.paths is not None
+    assert os.listdir(tmp_path) == []
+
+
+def test_spool_upload_removes_partial_file_on_error(tmp_path):
+    with pytest.raises(ConnectionError):
+        asyncio.run(routers_yolo11._spool_upload(BrokenUpload(), ".mp4", directory=str(tmp_path)))
+    assert os.listdir(tmp_path) == []
+    routers_yolo11._remove_files(None, str(tmp_path / "absent.mp4"))  # chemins absents ignorés
+
+
+def test_job_with_mismatched_posture_is_refused_before_spooling(monkeypatch, tmp_path):
+    from fastapi import HTTPException
+    from api import crud
+
+    async def mismatch(db, session_id, video_id):
+        raise HTTPException(status_code=400, detail="posture mismatch")
+
+    monkeypatch.setattr(crud, "get_session_and_video", mismatch)
+    monkeypatch.setattr(routers_yolo11, "JOB_INPUT_DIR", str(tmp_path / "jobs"))
+    response = _client(monkeypatch, tmp_path, FakeExecutor()).post(
+        "/yolo/jobs?session_id=1&video_id=2", files={"file": ("chien.mp4", VIDEO, "video/mp4")}
+    )
+    assert response.status_code == 400
+    assert os.listdir(tmp_path) == []
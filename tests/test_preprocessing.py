@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import torch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.preprocessing import Preprocessor, validate_imgsz, model_imgsz
+from api.detectors.detection_table import DetectionTable
+
+
+def test_oversized_images_are_reduced_into_reused_buffers():
+    preprocessor = Preprocessor()
+    image = np.zeros((3000, 4000, 3), dtype=np.uint8)
+    prepared, scales, size = preprocessor.prepare([image], 640)
+    assert prepared[0].shape == (480, 640, 3)
+    assert scales[0] == pytest.approx((0.16, 0.16))
+    assert size == 640
+    again, _, _ = preprocessor.prepare([image], 640)
+    assert again[0] is prepared[0]
+
+
+def test_small_images_are_not_scaled_up():
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    prepared, scales, size = Preprocessor().prepare([image], 640)
+    assert prepared[0] is image
+    assert scales[0] == (1.0, 1.0)
+    assert size == 320
+    assert model_imgsz([(250, 300, 3)], 640) == 320
+
+
+def test_imgsz_must_be_a_stride_multiple():
+    assert validate_imgsz(None) == 640
+    with pytest.raises(ValueError):
+        validate_imgsz(500)
+
+
+def test_boxes_are_mapped_back_to_original_coordinates():
+    class Boxes:
+        xyxy = torch.tensor([[16.0, 32.0, 64.0, 96.0]])
+        conf = torch.tensor([0.9])
+        cls = torch.tensor([0.0])
+
+        def __len__(self):
+            return 1
+
+    table = DetectionTable.from_boxes(Boxes(), ("assis",), scale=(0.16, 0.16))
+    assert table[0]["bbox"] == [100.0, 200.0, 400.0, 600.0]
@@ -0,0 +1,73 @@
+import os
+import pstats
+import sys
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.profiling import ProfilingMiddleware, rotate
+from api.detectors.inference_executor import InferenceExecutor
+
+
+class FakeDetector:
+    def slow_inference(self, value):
+        time.sleep(0.01)
+        return value * 2
+
+
+def _app(tmp_path, **options):
+    executor = InferenceExecutor(detector=FakeDetector(), max_workers=1)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, directory=str(tmp_path), torch_enabled=False, **options)
+
+    @app.get("/yolo/work")
+    async def work():
+        return {"value": await executor.run("slow_inference", 21)}
+
+    return app, executor
+
+
+def test_admin_header_profiles_the_request_and_executor_thread(tmp_path):
+    app, executor = _app(tmp_path, token="secret")
+    try:
+        client = TestClient(app)
+        assert "x-profile-id" not in client.get("/yolo/work").headers
+        assert "x-profile-id" not in client.get("/yolo/work", headers={"X-Profile-Token": "wrong"}).headers
+        response = client.get("/yolo/work", headers={"X-Profile-Token": "secret"})
+    finally:
+        executor.shutdown()
+    assert response.json() == {"value": 42}
+    name = response.headers["x-profile-id"]
+    assert sorted(os.listdir(tmp_path)) == [f"{name}.prof", f"{name}.txt"]
+    # Le profil du thread de l'exécuteur est fusionné avec celui de la boucle d'événements.
+    functions = {function for _, _, function in pstats.Stats(str(tmp_path / f"{name}.prof")).stats}
+    assert "slow_inference" in functions
+    summary = (tmp_path / f"{name}.txt").read_text(encoding="utf-8")
+    assert summary.startswith("GET /yolo/work -> 200") and "FakeDetector.slow_inference" in summary
+
+
+def test_sampling_only_applies_to_inference_routes(tmp_path):
+    app, executor = _app(tmp_path, sample_rate=1.0)
+
+    @app.get("/other")
+    async def other():
+        return {}
+
+    try:
+        client = TestClient(app)
+        assert "x-profile-id" not in client.get("/other").headers
+        assert "x-profile-id" in client.get("/yolo/work").headers
+    finally:
+        executor.shutdown()
+
+
+def test_rotation_keeps_the_most_recent_profiles(tmp_path):
+    for index in range(5):
+        for extension in ("prof", "txt", "torch0.json"):
+            path = tmp_path / f"profile{index}.{extension}"
+            path.write_text("")
+            os.utime(path, (index, index))
+    rotate(str(tmp_path), keep=2)
+    assert sorted(os.listdir(tmp_path)) == sorted(f"profile{i}.{e}" for i in (3, 4) for e in ("prof", "txt", "torch0.json"))
@@ -0,0 +1,85 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.detection_table import DetectionTable
+from api.detectors.reference_index import ReferenceIndex, reference_video_path
+
+
+class FakeDetector:
+    model_version = "fake:1"
+
+    def __init__(self):
+        self.processed = []
+
+    def process_video(self, video_path, output_path=None, imgsz=None, conf=0.5):
+        self.processed.append(os.path.basename(video_path))
+        detections = DetectionTable.from_records([
+            {"class_name": "assis", "confidence": 0.9, "bbox": [1, 2, 3, 4], "frame_number": 1, "timestamp": 0.04},
+            {"class_name": "assis", "confidence": 0.7, "bbox": [1, 2, 3, 4], "frame_number": 2, "timestamp": 0.08},
+            {"class_name": "debout", "confidence": 0.2, "bbox": [5, 6, 7, 8], "frame_number": 2, "timestamp": 0.08},
+        ], ("assis", "debout"))
+        return {"detections": detections, "total_frames": 4, "fps": 25.0, "duration": 0.16}
+
+
+def _videos(tmp_path):
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    (videos / "chien_assis_1.mp4").write_bytes(b"first")
+    (videos / "chien_a_pieds_3  .mp4").write_bytes(b"second")
+    return videos
+
+
+def test_build_indexes_every_video_with_a_summary(tmp_path):
+    videos = _videos(tmp_path)
+    index = ReferenceIndex(str(tmp_path / "index"))
+    report = index.build(FakeDetector(), str(videos))
+    assert sorted(report["indexed"]) == ["static/videos/chien_a_pieds_3_.mp4", "static/videos/chien_assis_1.mp4"]
+    summary = index.summary("static/videos/chien_assis_1.mp4")
+    assert summary["posture"] == "assis"
+    assert summary["dominant_class"] == "assis" and summary["matches_posture"] is True
+    assert summary["class_counts"] == {"assis": 2, "debout": 1}
+    assert summary["frames_with_detections"] == 2 and summary["detection_rate"] == 0.5
+    assert len(index.detections("static/videos/chien_assis_1.mp4")) == 3
+    # Une autre instance relit le même index sans modèle
+    assert ReferenceIndex(str(tmp_path / "index")).summary("static/videos/chien_assis_1.mp4") == summary
+
+
+def test_only_changed_videos_are_rebuilt(tmp_path):
+    videos = _videos(tmp_path)
+    index = ReferenceIndex(str(tmp_path / "index"))
+    index.build(FakeDetector(), str(videos))
+
+    detector = FakeDetector()
+    # Date modifiée mais contenu identique : l'empreinte évite une nouvelle analyse
+    os.utime(videos / "chien_assis_1.mp4", ns=(0, 0))
+    (videos / "chien_a_pieds_3  .mp4").write_bytes(b"changed")
+    report = index.build(detector, str(videos))
+    assert detector.processed == ["chien_a_pieds_3  .mp4"]
+    assert report["unchanged"] == ["static/videos/chien_assis_1.mp4"]
+    assert len(os.listdir(tmp_path / "index")) == 3  # manifeste + un fichier Parquet par vidéo
+
+    (videos / "chien_a_pieds_3  .mp4").unlink()
+    report = index.build(detector, str(videos))
+    assert report["removed"] == ["static/videos/chien_a_pieds_3_.mp4"]
+    assert index.get("static/videos/chien_a_pieds_3_.mp4") is None
+
+
+def test_model_change_triggers_a_rebuild(tmp_path):
+    videos = _videos(tmp_path)
+    index = ReferenceIndex(str(tmp_path / "index"))
+    index.build(FakeDetector(), str(videos))
+    detector = FakeDetector()
+    detector.model_version = "fake:2"
+    assert len(index.build(detector, str(videos))["indexed"]) == 2
+
+
+def test_video_path_matches_the_seeded_value():
+    assert reference_video_path("chien_a_pieds_3  .mp4") == "static/videos/chien_a_pieds_3_.mp4"
+
+
+def test_posture_ignores_trailing_spaces():
+    from api.detectors.reference_index import posture_from_filename
+    assert posture_from_filename("chien_a_pieds_3  .mp4") == "a_pieds"
+    assert posture_from_filename("chiens_assis_2.mp4") == "assis"
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.result_cache import ResultCache
+
+
+def _image(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def _result(value):
+    return ([{"class_name": "assis", "confidence": value, "bbox": [0.0, 0.0, 1.0, 1.0], "result": "success"}],
+            {"prediction_time": 0.0, "avg_confidence": value, "frames_processed": 1})
+
+
+def test_key_depends_on_pixels_model_and_options():
+    cache = ResultCache(model_version="v1")
+    key = cache.make_key(_image(1), {"imgsz": 640, "conf": 0.5})
+    assert key == cache.make_key(_image(1).copy(), {"conf": 0.5, "imgsz": 640})
+    assert key != cache.make_key(_image(2), {"imgsz": 640, "conf": 0.5})
+    assert key != cache.make_key(_image(1), {"imgsz": 320, "conf": 0.5})
+    assert key != ResultCache(model_version="v2").make_key(_image(1), {"imgsz": 640, "conf": 0.5})
+
+
+def test_lru_eviction_and_copies():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", _result(0.1))
+    cache.put("b", _result(0.2))
+    cache.get("a")[0][0]["confidence"] = 99.0  # chaque appelant reçoit sa propre copie
+    cache.put("c", _result(0.3))
+    assert cache.get("b") is None
+    assert cache.get("a")[0][0]["confidence"] == 0.1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+
+def test_memory_budget_and_ttl(monkeypatch):
+    import api.detectors.result_cache as result_cache
+    clock = [100.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: clock[0])
+    size = len(result_cache.pickle.dumps(_result(0.1), protocol=result_cache.pickle.HIGHEST_PROTOCOL))
+    cache = ResultCache(max_bytes=2 * size, ttl_s=10)
+    for key in "abc":
+        cache.put(key, _result(0.1))
+    assert cache.stats()["entries"] == 2 and cache.stats()["bytes"] <= 2 * size
+    clock[0] += 11
+    assert cache.get("c") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_evicted_entries_are_spilled_to_disk(tmp_path):
+    cache = ResultCache(max_entries=1, spill_dir=str(tmp_path))
+    cache.put("a", _result(0.1))
+    cache.put("b", _result(0.2))
+    assert os.path.exists(tmp_path / "a.result")
+    assert cache.get("a") == _result(0.1)
+    assert cache.stats()["disk_hits"] == 1
+    # Une nouvelle instance reprend les entrées déversées
+    assert ResultCache(max_entries=1, spill_dir=str(tmp_path)).get("b") == _result(0.2)
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_coalesced():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return _result(0.7)
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+    assert len(calls) == 1
+    assert all(result == _result(0.7) for result in results)
+    assert await cache.get_or_compute("k", compute) == _result(0.7)
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["coalesced"], stats["hits"], stats["in_flight"]) == (4, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached_and_abandoned_work_is_cancelled():
+    cache = ResultCache()
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("k", failing)
+    assert cache.stats()["entries"] == 0
+
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def slow():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(cache.get_or_compute("k", slow))
+    await started.wait()
+    waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert cache.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_report_lookup_time_not_original_inference(monkeypatch):
+    from api.routers import routers_yolo11
+
+    class SlowScheduler:
+        async def submit(self, image_np, **options):
+            return ([], {"prediction_time": 5.0, "avg_confidence": 0.0, "frames_processed": 1})
+
+    monkeypatch.setattr(routers_yolo11, "result_cache", ResultCache())
+    monkeypatch.setattr(routers_yolo11, "batch_scheduler", SlowScheduler())
+    _, first = await routers_yolo11._detect_image(_image(1), {"imgsz": 640})
+    assert first["prediction_time"] == 5.0 and "cached" not in first
+    _, second = await routers_yolo11._detect_image(_image(1), {"imgsz": 640})
+    assert second["cached"] is True
+    assert second["prediction_time"] < 1.0
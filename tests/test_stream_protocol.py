@@ -0,0 +1,121 @@
+import base64
+import cv2
+import numpy as np
+import pytest
+import sys
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.streaming.protocol import AdaptiveQuality, StreamEncoder, pack_frame, unpack_frame
+from api.streaming.capture import LatestFrameCapture
+from api.streaming.broadcaster import StreamHub
+from api.detectors.inference_executor import InferenceExecutor
+from api.routers import routers_yolo11
+
+CLASSES = ("assis", "couche", "debout")
+DETECTIONS = [
+    {"class_name": "debout", "confidence": 0.875, "bbox": [10.0, 20.0, 110.0, 220.0], "result": "success", "track_id": 3},
+    {"class_name": "assis", "confidence": 0.25, "bbox": [5.0, 6.0, 7.0, 8.0], "result": "failure"},
+]
+
+
+class FakeCapture:
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+
+
+class FakeDetector:
+    class_names = CLASSES
+
+    def process_image(self, frame, imgsz=None, conf=0.5):
+        return DETECTIONS[:1], {"prediction_time": 0.0, "avg_confidence": 0.875, "frames_processed": 1}
+
+
+def test_binary_frame_round_trip():
+    payload = pack_frame(7, (640, 480), DETECTIONS, CLASSES, jpeg=b"\xff\xd8jpeg", quality=70)
+    assert len(payload) == 13 + 2 * 26 + 6
+    frame = unpack_frame(payload, CLASSES)
+    assert frame["frame_number"] == 7 and frame["frame_size"] == (640, 480) and frame["quality"] == 70
+    assert frame["jpeg"] == b"\xff\xd8jpeg"
+    assert frame["detections"] == DETECTIONS
+
+
+def test_detections_only_frames_carry_no_image():
+    frame = unpack_frame(pack_frame(1, (640, 480), DETECTIONS, CLASSES), CLASSES)
+    assert frame["jpeg"] is None and frame["quality"] == 0 and len(frame["detections"]) == 2
+
+
+def test_quality_adapts_to_send_lag():
+    quality = AdaptiveQuality(80, min_quality=40, step=10, target_lag_s=0.05)
+    assert [quality.update(0.2) for _ in range(6)] == [70, 60, 50, 40, 40, 40]
+    for _ in range(30):
+        quality.update(0.001)
+    assert quality.quality == 80  # jamais au-dessus de la qualité négociée
+    assert AdaptiveQuality(80, enabled=False).update(1.0) == 80
+
+
+def test_json_frames_keep_quality_95_under_lag_unless_adaptive_is_requested():
+    json_encoder = StreamEncoder(CLASSES)
+    assert [json_encoder.record_send_lag(1.0) for _ in range(5)] == [95] * 5
+    assert StreamEncoder(CLASSES, "binary", quality=80).record_send_lag(1.0) < 80
+    assert StreamEncoder(CLASSES, adaptive=True).record_send_lag(1.0) < 95
+    assert StreamEncoder(CLASSES, "binary", quality=80, adaptive=False).record_send_lag(1.0) == 80
+
+
+def test_encoder_downscales_pixels_but_keeps_boxes_in_frame_coordinates():
+    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    encoder = StreamEncoder(CLASSES, "binary", quality=60, max_width=320)
+    decoded = unpack_frame(encoder.encode(1, frame, DETECTIONS), CLASSES)
+    assert decoded["frame_size"] == (640, 480) and decoded["quality"] == 60
+    assert cv2.imdecode(np.frombuffer(decoded["jpeg"], np.uint8), cv2.IMREAD_COLOR).shape == (240, 320, 3)
+    assert decoded["detections"][0]["bbox"] == DETECTIONS[0]["bbox"]
+
+    json_message = StreamEncoder(CLASSES).encode(1, frame, DETECTIONS)
+    assert json_message["detections"] == DETECTIONS
+    assert cv2.imdecode(np.frombuffer(base64.b64decode(json_message["frame"]), np.uint8), cv2.IMREAD_COLOR).shape == (480, 640, 3)
+
+
+@pytest.mark.parametrize("query, expect_image", [("protocol=binary&quality=50", True), ("protocol=binary&pixels=false", False)])
+def test_websocket_binary_protocol(monkeypatch, query, expect_image):
+    frames = [np.zeros((48, 64, 3), dtype=np.uint8)] * 2
+    executor = InferenceExecutor(detector=FakeDetector(), max_workers=1)
+    monkeypatch.setattr(routers_yolo11, "model_loader", type("Loader", (), {"ready": True, "failed": False})())
+    monkeypatch.setattr(routers_yolo11, "detector", FakeDetector())
+    monkeypatch.setattr(routers_yolo11, "inference_executor", executor)
+    capture = LatestFrameCapture(FakeCapture(frames))
+    capture.start()
+    monkeypatch.setattr(routers_yolo11, "frame_capture", capture)
+    monkeypatch.setattr(routers_yolo11, "stream_hub", StreamHub(capture))
+    monkeypatch.setattr(routers_yolo11, "streaming_active", True)
+    app = FastAPI()
+    app.include_router(routers_yolo11.router)
+    try:
+        with TestClient(app).websocket_connect(f"/yolo/ws/1/0?{query}") as websocket:
+            hello = websocket.receive_json()
+            assert hello["classes"] == list(CLASSES) and hello["pixels"] is expect_image
+            received = []
+            try:
+                while True:
+                    received.append(unpack_frame(websocket.receive_bytes(), hello["classes"]))
+            except WebSocketDisconnect:
+                pass
+        # La frame la plus récente gagne : la première a pu être remplacée avant l'analyse.
+        assert received and received[-1]["frame_number"] == 2
+        for frame in received:
+            assert frame["frame_size"] == (64, 48) and frame["detections"] == DETECTIONS[:1]
+            assert (frame["jpeg"] is not None) is expect_image
+    finally:
+        capture.stop()
+        executor.shutdown()
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.detection_table import DetectionTable
+from api.detectors.tracking import Tracker, greedy_match, iou_matrix, summarize_tracks, tracked_table
+
+CLASSES = ("assis", "couche", "debout")
+
+
+def _detections(*boxes):
+    """Détections `(classe, confiance, x1)` de boîtes 40x40 alignées sur y=10."""
+    return DetectionTable.from_records([
+        {"class_name": name, "confidence": conf, "bbox": [x, 10, x + 40, 50]} for name, conf, x in boxes
+    ], CLASSES)
+
+
+def test_greedy_match_prefers_highest_iou():
+    tracks = np.array([[0, 0, 10, 10], [20, 0, 30, 10]], dtype=float)
+    detections = np.array([[21, 0, 31, 10], [1, 0, 11, 10], [100, 100, 110, 110]], dtype=float)
+    pairs, free_tracks, free_detections = greedy_match(iou_matrix(tracks, detections), 0.3)
+    assert sorted(pairs) == [(0, 1), (1, 0)]
+    assert free_tracks == [] and free_detections == [2]
+
+
+def test_ids_are_stable_and_boxes_are_propagated_between_detections():
+    tracker = Tracker(CLASSES, detect_every=3, high_conf=0.5, min_confidence=0.0)
+    frames = {}
+    for frame_number in range(1, 8):
+        # Deux chiens : l'un avance de 2 px par frame, l'autre reste immobile.
+        detect = lambda n=frame_number: _detections(("assis", 0.9, 2 * n), ("debout", 0.8, 200))
+        frames[frame_number] = tracker.step(frame_number, detect)
+    assert tracker.detections_run == 3  # frames 1, 4 et 7
+    assert all(sorted(table.rows["track_id"]) == [1, 2] for table in frames.values())
+    moving = frames[6].rows[frames[6].rows["track_id"] == 1][0]
+    assert moving["x1"] == pytest.approx(12, abs=1)  # propagé à vitesse constante
+    assert moving["source_frame"] == 4
+    assert frames[6][0]["track_id"] in (1, 2)
+
+
+def test_posture_change_keeps_the_track_and_weak_detections_extend_it():
+    tracker = Tracker(CLASSES, high_conf=0.5, low_conf=0.1)
+    tracker.update(1, _detections(("assis", 0.9, 10)))
+    # La posture change et la confiance baisse : la piste est conservée, pas de nouvelle piste.
+    table = tracker.update(2, _detections(("debout", 0.3, 11)))
+    assert list(table.rows["track_id"]) == [1]
+    assert table[0]["class_name"] == "debout"
+    # Une détection faible isolée n'ouvre pas de piste.
+    assert list(tracker.update(3, _detections(("debout", 0.3, 11), ("assis", 0.2, 300))).rows["track_id"]) == [1]
+
+
+def test_lost_tracks_are_recovered_then_dropped():
+    tracker = Tracker(CLASSES, high_conf=0.5, max_age=3)
+    tracker.update(1, _detections(("assis", 0.9, 10)))
+    assert len(tracker.update(2, _detections())) == 0
+    assert list(tracker.update(3, _detections(("assis", 0.9, 10))).rows["track_id"]) == [1]
+    for frame_number in range(4, 9):
+        tracker.update(frame_number, _detections())
+    assert tracker.tracks == []
+    assert list(tracker.update(9, _detections(("assis", 0.9, 10))).rows["track_id"]) == [2]
+
+
+def test_confidence_decay_triggers_an_early_detection():
+    tracker = Tracker(CLASSES, detect_every=30, high_conf=0.5, min_confidence=0.5, decay=0.9)
+    tracker.update(1, _detections(("assis", 0.6, 10)))
+    assert not tracker.needs_detection(2)  # 0.6 * 0.9 = 0.54
+    assert tracker.needs_detection(3)      # 0.6 * 0.81 < 0.5
+
+
+def test_propagated_boxes_keep_the_result_of_the_last_detection():
+    tracker = Tracker(CLASSES, detect_every=30, high_conf=0.5, min_confidence=0.0, decay=0.9)
+    tracker.update(1, _detections(("assis", 0.6, 10)))
+    # Chien immobile : la confiance décrue passerait sous 0.5 dès la frame 3.
+    for frame_number in range(2, 10):
+        detection = tracker.propagate(frame_number)[0]
+        assert detection["confidence"] == pytest.approx(0.6)
+        assert detection["result"] == "success"
+
+
+def test_tracks_are_summarized_per_dog():
+    tracker = Tracker(CLASSES, high_conf=0.5)
+    per_frame = {
+        n: tracker.update(n, _detections(("assis" if n < 4 else "debout", 0.9, 10), ("couche", 0.7, 200)))
+        for n in range(1, 6)
+    }
+    table = tracked_table(per_frame, fps=25.0, class_names=CLASSES)
+    assert table.rows["timestamp"][-1] == pytest.approx(5 / 25)
+    summaries = {summary["track_id"]: summary for summary in summarize_tracks(table)}
+    assert summaries[1]["class_frames"] == {"assis": 3, "debout": 2}
+    assert summaries[1]["class_name"] == "assis"
+    assert summaries[2]["class_name"] == "couche" and summaries[2]["frames"] == 5
@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import crud, models, video_jobs
+from api.schemas import db_schemas
+
+TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(
+    TEST_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+
+TestingSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest_asyncio.fixture(scope="function")
+async def db_session():
+    tables_to_create = [
+        table for table in models.Base.metadata.sorted_tables if table.name != 'embeddings'
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all, tables=tables_to_create)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.drop_all, tables=tables_to_create)
+
+@pytest_asyncio.fixture(scope="function")
+async def session_id(db_session):
+    db_session.add(models.Dog(name="Test Dog"))
+    db_session.add(models.ReferencePostureVideo(posture=models.PostureEnum.assis, video_path="/fake/assis_1.mp4"))
+    await db_session.commit()
+    session = models.VideoSession(dog_id=1, posture=models.PostureEnum.assis, session_start=datetime.now(timezone.utc))
+    db_session.add(session)
+    await db_session.commit()
+    await db_session.refresh(session)
+    return session.id
+
+def _job(session_id, name):
+    return db_schemas.VideoJobCreate(session_id=session_id, video_id=1, input_path=f"/fake/{name}.mp4", total_frames=100)
+
+@pytest.mark.asyncio
+async def test_jobs_are_claimed_in_arrival_order(db_session, session_id):
+    first = await crud.create_video_job(db_session, _job(session_id, "first"))
+    second = await crud.create_video_job(db_session, _job(session_id, "second"))
+    claimed = await crud.claim_next_video_job(db_session)
+    assert claimed.id == first.id
+    assert claimed.status == models.JobStatusEnum.running
+    assert (await crud.claim_next_video_job(db_session)).id == second.id
+    assert await crud.claim_next_video_job(db_session) is None
+
+@pytest.mark.asyncio
+async def test_running_jobs_are_requeued_after_restart(db_session, session_id):
+    job_id = (await crud.create_video_job(db_session, _job(session_id, "interrupted"))).id
+    await crud.claim_next_video_job(db_session)
+    await crud.update_video_job_progress(db_session, job_id, 40)
+    assert await crud.requeue_running_video_jobs(db_session) == 1
+    requeued = await crud.get_video_job(db_session, job_id)
+    assert requeued.status == models.JobStatusEnum.queued
+    assert requeued.frames_done == 0
+
+@pytest.mark.asyncio
+async def test_complete_and_fail_record_outcome(db_session, session_id):
+    done_id = (await crud.create_video_job(db_session, _job(session_id, "done"))).id
+    failed_id = (await crud.create_video_job(db_session, _job(session_id, "failed"))).id
+    done = await crud.complete_video_job(db_session, done_id, "/fake/out.mp4", 100)
+    assert done.status == models.JobStatusEnum.completed
+    assert done.frames_done == done.total_frames == 100
+    failed = await crud.fail_video_job(db_session, failed_id, "boom")
+    assert failed.status == models.JobStatusEnum.failed
+    assert failed.error == "boom"
+
+
+@pytest.mark.asyncio
+async def test_job_for_unknown_reference_video_is_refused(db_session, session_id):
+    with pytest.raises(HTTPException) as error:
+        await crud.create_video_job(db_session, db_schemas.VideoJobCreate(session_id=session_id, video_id=99, input_path="/fake/x.mp4"))
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_job_for_reference_video_of_another_posture_is_refused(db_session, session_id):
+    db_session.add(models.ReferencePostureVideo(posture=models.PostureEnum.debout, video_path="/fake/debout_1.mp4"))
+    await db_session.commit()
+    with pytest.raises(HTTPException) as error:
+        await crud.create_video_job(db_session, db_schemas.VideoJobCreate(session_id=session_id, video_id=2, input_path="/fake/x.mp4"))
+    assert error.value.status_code == 400
+    assert await crud.claim_next_video_job(db_session) is None
+
+
+class FailingExecutor:
+    def __init__(self, error):
+        self.error = error
+
+    def new_progress(self):
+        return {}
+
+    async def run(self, method, *args, **kwargs):
+        raise self.error
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error, input_kept", [(RuntimeError("decode error"), False), (asyncio.CancelledError(), True)])
+async def test_input_is_removed_unless_the_job_is_interrupted(db_session, session_id, tmp_path, monkeypatch, error, input_kept):
+    monkeypatch.setattr(video_jobs, "JOB_OUTPUT_DIR", str(tmp_path / "out"))
+    input_path = tmp_path / "input.mp4"
+    input_path.write_bytes(b"video")
+    job = db_schemas.VideoJob.model_validate(await crud.create_video_job(db_session, _job(session_id, "input")))
+    await crud.claim_next_video_job(db_session)
+    pool = video_jobs.VideoJobWorkerPool(TestingSessionLocal, FailingExecutor(error))
+    if input_kept:
+        with pytest.raises(asyncio.CancelledError):
+            await pool._run_job(job, str(input_path))
+    else:
+        await pool._run_job(job, str(input_path))
+        db_session.expire_all()
+        assert (await crud.get_video_job(db_session, job.id)).status == models.JobStatusEnum.failed
+    assert input_path.exists() is input_kept
+
+
+def test_expired_results_are_swept(tmp_path):
+    old, recent = tmp_path / "job_1.mp4", tmp_path / "job_2.mp4"
+    for path in (old, recent):
+        path.write_bytes(b"video")
+    os.utime(old, (1000, 1000))
+    os.utime(recent, (5000, 5000))
+    assert video_jobs.sweep_expired_results(str(tmp_path), ttl_s=3600, now=6000) == 1
+    assert not old.exists() and recent.exists()
+    assert video_jobs.sweep_expired_results(str(tmp_path / "missing"), ttl_s=0) == 0
@@ -0,0 +1,170 @@
+import cv2
+import numpy as np
+import pytest
+import queue
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.detection_table import DetectionTable
+from api.detectors.detectors_yolo11 import ProcessingCancelled, YOLOv11Detector
+from api.detectors.video_pipeline import FrameBatch, PipelineStageError, VideoPipeline
+
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_stages_run_in_order_and_report_stats(threaded):
+    written = []
+    pipeline = VideoPipeline(
+        "decode", iter(range(10)),
+        [("double", lambda x: x * 2), ("encode", written.append)],
+        queue_size=2, threaded=threaded,
+    )
+    stats = pipeline.run()
+    assert written == [x * 2 for x in range(10)]
+    assert stats["stages"]["decode"]["frames"] == 10
+    assert stats["stages"]["encode"]["items"] == 10
+    assert stats["bottleneck"] in ("decode", "double", "encode")
+    if threaded:
+        assert stats["queues"]["decode->double"]["peak_occupancy"] <= 2
+
+
+def test_stage_error_stops_the_pipeline():
+    def explode(x):
+        if x == 3:
+            raise ValueError("bad frame")
+        return x
+
+    pipeline = VideoPipeline("decode", iter(range(1000)), [("infer", explode), ("encode", lambda x: x)], queue_size=1)
+    with pytest.raises(ValueError, match="bad frame"):
+        pipeline.run()
+
+
+def test_slow_stage_is_the_bottleneck_and_fills_its_input_queue():
+    def infer(batch):
+        time.sleep(0.02)
+        return batch
+
+    batches = (FrameBatch(None, [2 * i + 1, 2 * i + 2]) for i in range(15))
+    pipeline = VideoPipeline("decode", batches, [("infer", infer), ("encode", lambda batch: batch)], queue_size=3)
+    stats = pipeline.run()
+    assert stats["threaded"] and stats["bottleneck"] == "infer"
+    stages = stats["stages"]
+    # Les frames sont comptées via `size` : 15 lots de 2 frames.
+    assert stages["decode"]["items"] == 15 and stages["decode"]["frames"] == 30
+    assert stages["infer"]["throughput_fps"] < stages["decode"]["throughput_fps"]
+    assert stages["infer"]["utilization"] > stages["encode"]["utilization"]
+    # La file en amont de l'étage lent reste pleine, celle en aval reste presque vide.
+    upstream, downstream = stats["queues"]["decode->infer"], stats["queues"]["infer->encode"]
+    assert upstream["capacity"] == 3 and upstream["peak_occupancy"] == 3
+    assert upstream["avg_occupancy"] > downstream["avg_occupancy"]
+    assert downstream["avg_occupancy"] < 2
+
+
+def test_sequential_mode_reports_stages_without_queues():
+    stats = VideoPipeline("decode", iter(range(5)), [("infer", lambda x: time.sleep(0.01) or x)], threaded=False).run()
+    assert not stats["threaded"] and stats["queues"] == {}
+    assert stats["bottleneck"] == "infer"
+    assert stats["stages"]["infer"]["utilization"] > 0.5
+
+
+def test_bounded_queue_holds_back_a_fast_source():
+    produced = []
+    lags = []
+
+    def source():
+        for i in range(20):
+            produced.append(i)
+            yield i
+
+    def encode(item):
+        # Avance de la source sur l'élément en cours d'encodage.
+        lags.append(len(produced) - 1 - item)
+        time.sleep(0.005)
+
+    stats = VideoPipeline("decode", source(), [("encode", encode)], queue_size=2).run()
+    assert len(lags) == 20
+    # Au plus la file pleine plus l'élément que la source tente d'y déposer.
+    assert max(lags) <= 3
+    assert stats["stages"]["decode"]["wait_s"] > 0.02
+    assert stats["queues"]["decode->encode"]["peak_occupancy"] == 2
+
+
+def test_buffer_pool_is_reused_and_take_waits_for_a_returned_buffer():
+    pool = queue.Queue()
+    for _ in range(2):
+        pool.put(np.empty((2, 4, 4, 3), dtype=np.uint8))
+    seen = []
+
+    def decode():
+        for i in range(10):
+            buffer = pipeline.take(pool)
+            seen.append(id(buffer))
+            yield FrameBatch(buffer, [i])
+
+    def encode(batch):
+        time.sleep(0.01)
+        pool.put(batch.buffer)
+
+    pipeline = VideoPipeline("decode", None, [("encode", encode)], queue_size=4)
+    pipeline.source = decode()
+    stats = pipeline.run()
+    assert len(seen) == 10 and len(set(seen)) == 2
+    assert pool.qsize() == 2
+    # L'attente d'un tampon est comptée comme attente de la source, pas comme temps actif.
+    decode_stats = stats["stages"]["decode"]
+    assert decode_stats["wait_s"] > 0.05
+    assert decode_stats["busy_s"] < decode_stats["wait_s"]
+
+
+def test_take_on_an_exhausted_pool_is_interrupted_by_a_failing_stage():
+    pool = queue.Queue()
+    pool.put(np.empty((1, 4, 4, 3), dtype=np.uint8))
+    interrupted = []
+
+    def decode():
+        while True:
+            try:
+                buffer = pipeline.take(pool)
+            except PipelineStageError:
+                interrupted.append(True)
+                raise
+            yield FrameBatch(buffer, [0])
+
+    def encode(batch):
+        raise ValueError("bad frame")  # le tampon n'est jamais rendu au pool
+
+    pipeline = VideoPipeline("decode", None, [("encode", encode)], queue_size=1)
+    pipeline.source = decode()
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match="bad frame"):
+        pipeline.run()
+    assert interrupted == [True]
+    assert time.perf_counter() - start < 2
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_cancel_event_stops_video_processing(tmp_path, pipelined):
+    video_path = str(tmp_path / "video.mp4")
+    out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (64, 48))
+    for value in range(40):
+        out.write(np.full((48, 64, 3), value, dtype=np.uint8))
+    out.release()
+
+    cancel_event = threading.Event()
+    batches = []
+
+    def infer(images, imgsz=None, conf=None):
+        batches.append(len(images))
+        cancel_event.set()
+        return [DetectionTable(class_names=("assis",)) for _ in images]
+
+    detector = YOLOv11Detector.__new__(YOLOv11Detector)
+    detector.class_names = ("assis",)
+    detector._infer = infer
+    with pytest.raises(ProcessingCancelled, match="interrompu"):
+        detector.process_video(video_path, cancel_event=cancel_event, batch_size=2, pipelined=pipelined)
+    # 20 lots au total : le décodage s'arrête dès l'annulation, seuls les lots déjà en file passent.
+    assert 1 <= len(batches) <= 4
@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.video_sampling import SamplingPolicy, nearest_analysed_frame, expand_table, thumbnail, thumbnail_change
+from api.detectors.detection_table import DetectionTable
+
+
+def _selected(policy, frame_count, frames=None):
+    return [n for n in range(1, frame_count + 1) if policy.should_analyse(n, None if frames is None else frames[n - 1])]
+
+
+def test_stride_selects_every_nth_frame():
+    policy = SamplingPolicy("stride", frame_stride=5, video_fps=25)
+    assert _selected(policy, 12) == [1, 6, 11]
+
+
+def test_fps_mode_matches_target_rate():
+    policy = SamplingPolicy("fps", target_fps=5, video_fps=25)
+    assert len(_selected(policy, 250)) == 50
+
+
+def test_fps_mode_requires_target():
+    with pytest.raises(ValueError):
+        SamplingPolicy("fps", video_fps=25)
+
+
+def test_keyframes_follow_content_changes():
+    dark = np.zeros((48, 64, 3), dtype=np.uint8)
+    bright = np.full((48, 64, 3), 200, dtype=np.uint8)
+    frames = [dark] * 5 + [bright] * 5
+    policy = SamplingPolicy("keyframes", video_fps=25)
+    assert _selected(policy, 10, frames) == [1, 6]
+
+
+def test_thumbnail_change_measures_mean_or_changed_fraction():
+    frame = np.full((90, 160, 3), 100, dtype=np.uint8)
+    small = thumbnail(frame, 64)
+    assert small.shape == (36, 64)
+    changed = small.copy()
+    changed[:9] += 40  # un quart des pixels
+    assert thumbnail_change(changed, small) == pytest.approx(10.0)
+    assert thumbnail_change(changed, small, pixel_delta=12) == pytest.approx(0.25)
+    assert thumbnail_change(changed, small, pixel_delta=50) == 0.0
+
+
+def test_nearest_analysed_frame_prefers_previous_on_tie():
+    assert nearest_analysed_frame([1, 5], 3) == 1
+    assert nearest_analysed_frame([1, 5], 4) == 5
+    assert nearest_analysed_frame([3], 1) == 3
+
+
+def test_expand_keeps_frame_number_and_timestamp_per_frame():
+    analysed = {1: DetectionTable.from_records([{"class_name": "assis", "confidence": 0.9, "bbox": [0, 0, 1, 1]}], ("assis",)),
+                4: DetectionTable(class_names=("assis",))}
+    sources, table = expand_table(analysed, 5, fps=10)
+    assert list(sources) == [1, 1, 4, 4, 4]
+    assert list(table.rows["frame_number"]) == [1, 2]
+    assert list(table.rows["source_frame"]) == [1, 1]
+    assert table[1]["timestamp"] == pytest.approx(0.2)
+
+
+def test_expand_table_copies_rows_of_the_nearest_analysed_frame():
+    analysed_dicts = {
+        1: [{"class_name": "assis", "confidence": 0.9, "bbox": [0, 0, 1, 1]}],
+        4: [],
+        6: [{"class_name": "debout", "confidence": 0.4, "bbox": [2, 2, 3, 3]},
+            {"class_name": "assis", "confidence": 0.7, "bbox": [4, 4, 5, 5]}],
+    }
+    analysed = {frame: DetectionTable.from_records(dets, ("assis", "debout")) for frame, dets in analysed_dicts.items()}
+    sources, table = expand_table(analysed, 8, fps=10)
+    # Égalité de distance (frame 5) : la frame analysée précédente l'emporte.
+    assert list(sources) == [1, 1, 4, 4, 4, 6, 6, 6]
+    expected = [
+        (1, 1, "assis", 0.9), (2, 1, "assis", 0.9),
+        (6, 6, "debout", 0.4), (6, 6, "assis", 0.7),
+        (7, 6, "debout", 0.4), (7, 6, "assis", 0.7),
+        (8, 6, "debout", 0.4), (8, 6, "assis", 0.7),
+    ]
+    assert len(table) == len(expected)
+    for row, (frame_number, source_frame, class_name, confidence) in zip(table, expected):
+        assert (row["frame_number"], row["source_frame"], row["class_name"]) == (frame_number, source_frame, class_name)
+        assert row["confidence"] == pytest.approx(confidence)
+        assert row["timestamp"] == pytest.approx(frame_number / 10)
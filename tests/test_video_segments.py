@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.detectors.detection_table import DetectionTable
+from api.detectors.video_segments import concat_videos, plan_segments, relink_tracks
+from api.detectors.detectors_yolo11 import YOLOv11Detector
+
+CLASSES = ("assis", "couche", "debout")
+
+
+def _frame(frame_number, *tracks):
+    """Détections `(track_id, x1)` de boîtes 40x40 sur la frame `frame_number`."""
+    table = DetectionTable.from_records([
+        {"class_name": "assis", "confidence": 0.9, "bbox": [x, 10, x + 40, 50], "frame_number": frame_number, "track_id": track_id}
+        for track_id, x in tracks
+    ], CLASSES)
+    return {frame_number: table}
+
+
+def _write_video(path, values, size=(64, 48)):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25, size)
+    for value in values:
+        out.write(np.full((size[1], size[0], 3), value, dtype=np.uint8))
+    out.release()
+
+
+def test_plan_segments_covers_every_frame_once():
+    plan = plan_segments(1000, 4, min_frames=100)
+    # Le nombre de frames annoncé n'est qu'une estimation : le dernier segment lit jusqu'à la fin.
+    assert plan == [(1, 250), (251, 500), (501, 750), (751, None)]
+    # Pas de segment plus court que min_frames : une vidéo courte reste d'un seul tenant.
+    assert plan_segments(250, 4, min_frames=100) == [(1, 125), (126, None)]
+    assert plan_segments(50, 4, min_frames=100) == [(1, None)]
+    assert plan_segments(0, 4) == []
+
+
+def test_segments_cover_frames_beyond_an_underestimated_frame_count(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    _write_video(video_path, range(0, 240, 8))  # 30 frames
+    detector = YOLOv11Detector.__new__(YOLOv11Detector)
+    detector.class_names = CLASSES
+    detector._infer = lambda images, imgsz=None, conf=None: [DetectionTable(class_names=CLASSES) for _ in images]
+
+    # CAP_PROP_FRAME_COUNT annonce 20 frames alors que la vidéo en contient 30.
+    plan = plan_segments(20, 2, min_frames=5)
+    results = [detector.process_segment(video_path, first, last, batch_size=4, pipelined=False) for first, last in plan]
+    assert [result["last_frame"] for result in results] == [10, 30]
+    assert sorted(frame for result in results for frame in result["analysed"]) == list(range(1, 31))
+
+
+def test_relink_tracks_continues_ids_across_segments():
+    first = {**_frame(1, (1, 10), (2, 200)), **_frame(2, (1, 12), (2, 200))}
+    # Le second segment renumérote ses pistes à partir de 1 : la piste 1 (x=200) est le chien 2 du segment précédent.
+    second = {**_frame(3, (1, 200), (2, 14), (3, 400))}
+    relink_tracks([first, second])
+    assert list(first[2].rows["track_id"]) == [1, 2]
+    ids = dict(zip(second[3].rows["x1"].astype(int), second[3].rows["track_id"]))
+    assert ids == {200: 2, 14: 1, 400: 3}
+
+
+def test_relink_tracks_skips_empty_segments():
+    first = _frame(1, (1, 10))
+    second = {2: DetectionTable(class_names=CLASSES)}
+    third = _frame(3, (1, 300))
+    relink_tracks([first, {}, second, third])
+    assert list(third[3].rows["track_id"]) == [2]
+
+
+def test_concat_videos_keeps_segment_order(tmp_path):
+    parts = []
+    for index, value in enumerate((40, 120, 200)):
+        parts.append(str(tmp_path / f"segment_{index}.mp4"))
+        _write_video(parts[-1], [value] * 5)
+    output_path = str(tmp_path / "video.mp4")
+    assert concat_videos(parts, output_path, 25, (64, 48)) in ("ffmpeg", "opencv")
+
+    cap = cv2.VideoCapture(output_path)
+    means = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        means.append(frame.mean())
+    cap.release()
+    assert len(means) == 15
+    assert means[0] == pytest.approx(40, abs=8) and means[7] == pytest.approx(120, abs=8) and means[-1] == pytest.approx(200, abs=8)